@@ -13,11 +13,23 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/4/6 14:21
 # @Desc    : 异步Aiomysql的增删改查封装
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Tuple, Union
 
 import aiomysql
 
 
+def _group_items_by_fields(items: List[Dict[str, Any]]) -> Dict[Tuple[str, ...], List[Dict[str, Any]]]:
+    """
+    按字段集合对记录分组，同一组的记录可以写进同一条多行 SQL
+    :param items: 记录字典列表
+    :return:
+    """
+    groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+    for item in items:
+        groups.setdefault(tuple(item.keys()), []).append(item)
+    return groups
+
+
 class AsyncMysqlDB:
     def __init__(self, pool: aiomysql.Pool) -> None:
         self.__pool = pool
@@ -67,6 +79,57 @@ class AsyncMysqlDB:
                 lastrowid = cur.lastrowid
                 return lastrowid
 
+    async def upsert(self, table_name: str, item: Dict[str, Any], unique_fields: List[str],
+                     keep_fields: Tuple[str, ...] = ("add_ts",)) -> int:
+        """
+        插入一条记录，唯一键冲突时更新已有记录（INSERT ... ON DUPLICATE KEY UPDATE），一次往返完成
+        :param table_name: 表名
+        :param item: 一条记录的字典信息
+        :param unique_fields: 唯一键字段，冲突时不更新
+        :param keep_fields: 冲突时保留原值、不更新的字段，默认保留首次入库时间 add_ts
+        :return:
+        """
+        fields = list(item.keys())
+        values = list(item.values())
+        fieldstr = ','.join(f'`{field}`' for field in fields)
+        valstr = ','.join(['%s'] * len(item))
+        update_fields = [field for field in fields if field not in unique_fields and field not in keep_fields]
+        if update_fields:
+            updatestr = ','.join(f'`{field}`=VALUES(`{field}`)' for field in update_fields)
+        else:
+            updatestr = f'`{fields[0]}`=`{fields[0]}`'
+        sql = "INSERT INTO %s (%s) VALUES(%s) ON DUPLICATE KEY UPDATE %s" % (table_name, fieldstr, valstr, updatestr)
+        async with self.__pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                rows = await cur.execute(sql, values)
+                return rows
+
+    async def upsert_many(self, table_name: str, items: List[Dict[str, Any]], unique_fields: List[str],
+                          keep_fields: Tuple[str, ...] = ("add_ts",)) -> int:
+        """
+        批量插入或更新多条记录，字段相同的记录合并成一条多 VALUES 的 INSERT ... ON DUPLICATE KEY UPDATE 语句
+        :param table_name: 表名
+        :param items: 记录字典列表
+        :param unique_fields: 唯一键字段，冲突时不更新
+        :param keep_fields: 冲突时保留原值、不更新的字段
+        :return:
+        """
+        rows = 0
+        for fields, group in _group_items_by_fields(items).items():
+            fieldstr = ','.join(f'`{field}`' for field in fields)
+            valstr = ','.join(['(' + ','.join(['%s'] * len(fields)) + ')'] * len(group))
+            update_fields = [field for field in fields if field not in unique_fields and field not in keep_fields]
+            if update_fields:
+                updatestr = ','.join(f'`{field}`=VALUES(`{field}`)' for field in update_fields)
+            else:
+                updatestr = f'`{fields[0]}`=`{fields[0]}`'
+            sql = "INSERT INTO %s (%s) VALUES %s ON DUPLICATE KEY UPDATE %s" % (table_name, fieldstr, valstr, updatestr)
+            values = [item[field] for item in group for field in fields]
+            async with self.__pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    rows += await cur.execute(sql, values)
+        return rows
+
     async def update_table(self, table_name: str, updates: Dict[str, Any], field_where: str,
                            value_where: Union[str, int, float]) -> int:
         """
@@ -105,3 +168,35 @@ class AsyncMysqlDB:
             async with conn.cursor() as cur:
                 rows = await cur.execute(sql, args)
                 return rows
+
+    async def ensure_unique_index(self, table_name: str, index_name: str, unique_fields: List[str]) -> bool:
+        """
+        确保表上有 upsert 依赖的唯一索引。旧版本建的表只有同名的普通索引，ON DUPLICATE KEY UPDATE 不会触发，
+        每次写入都会插入一条重复记录。这里先删除重复记录（每个唯一键只保留 id 最大的一条），再把同名索引重建为唯一索引
+        :param table_name: 表名
+        :param index_name: 唯一索引名
+        :param unique_fields: 唯一键字段
+        :return: 是否新建了唯一索引，表不存在或已有唯一索引时返回 False
+        """
+        if not await self.get_first(
+                "SELECT 1 FROM information_schema.TABLES WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME=%s",
+                table_name):
+            return False
+        indexes = await self.query(
+            "SELECT INDEX_NAME AS index_name, MIN(NON_UNIQUE) AS non_unique, "
+            "GROUP_CONCAT(COLUMN_NAME ORDER BY SEQ_IN_INDEX) AS columns "
+            "FROM information_schema.STATISTICS WHERE TABLE_SCHEMA=DATABASE() AND TABLE_NAME=%s "
+            "GROUP BY INDEX_NAME",
+            table_name)
+        if any(not index["non_unique"] and index["columns"] == ','.join(unique_fields) for index in indexes):
+            return False
+
+        fieldstr = ','.join(f'`{field}`' for field in unique_fields)
+        # 自连接删除重复记录，NULL 不相等，唯一键为空的记录不参与去重
+        joinstr = ' AND '.join(f't1.`{field}`=t2.`{field}`' for field in unique_fields)
+        await self.execute(f"DELETE t1 FROM `{table_name}` t1 JOIN `{table_name}` t2 ON {joinstr} AND t1.`id`<t2.`id`")
+        alters = [f"ADD UNIQUE KEY `{index_name}` ({fieldstr})"]
+        if any(index["index_name"] == index_name for index in indexes):
+            alters.insert(0, f"DROP INDEX `{index_name}`")
+        await self.execute(f"ALTER TABLE `{table_name}` {', '.join(alters)}")
+        return True
@@ -13,14 +13,98 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/4/6 14:21
 # @Desc    : 异步SQLite的增删改查封装
-from typing import Any, Dict, List, Union
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import aiosqlite
 
 
 class AsyncSqliteDB:
-    def __init__(self, db_path: str) -> None:
+    """
+    整个进程共用一个长连接（WAL 模式），写语句累积在同一个事务中，
+    按条数或时间批量提交，避免每条记录都提交一次、触发一次 fsync。
+    读写走同一个连接，查询能读到尚未提交的写入，先查后写的排重逻辑不受影响
+    """
+
+    def __init__(self, db_path: str, commit_batch_size: int = 200, commit_interval: float = 1,
+                 cache_size_mb: int = 64) -> None:
+        """
+        :param db_path: 数据库文件路径
+        :param commit_batch_size: 事务中累积的写语句达到该数量时提交
+        :param commit_interval: 事务最长的提交间隔（秒）
+        :param cache_size_mb: 页缓存大小（MB）
+        """
         self.__db_path = db_path
+        self.__commit_batch_size = commit_batch_size
+        self.__commit_interval = commit_interval
+        self.__cache_size_mb = cache_size_mb
+        self.__conn: Optional[aiosqlite.Connection] = None
+        self.__conn_lock: Optional[asyncio.Lock] = None
+        self.__pending_writes = 0
+        self.__commit_task: Optional[asyncio.Task] = None
+
+    async def __get_conn(self) -> aiosqlite.Connection:
+        """
+        获取长连接，第一次使用时创建并设置 pragma
+        :return:
+        """
+        if self.__conn is not None:
+            return self.__conn
+        if self.__conn_lock is None:
+            self.__conn_lock = asyncio.Lock()
+        async with self.__conn_lock:
+            if self.__conn is None:
+                conn = await aiosqlite.connect(self.__db_path)
+                conn.row_factory = aiosqlite.Row
+                await conn.execute("PRAGMA journal_mode=WAL")
+                # WAL 模式下 NORMAL 只在 checkpoint 时 fsync，进程崩溃不会损坏数据库
+                await conn.execute("PRAGMA synchronous=NORMAL")
+                await conn.execute(f"PRAGMA cache_size=-{self.__cache_size_mb * 1024}")
+                await conn.execute("PRAGMA temp_store=MEMORY")
+                await conn.execute("PRAGMA busy_timeout=5000")
+                self.__conn = conn
+        return self.__conn
+
+    async def __after_write(self, write_count: int = 1) -> None:
+        """
+        写语句执行后调用，事务累积到指定条数立即提交，否则等待定时提交
+        :param write_count: 本次写入的记录数
+        :return:
+        """
+        self.__pending_writes += write_count
+        if self.__pending_writes >= self.__commit_batch_size:
+            await self.commit()
+        elif self.__commit_task is None:
+            self.__commit_task = asyncio.create_task(self.__delayed_commit())
+
+    async def __delayed_commit(self) -> None:
+        await asyncio.sleep(self.__commit_interval)
+        self.__commit_task = None
+        await self.commit()
+
+    async def commit(self) -> None:
+        """
+        提交当前事务中累积的写入
+        :return:
+        """
+        if self.__commit_task is not None and self.__commit_task is not asyncio.current_task():
+            self.__commit_task.cancel()
+        self.__commit_task = None
+        if self.__conn is None or self.__pending_writes == 0:
+            return
+        self.__pending_writes = 0
+        await self.__conn.commit()
+
+    async def close(self) -> None:
+        """
+        提交剩余写入并关闭连接
+        :return:
+        """
+        if self.__conn is None:
+            return
+        await self.commit()
+        conn, self.__conn = self.__conn, None
+        await conn.close()
 
     async def query(self, sql: str, *args: Union[str, int]) -> List[Dict[str, Any]]:
         """
@@ -29,11 +113,10 @@ class AsyncSqliteDB:
         :param args: sql中传递动态参数列表
         :return:
         """
-        async with aiosqlite.connect(self.__db_path) as conn:
-            conn.row_factory = aiosqlite.Row
-            async with conn.execute(sql, args) as cursor:
-                rows = await cursor.fetchall()
-                return [dict(row) for row in rows] if rows else []
+        conn = await self.__get_conn()
+        async with conn.execute(sql, args) as cursor:
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows] if rows else []
 
     async def get_first(self, sql: str, *args: Union[str, int]) -> Union[Dict[str, Any], None]:
         """
@@ -42,11 +125,10 @@ class AsyncSqliteDB:
         :param args:sql中传递动态参数列表
         :return:
         """
-        async with aiosqlite.connect(self.__db_path) as conn:
-            conn.row_factory = aiosqlite.Row
-            async with conn.execute(sql, args) as cursor:
-                row = await cursor.fetchone()
-                return dict(row) if row else None
+        conn = await self.__get_conn()
+        async with conn.execute(sql, args) as cursor:
+            row = await cursor.fetchone()
+            return dict(row) if row else None
 
     async def item_to_table(self, table_name: str, item: Dict[str, Any]) -> int:
         """
@@ -60,10 +142,64 @@ class AsyncSqliteDB:
         fieldstr = ','.join(fields)
         valstr = ','.join(['?'] * len(item))
         sql = f"INSERT INTO {table_name} ({fieldstr}) VALUES({valstr})"
-        async with aiosqlite.connect(self.__db_path) as conn:
-            async with conn.execute(sql, values) as cursor:
-                await conn.commit()
-                return cursor.lastrowid
+        conn = await self.__get_conn()
+        async with conn.execute(sql, values) as cursor:
+            lastrowid = cursor.lastrowid
+        await self.__after_write()
+        return lastrowid
+
+    @staticmethod
+    def __build_upsert_sql(table_name: str, fields: List[str], unique_fields: List[str],
+                           keep_fields: Tuple[str, ...]) -> str:
+        fieldstr = ','.join(f'`{field}`' for field in fields)
+        valstr = ','.join(['?'] * len(fields))
+        conflictstr = ','.join(f'`{field}`' for field in unique_fields)
+        update_fields = [field for field in fields if field not in unique_fields and field not in keep_fields]
+        if update_fields:
+            updatestr = 'DO UPDATE SET ' + ','.join(f'`{field}`=excluded.`{field}`' for field in update_fields)
+        else:
+            updatestr = 'DO NOTHING'
+        return f"INSERT INTO {table_name} ({fieldstr}) VALUES({valstr}) ON CONFLICT({conflictstr}) {updatestr}"
+
+    async def upsert(self, table_name: str, item: Dict[str, Any], unique_fields: List[str],
+                     keep_fields: Tuple[str, ...] = ("add_ts",)) -> int:
+        """
+        插入一条记录，唯一键冲突时更新已有记录（INSERT ... ON CONFLICT DO UPDATE），一次往返完成
+        :param table_name: 表名
+        :param item: 一条记录的字典信息
+        :param unique_fields: 唯一键字段，需要有对应的唯一索引
+        :param keep_fields: 冲突时保留原值、不更新的字段，默认保留首次入库时间 add_ts
+        :return:
+        """
+        sql = self.__build_upsert_sql(table_name, list(item.keys()), unique_fields, keep_fields)
+        values = list(item.values())
+        conn = await self.__get_conn()
+        async with conn.execute(sql, values) as cursor:
+            rowcount = cursor.rowcount
+        await self.__after_write()
+        return rowcount
+
+    async def upsert_many(self, table_name: str, items: List[Dict[str, Any]], unique_fields: List[str],
+                          keep_fields: Tuple[str, ...] = ("add_ts",)) -> int:
+        """
+        批量插入或更新多条记录，字段相同的记录通过 executemany 一次提交给 SQLite
+        :param table_name: 表名
+        :param items: 记录字典列表
+        :param unique_fields: 唯一键字段，需要有对应的唯一索引
+        :param keep_fields: 冲突时保留原值、不更新的字段
+        :return:
+        """
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for item in items:
+            groups.setdefault(tuple(item.keys()), []).append(item)
+        conn = await self.__get_conn()
+        rowcount = 0
+        for fields, group in groups.items():
+            sql = self.__build_upsert_sql(table_name, list(fields), unique_fields, keep_fields)
+            async with conn.executemany(sql, [list(item.values()) for item in group]) as cursor:
+                rowcount += cursor.rowcount
+            await self.__after_write(len(group))
+        return rowcount
 
     async def update_table(self, table_name: str, updates: Dict[str, Any], field_where: str,
                            value_where: Union[str, int, float]) -> int:
@@ -83,10 +219,11 @@ class AsyncSqliteDB:
         upsets_str = ','.join(upsets)
         values.append(value_where)
         sql = f'UPDATE {table_name} SET {upsets_str} WHERE {field_where}=?'
-        async with aiosqlite.connect(self.__db_path) as conn:
-            async with conn.execute(sql, values) as cursor:
-                await conn.commit()
-                return cursor.rowcount
+        conn = await self.__get_conn()
+        async with conn.execute(sql, values) as cursor:
+            rowcount = cursor.rowcount
+        await self.__after_write()
+        return rowcount
 
     async def execute(self, sql: str, *args: Union[str, int]) -> int:
         """
@@ -95,10 +232,11 @@ class AsyncSqliteDB:
         :param args:
         :return:
         """
-        async with aiosqlite.connect(self.__db_path) as conn:
-            async with conn.execute(sql, args) as cursor:
-                await conn.commit()
-                return cursor.rowcount
+        conn = await self.__get_conn()
+        async with conn.execute(sql, args) as cursor:
+            rowcount = cursor.rowcount
+        await self.__after_write()
+        return rowcount
 
     async def executescript(self, sql_script: str) -> None:
         """
@@ -106,6 +244,39 @@ class AsyncSqliteDB:
         :param sql_script: SQL脚本内容
         :return:
         """
-        async with aiosqlite.connect(self.__db_path) as conn:
-            await conn.executescript(sql_script)
-            await conn.commit()
\ No newline at end of file
+        await self.commit()
+        conn = await self.__get_conn()
+        await conn.executescript(sql_script)
+        await conn.commit()
+
+    async def ensure_unique_index(self, table_name: str, index_name: str, unique_fields: List[str]) -> bool:
+        """
+        确保表上有 upsert 依赖的唯一索引。旧版本建的库只有同名的普通索引，ON CONFLICT 会直接报错，
+        这里先删除重复记录（每个唯一键只保留最后写入的一条），再把同名索引重建为唯一索引
+        :param table_name: 表名
+        :param index_name: 唯一索引名
+        :param unique_fields: 唯一键字段
+        :return: 是否新建了唯一索引，表不存在或已有唯一索引时返回 False
+        """
+        if not await self.get_first("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", table_name):
+            return False
+        for index in await self.query(f"PRAGMA index_list(`{table_name}`)"):
+            if not index["unique"] or index["partial"]:
+                continue
+            columns = await self.query(f"PRAGMA index_info(`{index['name']}`)")
+            if [column["name"] for column in columns] == list(unique_fields):
+                return False
+
+        await self.commit()
+        conn = await self.__get_conn()
+        fieldstr = ','.join(f'`{field}`' for field in unique_fields)
+        # 唯一索引允许多个 NULL，唯一键为空的记录不参与去重
+        not_null = ' AND '.join(f'`{field}` IS NOT NULL' for field in unique_fields)
+        await conn.execute(f"DROP INDEX IF EXISTS `{index_name}`")
+        await conn.execute(
+            f"DELETE FROM `{table_name}` WHERE {not_null} AND rowid NOT IN "
+            f"(SELECT MAX(rowid) FROM `{table_name}` GROUP BY {fieldstr})"
+        )
+        await conn.execute(f"CREATE UNIQUE INDEX `{index_name}` ON `{table_name}`({fieldstr})")
+        await conn.commit()
+        return True
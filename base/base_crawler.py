@@ -10,7 +10,7 @@
 
 
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from playwright.async_api import BrowserContext, BrowserType, Playwright
 
@@ -76,6 +76,35 @@ class AbstractLogin(ABC):
 
 
 class AbstractStore(ABC):
+    """
+    存储实现在进程内按 (平台, 存储方式) 只创建一个实例，
+    文件句柄、缓冲区等资源在 open 中准备，跨记录复用，在 close 中释放
+    """
+
+    async def open(self):
+        """
+        第一次写入前调用一次，准备存储需要的资源
+        Returns:
+
+        """
+        pass
+
+    async def flush(self):
+        """
+        将缓冲中的数据写入磁盘/数据库
+        Returns:
+
+        """
+        pass
+
+    async def close(self):
+        """
+        程序退出前调用，写完缓冲数据并释放资源
+        Returns:
+
+        """
+        await self.flush()
+
     @abstractmethod
     async def store_content(self, content_item: Dict):
         pass
@@ -84,6 +113,18 @@ class AbstractStore(ABC):
     async def store_comment(self, comment_item: Dict):
         pass
 
+    async def store_comments(self, comment_items: List[Dict]):
+        """
+        批量保存一页评论，默认逐条调用 store_comment，数据库存储会重写为一条批量语句
+        Args:
+            comment_items: comment item dict list
+
+        Returns:
+
+        """
+        for comment_item in comment_items:
+            await self.store_comment(comment_item)
+
     # TODO support all platform
     # only xhs is supported, so @abstractmethod is commented
     @abstractmethod
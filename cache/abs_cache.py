@@ -16,7 +16,7 @@
 # @Desc    : 抽象类
 
 from abc import ABC, abstractmethod
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 
 
 class AbstractCache(ABC):
@@ -51,3 +51,105 @@ class AbstractCache(ABC):
         :return:
         """
         raise NotImplementedError
+
+    def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        批量获取键的值，默认逐个调用 get
+        :param keys: 键列表
+        :return: 与 keys 顺序一致的值列表，不存在的键为 None
+        """
+        return [self.get(key) for key in keys]
+
+    def set_many(self, mapping: Dict[str, Any], expire_time: int) -> None:
+        """
+        批量设置键的值，默认逐个调用 set
+        :param mapping: 键值字典
+        :param expire_time: 过期时间
+        :return:
+        """
+        for key, value in mapping.items():
+            self.set(key, value, expire_time)
+
+
+class AbstractAsyncCache(ABC):
+    """
+    异步缓存，网络缓存（redis 等）使用，调用不阻塞事件循环
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        从缓存中获取键的值
+        :param key: 键
+        :return:
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, expire_time: int) -> None:
+        """
+        将键的值设置到缓存中
+        :param key: 键
+        :param value: 值
+        :param expire_time: 过期时间
+        :return:
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def keys(self, pattern: str) -> List[str]:
+        """
+        获取所有符合pattern的key
+        :param pattern: 匹配模式
+        :return:
+        """
+        raise NotImplementedError
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        批量获取键的值，默认逐个调用 get
+        :param keys: 键列表
+        :return: 与 keys 顺序一致的值列表，不存在的键为 None
+        """
+        return [await self.get(key) for key in keys]
+
+    async def set_many(self, mapping: Dict[str, Any], expire_time: int) -> None:
+        """
+        批量设置键的值，默认逐个调用 set
+        :param mapping: 键值字典
+        :param expire_time: 过期时间
+        :return:
+        """
+        for key, value in mapping.items():
+            await self.set(key, value, expire_time)
+
+    async def close(self) -> None:
+        """
+        释放连接等资源
+        :return:
+        """
+        pass
+
+
+class AsyncCacheAdapter(AbstractAsyncCache):
+    """
+    将同步缓存（本地缓存）包装为异步缓存接口，调用方可以不区分缓存类型
+    """
+
+    def __init__(self, cache: AbstractCache):
+        self._cache = cache
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: Any, expire_time: int) -> None:
+        self._cache.set(key, value, expire_time)
+
+    async def keys(self, pattern: str) -> List[str]:
+        return self._cache.keys(pattern)
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        return self._cache.get_many(keys)
+
+    async def set_many(self, mapping: Dict[str, Any], expire_time: int) -> None:
+        self._cache.set_many(mapping, expire_time)
@@ -0,0 +1,105 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 异步 RedisCache 实现，连接池 + MGET/pipeline 批量读写 + SCAN 遍历键
+from typing import Any, Dict, List, Optional
+
+from redis.asyncio import ConnectionPool, Redis
+
+from cache.abs_cache import AbstractAsyncCache
+from cache.serializer import CacheSerializer, create_serializer
+from config import db_config
+
+
+class AsyncRedisCache(AbstractAsyncCache):
+
+    def __init__(self, serializer: Optional[CacheSerializer] = None,
+                 connection_pool: Optional[ConnectionPool] = None) -> None:
+        """
+        :param serializer: 值的序列化方式，默认使用 REDIS_CACHE_SERIALIZER 配置
+        :param connection_pool: redis 连接池，默认按 db_config 创建
+        """
+        self._serializer = serializer or create_serializer(db_config.REDIS_CACHE_SERIALIZER)
+        self._connection_pool = connection_pool or ConnectionPool(
+            host=db_config.REDIS_DB_HOST,
+            port=db_config.REDIS_DB_PORT,
+            db=db_config.REDIS_DB_NUM,
+            password=db_config.REDIS_DB_PWD,
+            max_connections=db_config.REDIS_MAX_CONNECTIONS,
+        )
+        self._redis_client = Redis(connection_pool=self._connection_pool)
+
+    def _loads(self, value: Optional[bytes]) -> Optional[Any]:
+        if value is None:
+            return None
+        return self._serializer.loads(value)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        从缓存中获取键的值, 并且反序列化
+        :param key:
+        :return:
+        """
+        return self._loads(await self._redis_client.get(key))
+
+    async def set(self, key: str, value: Any, expire_time: int) -> None:
+        """
+        将键的值设置到缓存中, 并且序列化
+        :param key:
+        :param value:
+        :param expire_time:
+        :return:
+        """
+        await self._redis_client.set(key, self._serializer.dumps(value), ex=expire_time)
+
+    async def keys(self, pattern: str) -> List[str]:
+        """
+        使用 SCAN 分批遍历符合pattern的key，不会像 KEYS 一样长时间阻塞 redis
+        :param pattern: 匹配模式
+        :return:
+        """
+        return [
+            key.decode()
+            async for key in self._redis_client.scan_iter(match=pattern, count=db_config.REDIS_SCAN_COUNT)
+        ]
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        使用 MGET 一次请求获取多个键的值
+        :param keys: 键列表
+        :return: 与 keys 顺序一致的值列表，不存在的键为 None
+        """
+        if not keys:
+            return []
+        return [self._loads(value) for value in await self._redis_client.mget(keys)]
+
+    async def set_many(self, mapping: Dict[str, Any], expire_time: int) -> None:
+        """
+        使用 pipeline 一次请求设置多个键的值
+        :param mapping: 键值字典
+        :param expire_time: 过期时间
+        :return:
+        """
+        if not mapping:
+            return
+        async with self._redis_client.pipeline(transaction=False) as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, self._serializer.dumps(value), ex=expire_time)
+            await pipe.execute()
+
+    async def close(self) -> None:
+        """
+        关闭连接池中的连接
+        :return:
+        """
+        await self._redis_client.close()
+        await self._connection_pool.disconnect()
@@ -38,3 +38,22 @@ class CacheFactory:
             return RedisCache()
         else:
             raise ValueError(f'Unknown cache type: {cache_type}')
+
+    @staticmethod
+    def create_async_cache(cache_type: str, *args, **kwargs):
+        """
+        创建异步缓存对象，本地缓存包装为异步接口
+        :param cache_type: 缓存类型
+        :param args: 参数
+        :param kwargs: 关键字参数
+        :return:
+        """
+        if cache_type == 'memory':
+            from .abs_cache import AsyncCacheAdapter
+            from .local_cache import ExpiringLocalCache
+            return AsyncCacheAdapter(ExpiringLocalCache(*args, **kwargs))
+        elif cache_type == 'redis':
+            from .async_redis_cache import AsyncRedisCache
+            return AsyncRedisCache(*args, **kwargs)
+        else:
+            raise ValueError(f'Unknown cache type: {cache_type}')
@@ -16,7 +16,10 @@
 # @Desc    : 本地缓存
 
 import asyncio
+import fnmatch
+import heapq
 import time
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional, Tuple
 
 from cache.abs_cache import AbstractCache
@@ -24,14 +27,23 @@ from cache.abs_cache import AbstractCache
 
 class ExpiringLocalCache(AbstractCache):
 
-    def __init__(self, cron_interval: int = 10):
+    def __init__(self, cron_interval: int = 10, max_entries: Optional[int] = None):
         """
         初始化本地缓存
         :param cron_interval: 定时清楚cache的时间间隔
+        :param max_entries: 最大缓存条数，超出时淘汰最久未使用的键，None 表示不限制
         :return:
         """
         self._cron_interval = cron_interval
-        self._cache_container: Dict[str, Tuple[Any, float]] = {}
+        self._max_entries = max_entries
+        # 按访问顺序排列，最近使用的键在末尾
+        self._cache_container: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        # (过期时间, 键) 小顶堆，键被覆盖或淘汰后堆中的旧记录在弹出时跳过
+        self._expire_heap: List[Tuple[float, str]] = []
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
         self._cron_task: Optional[asyncio.Task] = None
         # 开启定时清理任务
         self._schedule_clear()
@@ -44,6 +56,9 @@ class ExpiringLocalCache(AbstractCache):
         if self._cron_task is not None:
             self._cron_task.cancel()
 
+    def __len__(self) -> int:
+        return len(self._cache_container)
+
     def get(self, key: str) -> Optional[Any]:
         """
         从缓存中获取键的值
@@ -52,13 +67,18 @@ class ExpiringLocalCache(AbstractCache):
         """
         value, expire_time = self._cache_container.get(key, (None, 0))
         if value is None:
+            self._misses += 1
             return None
 
         # 如果键已过期，则删除键并返回None
         if expire_time < time.time():
             del self._cache_container[key]
+            self._expirations += 1
+            self._misses += 1
             return None
 
+        self._cache_container.move_to_end(key)
+        self._hits += 1
         return value
 
     def set(self, key: str, value: Any, expire_time: int) -> None:
@@ -69,22 +89,45 @@ class ExpiringLocalCache(AbstractCache):
         :param expire_time:
         :return:
         """
-        self._cache_container[key] = (value, time.time() + expire_time)
+        expire_at = time.time() + expire_time
+        self._cache_container[key] = (value, expire_at)
+        self._cache_container.move_to_end(key)
+        heapq.heappush(self._expire_heap, (expire_at, key))
+
+        if self._max_entries is not None:
+            while len(self._cache_container) > self._max_entries:
+                self._cache_container.popitem(last=False)
+                self._evictions += 1
+
+        # 覆盖写入和淘汰会在堆中留下旧记录，旧记录过多时重建堆
+        if len(self._expire_heap) > 2 * len(self._cache_container) + 64:
+            self._expire_heap = [(expire_at, key) for key, (_, expire_at) in self._cache_container.items()]
+            heapq.heapify(self._expire_heap)
 
     def keys(self, pattern: str) -> List[str]:
         """
-        获取所有符合pattern的key
+        获取所有符合pattern的key，pattern 为 glob 通配符，与 redis 的 KEYS 命令一致，已过期的键不返回
         :param pattern: 匹配模式
         :return:
         """
-        if pattern == '*':
-            return list(self._cache_container.keys())
-
-        # 本地缓存通配符暂时将*替换为空
-        if '*' in pattern:
-            pattern = pattern.replace('*', '')
+        now = time.time()
+        return [
+            key for key, (_, expire_time) in self._cache_container.items()
+            if expire_time >= now and (pattern == '*' or fnmatch.fnmatchcase(key, pattern))
+        ]
 
-        return [key for key in self._cache_container.keys() if pattern in key]
+    def stats(self) -> Dict[str, int]:
+        """
+        缓存的命中、未命中、淘汰、过期次数和当前条数
+        :return:
+        """
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            "size": len(self._cache_container),
+        }
 
     def _schedule_clear(self):
         """
@@ -102,12 +145,17 @@ class ExpiringLocalCache(AbstractCache):
 
     def _clear(self):
         """
-        根据过期时间清理缓存
+        根据过期时间清理缓存，只弹出堆顶已过期的记录，耗时与过期的键数量成正比
         :return:
         """
-        for key, (value, expire_time) in self._cache_container.items():
-            if expire_time < time.time():
+        now = time.time()
+        while self._expire_heap and self._expire_heap[0][0] < now:
+            expire_at, key = heapq.heappop(self._expire_heap)
+            entry = self._cache_container.get(key)
+            # 键已被删除、淘汰或重新设置过期时间时，堆中的记录是旧的
+            if entry is not None and entry[1] == expire_at:
                 del self._cache_container[key]
+                self._expirations += 1
 
     async def _start_clear_cron(self):
         """
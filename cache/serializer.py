@@ -0,0 +1,90 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 缓存值的序列化方式
+import json
+import pickle
+from abc import ABC, abstractmethod
+from typing import Any
+
+
+class CacheSerializer(ABC):
+
+    @abstractmethod
+    def dumps(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    @abstractmethod
+    def loads(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class JsonSerializer(CacheSerializer):
+    """
+    JSON 序列化，可读且跨语言，只支持 dict / list / str / 数字等基础类型
+    """
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class MsgpackSerializer(CacheSerializer):
+    """
+    msgpack 序列化，比 JSON 更紧凑、更快，需要安装 msgpack
+    """
+
+    def __init__(self):
+        try:
+            import msgpack
+        except ImportError as e:
+            raise ImportError("REDIS_CACHE_SERIALIZER=msgpack requires msgpack, please run: pip install msgpack") from e
+        self._msgpack = msgpack
+
+    def dumps(self, value: Any) -> bytes:
+        return self._msgpack.packb(value, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return self._msgpack.unpackb(data, raw=False)
+
+
+class PickleSerializer(CacheSerializer):
+    """
+    pickle 序列化，支持任意 python 对象，只应用于可信的缓存数据
+    """
+
+    def dumps(self, value: Any) -> bytes:
+        return pickle.dumps(value)
+
+    def loads(self, data: bytes) -> Any:
+        return pickle.loads(data)
+
+
+SERIALIZERS = {
+    "json": JsonSerializer,
+    "msgpack": MsgpackSerializer,
+    "pickle": PickleSerializer,
+}
+
+
+def create_serializer(name: str) -> CacheSerializer:
+    """
+    根据名称创建序列化器
+    :param name: json | msgpack | pickle
+    :return:
+    """
+    serializer_class = SERIALIZERS.get(name)
+    if not serializer_class:
+        raise ValueError(f"Unknown cache serializer: {name}, only supported {' or '.join(SERIALIZERS)}")
+    return serializer_class()
@@ -26,6 +26,31 @@ IP_PROXY_POOL_COUNT = 2
 # 代理IP提供商名称
 IP_PROXY_PROVIDER_NAME = "kuaidaili"
 
+# 可用代理低于该数量时，后台提前向代理商提取新 IP
+IP_PROXY_POOL_LOW_WATER_MARK = 1
+
+# 验证代理的请求超时时间（秒）
+IP_PROXY_VALIDATE_TIMEOUT = 10
+
+# 代理池为空时 get_proxy 等待补充的最长时间（秒）
+IP_PROXY_WAIT_TIMEOUT = 30
+
+# 后台补充失败后的重试间隔（秒）
+IP_PROXY_REFILL_RETRY_INTERVAL = 5
+
+# 代理距离过期不足该秒数时不再使用
+IP_PROXY_EXPIRE_MARGIN = 30
+
+# 健康分数：未测速代理的默认延迟（秒），错误率的惩罚系数
+IP_PROXY_DEFAULT_LATENCY = 1
+IP_PROXY_FAILURE_PENALTY = 10
+
+# 代理累计失败次数达到该值且错误率超过一半时淘汰
+IP_PROXY_MAX_FAILURES = 3
+
+# 请求命中平台封禁信号（验证码、IP 被封等）或代理连接失败时，更换代理后重试的最大次数
+IP_PROXY_ROTATE_MAX_RETRIES = 3
+
 # 设置为True不会打开浏览器（无头浏览器）
 # 设置False会打开一个浏览器
 # 小红书如果一直扫码登录不通过，打开浏览器手动过一下滑动验证码
@@ -62,8 +87,10 @@ BROWSER_LAUNCH_TIMEOUT = 30
 # 设置为False可以保持浏览器运行，便于调试
 AUTO_CLOSE_BROWSER = True
 
-# 数据保存类型选项配置,支持四种类型：csv、db、json、sqlite, 最好保存到DB，有排重的功能。
-SAVE_DATA_OPTION = "json"  # csv or db or json or sqlite
+# 数据保存类型选项配置,支持六种类型：csv、db、json、jsonl、parquet、sqlite, 最好保存到DB，有排重的功能。
+# jsonl 为追加写入，数据量大时比 json 快得多，可用 tools/jsonl_to_json.py 转换为 json 数组格式
+# parquet 为压缩的列式存储，便于 pandas 等工具分析，需要安装 pyarrow
+SAVE_DATA_OPTION = "json"  # csv or db or json or jsonl or parquet or sqlite
 
 # 用户浏览器缓存的浏览器文件配置
 USER_DATA_DIR = "%s_user_data_dir"  # %s will be replaced by platform name
@@ -74,7 +101,7 @@ START_PAGE = 1
 # 爬取视频/帖子的数量控制
 CRAWLER_MAX_NOTES_COUNT = 100
 
-# 并发爬虫数量控制
+# 并发爬虫数量控制，开启自适应并发时为初始并发数
 MAX_CONCURRENCY_NUM = 1
 
 # 是否开启爬图片模式, 默认不开启爬图片
@@ -90,6 +117,9 @@ CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES = 30
 # 老版本项目使用了 db, 则需参考 schema/tables.sql line 287 增加表字段
 ENABLE_GET_SUB_COMMENTS = False
 
+# 单个视频/帖子同时翻页抓取二级评论的一级评论数量，请求仍受平台限速和并发控制
+SUB_COMMENT_CONCURRENCY_NUM = 3
+
 # 词云相关
 # 是否开启生成评论词云图
 ENABLE_GET_WORDCLOUD = False
@@ -106,8 +136,145 @@ STOP_WORDS_FILE = "./docs/hit_stopwords.txt"
 # 中文字体文件路径
 FONT_PATH = "./docs/STZHONGS.TTF"
 
-# 爬取间隔时间
-CRAWLER_MAX_SLEEP_SEC = 5
+# 累计词频写入文件的最小间隔（秒），词云图在程序结束时生成
+WORD_FREQ_SAVE_INTERVAL = 10
+
+# 攒够多少条评论提交一次分词
+WORD_SEGMENT_BATCH_SIZE = 100
+
+# 文本分析（jieba 分词、词云渲染）子进程数量，建议不超过 CPU 核数
+ANALYSIS_WORKER_NUM = 2
+
+# ==================== HTTP 连接池配置 ====================
+# 每个代理出口（或直连）的最大连接数
+HTTP_POOL_MAX_CONNECTIONS = 100
+
+# 每个代理出口保持的最大长连接数
+HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS = 20
+
+# 空闲长连接的过期时间（秒）
+HTTP_POOL_KEEPALIVE_EXPIRY = 30
+
+# 同时保留的代理出口连接池数量，代理轮换后超出的旧连接池会被关闭
+HTTP_POOL_MAX_PROXY_CLIENTS = 4
+
+# ==================== 请求限速配置 ====================
+# 每个平台每个 host 每秒允许的请求数（令牌桶），同一平台的所有爬取任务共享，<= 0 表示不限速
+CRAWLER_REQUESTS_PER_SECOND = 1
+
+# 令牌桶容量，空闲一段时间后允许的突发请求数
+CRAWLER_RATE_LIMIT_BURST = 2
+
+# 每次请求额外等待的随机抖动，占请求间隔的比例
+CRAWLER_RATE_LIMIT_JITTER = 0.3
+
+# 单独配置的请求速率，键为 host 或平台名（host 优先），例如 {"edith.xiaohongshu.com": 2}
+# 微博对API的限流比较严重，所以默认速率低一些
+CRAWLER_RATE_LIMITS = {
+    "wb": 0.5,
+}
+
+# ==================== 自适应并发配置 ====================
+# 是否根据请求延迟和封禁信号（验证码、-412、超时等）自动调整并发数（AIMD），关闭时固定为 MAX_CONCURRENCY_NUM
+ENABLE_ADAPTIVE_CONCURRENCY = True
+
+# 并发数的下限和上限
+ADAPTIVE_CONCURRENCY_MIN = 1
+ADAPTIVE_CONCURRENCY_MAX = 8
+
+# 平均延迟超过最低延迟的该倍数时不再增加并发
+ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE = 2
+
+# 命中封禁信号或超时时，并发数乘以该系数
+ADAPTIVE_CONCURRENCY_DECREASE_FACTOR = 0.5
+
+# 两次减小并发之间的最短间隔（秒），避免同一波失败连续减半
+ADAPTIVE_CONCURRENCY_DECREASE_COOLDOWN = 5
+
+# ==================== 搜索流水线配置 ====================
+# 同时搜索的关键词数量，所有关键词共享平台的限速和并发控制，1 表示按顺序逐个搜索
+KEYWORD_CONCURRENCY_NUM = 3
+
+# 关键词搜索时详情、评论、媒体各阶段的 worker 数量，同时发出的请求数仍受平台自适应并发控制
+PIPELINE_DETAIL_WORKERS = 4
+PIPELINE_COMMENT_WORKERS = 4
+PIPELINE_MEDIA_WORKERS = 2
+
+# 每个阶段队列的最大长度，队列满时上游阶段等待（背压）
+PIPELINE_QUEUE_MAX_SIZE = 100
+
+# ==================== JS 签名进程池配置 ====================
+# 常驻 node 签名进程的数量（抖音 a_bogus、知乎 x-zse-96 等签名），建议不超过 CPU 核数
+JS_SIGN_WORKER_NUM = 2
+
+# 单次签名调用的超时时间（秒），超时的进程会被重启
+JS_SIGN_CALL_TIMEOUT = 10
+
+# ==================== JSONL 写入配置 ====================
+# 缓冲的记录数达到该值时写入磁盘
+JSONL_BUFFER_SIZE = 100
+
+# 距离上次写入磁盘超过该秒数时写入磁盘
+JSONL_FLUSH_INTERVAL = 1
+
+# ==================== CSV 写入配置 ====================
+# 缓冲的行数达到该值时写入磁盘
+CSV_BUFFER_SIZE = 100
+
+# 距离上次写入磁盘超过该秒数时写入磁盘
+CSV_FLUSH_INTERVAL = 1
+
+# ==================== Parquet 写入配置 ====================
+# 每个行组的行数，记录先写入临时 jsonl 文件，关闭时按行组转换为 parquet，需要安装 pyarrow
+# 进程崩溃留下的 .parquet.rows.jsonl 临时文件在下次写入同一目录时自动转换为 parquet
+PARQUET_ROW_GROUP_SIZE = 5000
+
+# 压缩算法，snappy | zstd | gzip | none
+PARQUET_COMPRESSION = "zstd"
+
+# ==================== 异步存储流水线配置 ====================
+# 是否开启 write-behind 存储：存储调用先进入队列，由后台任务批量写入，爬取不再等待磁盘/数据库
+ENABLE_STORE_WRITE_BEHIND = True
+
+# 存储队列的最大长度，队列满时爬取协程会等待（背压）
+STORE_QUEUE_MAX_SIZE = 1000
+
+# 后台任务单批写入的最大存储调用数
+STORE_FLUSH_BATCH_SIZE = 50
+
+# 后台任务攒批的最长等待时间（秒）
+STORE_FLUSH_INTERVAL = 1
+
+# ==================== 断点续爬配置 ====================
+# 是否记录爬取断点：关键词翻页位置、创作者翻页游标、帖子评论游标、B站按天搜索的位置
+ENABLE_CRAWL_CHECKPOINT = True
+
+# 是否从上次记录的断点继续爬取，也可以用命令行参数 --resume 开启；不续爬时启动会清空当前平台的断点
+ENABLE_RESUME = False
+
+# 断点数据库文件路径
+CRAWL_CHECKPOINT_DB_PATH = "data/crawl_checkpoint.db"
+
+# ==================== 已爬取内容去重配置 ====================
+# 是否记录已经爬取过的帖子/视频详情和评论，并在发出详情、评论请求前查询
+ENABLE_SEEN_INDEX = True
+
+# 遇到已经爬取过的内容时的策略：always(总是重新爬取，只记录) | skip(跳过) | refresh(超过 SEEN_INDEX_REFRESH_SECONDS 才重新爬取)
+# 默认 always 与不开启去重时的爬取行为一致；增量爬取或 --resume 续爬时可以改为 skip / refresh，跳过已经爬取过的内容
+SEEN_INDEX_POLICY = "always"
+
+# refresh 策略下重新爬取的间隔（秒）
+SEEN_INDEX_REFRESH_SECONDS = 24 * 60 * 60
+
+# 去重索引数据库文件路径
+SEEN_INDEX_DB_PATH = "data/seen_index.db"
+
+# 已爬取标记写入索引的间隔（秒），写入前先等待存储把数据落盘
+SEEN_INDEX_COMMIT_INTERVAL = 5
+
+# 每个平台每类内容的布隆过滤器预计容量和误判率，误判的内容会再查一次数据库，不会被错误跳过
+SEEN_INDEX_BLOOM_CAPACITY = 1000000
+SEEN_INDEX_BLOOM_ERROR_RATE = 0.001
 
 from .bilibili_config import *
 from .xhs_config import *
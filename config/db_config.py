@@ -25,9 +25,27 @@ REDIS_DB_PWD = os.getenv("REDIS_DB_PWD", "123456")  # your redis password
 REDIS_DB_PORT = os.getenv("REDIS_DB_PORT", 6379)  # your redis port
 REDIS_DB_NUM = os.getenv("REDIS_DB_NUM", 0)  # your redis db num
 
+# 异步 redis 缓存连接池的最大连接数
+REDIS_MAX_CONNECTIONS = 20
+
+# 异步 redis 缓存值的序列化方式，json | msgpack | pickle，msgpack 需要安装 msgpack
+REDIS_CACHE_SERIALIZER = "json"
+
+# SCAN 遍历键时每批返回的数量
+REDIS_SCAN_COUNT = 1000
+
 # cache type
 CACHE_TYPE_REDIS = "redis"
 CACHE_TYPE_MEMORY = "memory"
 
 # sqlite config
-SQLITE_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "schema", "sqlite_tables.db")
\ No newline at end of file
+SQLITE_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "schema", "sqlite_tables.db")
+
+# sqlite 写入事务中累积的写语句数量达到该值时提交
+SQLITE_COMMIT_BATCH_SIZE = 200
+
+# sqlite 写入事务最长的提交间隔（秒）
+SQLITE_COMMIT_INTERVAL = 1
+
+# sqlite 页缓存大小（MB）
+SQLITE_CACHE_SIZE_MB = 64
@@ -14,7 +14,7 @@
 # @Time    : 2024/4/6 14:54
 # @Desc    : mediacrawler db 管理
 import asyncio
-from typing import Dict
+from typing import Dict, List, Tuple, Union
 from urllib.parse import urlparse
 
 import aiofiles
@@ -27,6 +27,48 @@ from tools import utils
 from var import db_conn_pool_var, media_crawler_db_var
 
 
+# upsert 依赖的唯一索引：表名 -> (索引名, 唯一键字段)，与 schema/tables.sql、schema/sqlite_tables.sql 保持一致
+UPSERT_UNIQUE_INDEXES: Dict[str, Tuple[str, List[str]]] = {
+    "bilibili_video": ("idx_bilibili_vi_video_i_31c36e", ["video_id"]),
+    "bilibili_video_comment": ("idx_bilibili_vi_comment_41c34e", ["comment_id"]),
+    "bilibili_up_info": ("idx_bilibili_vi_user_123456", ["user_id"]),
+    "bilibili_contact_info": ("idx_bilibili_contact_info_up_id_fan_id", ["up_id", "fan_id"]),
+    "bilibili_up_dynamic": ("idx_bilibili_up_dynamic_dynamic_id", ["dynamic_id"]),
+    "douyin_aweme": ("idx_douyin_awem_aweme_i_6f7bc6", ["aweme_id"]),
+    "douyin_aweme_comment": ("idx_douyin_awem_comment_fcd7e4", ["comment_id"]),
+    "dy_creator": ("idx_dy_creator_user_id", ["user_id"]),
+    "kuaishou_video": ("idx_kuaishou_vi_video_i_c5c6a6", ["video_id"]),
+    "kuaishou_video_comment": ("idx_kuaishou_vi_comment_ed48fa", ["comment_id"]),
+    "weibo_note": ("idx_weibo_note_note_id_f95b1a", ["note_id"]),
+    "weibo_note_comment": ("idx_weibo_note__comment_c7611c", ["comment_id"]),
+    "weibo_creator": ("idx_weibo_creator_user_id", ["user_id"]),
+    "xhs_creator": ("idx_xhs_creator_user_id", ["user_id"]),
+    "xhs_note": ("idx_xhs_note_note_id_209457", ["note_id"]),
+    "xhs_note_comment": ("idx_xhs_note_co_comment_8e8349", ["comment_id"]),
+    "tieba_note": ("idx_tieba_note_note_id", ["note_id"]),
+    "tieba_comment": ("idx_tieba_comment_comment_id", ["comment_id"]),
+    "tieba_creator": ("idx_tieba_creator_user_id", ["user_id"]),
+    "zhihu_content": ("idx_zhihu_content_content_id", ["content_id"]),
+    "zhihu_comment": ("idx_zhihu_comment_comment_id", ["comment_id"]),
+    "zhihu_creator": ("idx_zhihu_creator_user_id", ["user_id"]),
+}
+
+
+async def migrate_unique_indexes(async_db_obj: Union[AsyncMysqlDB, AsyncSqliteDB]):
+    """
+    给旧版本建的表补上 upsert 依赖的唯一索引，已有的重复记录只保留最后写入的一条。
+    没有唯一索引时 SQLite 的 upsert 会直接报错，MySQL 则会不断写入重复记录
+    Args:
+        async_db_obj: 数据库对象
+
+    Returns:
+
+    """
+    for table_name, (index_name, unique_fields) in UPSERT_UNIQUE_INDEXES.items():
+        if await async_db_obj.ensure_unique_index(table_name, index_name, unique_fields):
+            utils.logger.info(f"[migrate_unique_indexes] deduplicated {table_name} and added unique index {index_name}")
+
+
 async def init_mediacrawler_db():
     """
     初始化数据库链接池对象，并将该对象塞给media_crawler_db_var上下文变量
@@ -54,7 +96,12 @@ async def init_sqlite_db():
     Returns:
 
     """
-    async_db_obj = AsyncSqliteDB(config.SQLITE_DB_PATH)
+    async_db_obj = AsyncSqliteDB(
+        config.SQLITE_DB_PATH,
+        commit_batch_size=config.SQLITE_COMMIT_BATCH_SIZE,
+        commit_interval=config.SQLITE_COMMIT_INTERVAL,
+        cache_size_mb=config.SQLITE_CACHE_SIZE_MB,
+    )
     
     # 将SQLite数据库对象放到上下文变量中
     media_crawler_db_var.set(async_db_obj)
@@ -73,6 +120,7 @@ async def init_db():
     else:
         await init_mediacrawler_db()
         utils.logger.info("[init_db] end init mysql db connect object")
+    await migrate_unique_indexes(media_crawler_db_var.get())
 
 
 async def close():
@@ -83,8 +131,11 @@ async def close():
     """
     utils.logger.info("[close] close mediacrawler db connection")
     if config.SAVE_DATA_OPTION == "sqlite":
-        # SQLite数据库连接会在AsyncSqliteDB对象销毁时自动关闭
-        utils.logger.info("[close] sqlite db connection will be closed automatically")
+        # 提交未提交的写入事务并关闭长连接
+        async_db_obj: AsyncSqliteDB = media_crawler_db_var.get(None)
+        if async_db_obj is not None:
+            await async_db_obj.close()
+            utils.logger.info("[close] sqlite db connection closed")
     else:
         # MySQL连接池关闭
         db_pool: aiomysql.Pool = db_conn_pool_var.get()
@@ -132,6 +183,7 @@ async def init_table_schema(db_type: str = None):
             schema_sql = await f.read()
             await async_db_obj.executescript(schema_sql)
             utils.logger.info("[init_table_schema] sqlite table schema init successful")
+            await async_db_obj.close()
     elif db_type == "mysql":
         utils.logger.info("[init_table_schema] begin init mysql table schema ...")
         await init_mediacrawler_db()
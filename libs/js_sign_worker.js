@@ -0,0 +1,39 @@
+// 常驻签名进程：启动时加载一次签名脚本（如 libs/douyin.js、libs/zhihu.js），
+// 之后通过 stdin/stdout 按行收发 JSON 请求，避免每次签名都重新拉起 node 进程并重新解析脚本
+// 请求格式：{"id": 1, "fn": "sign_datail", "args": ["...", "..."]}
+// 响应格式：{"id": 1, "result": "..."} 或 {"id": 1, "error": "..."}
+const fs = require('fs');
+const readline = require('readline');
+const vm = require('vm');
+
+const scriptPath = process.argv[2];
+const FN_NAME_PATTERN = /^[A-Za-z_$][\w$]*$/;
+
+// stdout 只用于回传签名结果，签名脚本里的日志统一打到 stderr
+console.log = console.error;
+global.require = require;
+
+const source = fs.readFileSync(scriptPath, 'utf-8').replace(/^\uFEFF/, '');
+vm.runInThisContext(source, {filename: scriptPath});
+
+function handle(line) {
+    const req = JSON.parse(line);
+    try {
+        if (!FN_NAME_PATTERN.test(req.fn)) {
+            throw new Error(`invalid function name: ${req.fn}`);
+        }
+        const fn = vm.runInThisContext(req.fn);
+        return {id: req.id, result: fn.apply(null, req.args || [])};
+    } catch (e) {
+        return {id: req.id, error: String(e)};
+    }
+}
+
+const rl = readline.createInterface({input: process.stdin, terminal: false});
+rl.on('line', (line) => {
+    if (!line.trim()) {
+        return;
+    }
+    process.stdout.write(JSON.stringify(handle(line)) + '\n');
+});
+rl.on('close', () => process.exit(0));
@@ -24,6 +24,13 @@ from media_platform.tieba import TieBaCrawler
 from media_platform.weibo import WeiboCrawler
 from media_platform.xhs import XiaoHongShuCrawler
 from media_platform.zhihu import ZhihuCrawler
+from store.store_registry import close_all_stores
+from store.write_behind import StoreWriteError, close_store_pipeline
+from tools.analysis_executor import close_analysis_executor
+from tools.async_file_writer import close_all_writers
+from tools.crawl_checkpoint import close_crawl_checkpoint, init_crawl_checkpoint
+from tools.js_sign_pool import close_js_sign_pools
+from tools.seen_index import close_seen_index
 
 
 class CrawlerFactory:
@@ -61,16 +68,39 @@ async def main():
     if config.SAVE_DATA_OPTION in ["db", "sqlite"]:
         await db.init_db()
 
+    # 不续爬时清空上次留下的断点
+    await init_crawl_checkpoint(config.PLATFORM)
+
     crawler = CrawlerFactory.create_crawler(platform=config.PLATFORM)
-    await crawler.start()
+    store_error: Optional[StoreWriteError] = None
+    try:
+        await crawler.start()
+    finally:
+        # 先写完存储队列中排队的数据，再关闭文件和数据库
+        try:
+            await close_store_pipeline()
+        except StoreWriteError as e:
+            store_error = e
+        await close_all_stores()
+        await close_analysis_executor()
+        # 落盘 jsonl 写入器中缓冲的数据
+        await close_all_writers()
+        await close_crawl_checkpoint()
+        await close_seen_index()
+        # 关闭抖音、知乎共享的 node 签名进程池
+        await close_js_sign_pools()
+        # 数据库对象保存在当前任务的上下文变量中，需要在同一个事件循环里提交并关闭
+        if config.SAVE_DATA_OPTION in ["db", "sqlite"]:
+            await db.close()
+    # 有数据写入失败时以非零状态退出
+    if store_error is not None:
+        raise store_error
 
 
 def cleanup():
     if crawler:
         # asyncio.run(crawler.close())
         pass
-    if config.SAVE_DATA_OPTION in ["db", "sqlite"]:
-        asyncio.run(db.close())
 
 
 if __name__ == "__main__":
@@ -24,7 +24,10 @@ from playwright.async_api import BrowserContext, Page
 
 import config
 from base.base_crawler import AbstractApiClient
+from proxy.proxy_rotation import ProxyRotator, is_blocked_json_code
 from tools import utils
+from tools.crawl_pipeline import gather_with_limit
+from tools.http_client import AsyncHttpClientPool
 
 from .exception import DataFetchError
 from .field import CommentOrderType, SearchOrderType
@@ -37,6 +40,7 @@ class BilibiliClient(AbstractApiClient):
             timeout=10,
             proxies=None,
             *,
+            proxy_rotator: Optional[ProxyRotator] = None,
             headers: Dict[str, str],
             playwright_page: Page,
             cookie_dict: Dict[str, str],
@@ -47,13 +51,35 @@ class BilibiliClient(AbstractApiClient):
         self._host = "https://api.bilibili.com"
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
+        self._http_pool = AsyncHttpClientPool(
+            platform="bili", proxy_rotator=proxy_rotator, is_blocked=self.is_blocked_response
+        )
+
+    @staticmethod
+    def is_blocked_response(response: httpx.Response) -> bool:
+        """
+        B站的封禁信号：HTTP 412 或者 code 为 -412（请求被风控拦截）
+        Args:
+            response: 响应
+
+        Returns:
+
+        """
+        return response.status_code == 412 or is_blocked_json_code(response, -412)
+
+    async def close(self):
+        """
+        关闭客户端持有的 HTTP 连接池
+        Returns:
+
+        """
+        await self._http_pool.aclose()
 
     async def request(self, method, url, **kwargs) -> Any:
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request(
-                method, url, timeout=self.timeout,
-                **kwargs
-            )
+        response = await self._http_pool.request(
+            method, url, proxies=self.proxies, timeout=self.timeout,
+            **kwargs
+        )
         try:
             data: Dict = response.json()
         except json.JSONDecodeError:
@@ -202,13 +228,13 @@ class BilibiliClient(AbstractApiClient):
         return await self.get(uri, params, enable_params_sign=True)
 
     async def get_video_media(self, url: str) -> Union[bytes, None]:
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request("GET", url, timeout=self.timeout, headers=self.headers)
-            if not response.reason_phrase == "OK":
-                utils.logger.error(f"[BilibiliClient.get_video_media] request {url} err, res:{response.text}")
-                return None
-            else:
-                return response.content
+        response = await self._http_pool.request("GET", url, proxies=self.proxies, timeout=self.timeout,
+                                                 headers=self.headers)
+        if not response.reason_phrase == "OK":
+            utils.logger.error(f"[BilibiliClient.get_video_media] request {url} err, res:{response.text}")
+            return None
+        else:
+            return response.content
 
     async def get_video_comments(self,
                                  video_id: str,
@@ -231,9 +257,10 @@ class BilibiliClient(AbstractApiClient):
         }
         return await self.get(uri, post_data)
 
-    async def get_video_all_comments(self, video_id: str, crawl_interval: float = 1.0, is_fetch_sub_comments=False,
+    async def get_video_all_comments(self, video_id: str, crawl_interval: float = 0, is_fetch_sub_comments=False,
                                      callback: Optional[Callable] = None,
-                                     max_count: int = 10,):
+                                     max_count: int = 10,
+                                     finished_callback: Optional[Callable] = None,):
         """
         get video all comments include sub comments
         :param video_id:
@@ -241,6 +268,7 @@ class BilibiliClient(AbstractApiClient):
         :param is_fetch_sub_comments:
         :param callback:
         max_count: 一次笔记爬取的最大评论数量
+        finished_callback: 评论翻页正常结束（没有更多评论或达到最大数量）后的回调，请求失败或响应异常提前结束时不调用
 
         :return:
         """
@@ -289,13 +317,15 @@ class BilibiliClient(AbstractApiClient):
                 utils.logger.warning(f"[BilibiliClient.get_video_all_comments] 'is_end' is not a boolean for video_id: {video_id}. Assuming end of comments.")
                 is_end = True
             if is_fetch_sub_comments:
-                for comment in comment_list:
-                    comment_id = comment['rpid']
-                    if (comment.get("rcount", 0) > 0):
-                        {
-                            await self.get_video_all_level_two_comments(
-                                video_id, comment_id, CommentOrderType.DEFAULT, 10, crawl_interval,  callback)
-                        }
+                # 每条一级评论的二级评论翻页互不依赖，同一视频内最多 SUB_COMMENT_CONCURRENCY_NUM 条并发翻页
+                await gather_with_limit(
+                    [
+                        self.get_video_all_level_two_comments(
+                            video_id, comment['rpid'], CommentOrderType.DEFAULT, 10, crawl_interval, callback)
+                        for comment in comment_list if comment.get("rcount", 0) > 0
+                    ],
+                    config.SUB_COMMENT_CONCURRENCY_NUM,
+                )
             if len(result) + len(comment_list) > max_count:
                 comment_list = comment_list[:max_count - len(result)]
             if callback:  # 如果有回调函数，就执行回调函数
@@ -304,6 +334,10 @@ class BilibiliClient(AbstractApiClient):
             if not is_fetch_sub_comments:
                 result.extend(comment_list)
                 continue
+        else:
+            # 循环没有因为请求失败或响应异常 break
+            if finished_callback:
+                await finished_callback()
         return result
 
     async def get_video_all_level_two_comments(self,
@@ -311,7 +345,7 @@ class BilibiliClient(AbstractApiClient):
                                                level_one_comment_id: int,
                                                order_mode: CommentOrderType,
                                                ps: int = 10,
-                                               crawl_interval: float = 1.0,
+                                               crawl_interval: float = 0,
                                                callback: Optional[Callable] = None,
                                                ) -> Dict:
         """
@@ -452,7 +486,7 @@ class BilibiliClient(AbstractApiClient):
 
         return await self.get(uri, post_data)
 
-    async def get_creator_all_fans(self, creator_info: Dict, crawl_interval: float = 1.0,
+    async def get_creator_all_fans(self, creator_info: Dict, crawl_interval: float = 0,
                                    callback: Optional[Callable] = None,
                                    max_count: int = 100) -> List:
         """
@@ -482,7 +516,7 @@ class BilibiliClient(AbstractApiClient):
             result.extend(fans_list)
         return result
 
-    async def get_creator_all_followings(self, creator_info: Dict, crawl_interval: float = 1.0,
+    async def get_creator_all_followings(self, creator_info: Dict, crawl_interval: float = 0,
                                          callback: Optional[Callable] = None,
                                          max_count: int = 100) -> List:
         """
@@ -512,7 +546,7 @@ class BilibiliClient(AbstractApiClient):
             result.extend(followings_list)
         return result
 
-    async def get_creator_all_dynamics(self, creator_info: Dict, crawl_interval: float = 1.0,
+    async def get_creator_all_dynamics(self, creator_info: Dict, crawl_interval: float = 0,
                                        callback: Optional[Callable] = None,
                                        max_count: int = 20) -> List:
         """
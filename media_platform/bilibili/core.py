@@ -16,8 +16,8 @@
 
 import asyncio
 import os
-import random
 from asyncio import Task
+from functools import partial
 from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
 import pandas as pd
@@ -34,10 +34,21 @@ from playwright._impl._errors import TargetClosedError
 import config
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_rotation import ProxyRotator
 from store import bilibili as bilibili_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from tools.concurrency_limiter import AdaptiveConcurrencyLimiter, get_concurrency_limiter
+from tools.crawl_checkpoint import (
+    CHECKPOINT_SCOPE_SEARCH,
+    CHECKPOINT_SCOPE_SEARCH_BY_DAY,
+    PipelineCheckpointCommitter,
+    get_checkpoint_store,
+)
+from tools.crawl_pipeline import CrawlPipeline, PipelineBatch, PipelineStage
+from tools.keyword_runner import run_keywords
+from tools.seen_index import SEEN_ITEM_COMMENTS, SEEN_ITEM_DETAIL, get_seen_index
+from var import crawler_type_var
 
 from .client import BilibiliClient
 from .exception import DataFetchError
@@ -55,6 +66,7 @@ class BilibiliCrawler(AbstractCrawler):
         self.index_url = "https://www.bilibili.com"
         self.user_agent = utils.get_user_agent()
         self.cdp_manager = None
+        self.proxy_rotator: Optional[ProxyRotator] = None
 
     async def start(self):
         playwright_proxy_format, httpx_proxy_format = None, None
@@ -63,6 +75,7 @@ class BilibiliCrawler(AbstractCrawler):
                 config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
             )
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            self.proxy_rotator = ProxyRotator(ip_proxy_pool, ip_proxy_info)
             playwright_proxy_format, httpx_proxy_format = self.format_proxy_info(
                 ip_proxy_info
             )
@@ -118,6 +131,10 @@ class BilibiliCrawler(AbstractCrawler):
                     await self.get_all_creator_details(config.BILI_CREATOR_ID_LIST)
             else:
                 pass
+            # 释放 API 客户端持有的 HTTP 长连接
+            await self.bili_client.close()
+            if self.proxy_rotator is not None:
+                await self.proxy_rotator.close()
             utils.logger.info("[BilibiliCrawler.start] Bilibili Crawler finished ...")
 
     async def search(self):
@@ -184,64 +201,111 @@ class BilibiliCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < bili_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = bili_limit_count
         start_page = config.START_PAGE  # start page number
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
-            utils.logger.info(
-                f"[BilibiliCrawler.search_by_keywords] Current search keyword: {keyword}"
-            )
-            page = 1
-            while (
-                page - start_page + 1
-            ) * bili_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
+        semaphore = get_concurrency_limiter("bili")
+        checkpoint_store = get_checkpoint_store()
+        seen_index = get_seen_index()
+        async with CrawlPipeline("bili.search") as pipeline:
+            # 搜索翻页 -> 详情 -> 评论 / 视频，下一页的搜索与上一页的详情、评论同时进行
+            comment_stage, media_stage = self.add_video_stages(pipeline, semaphore)
+
+            async def fetch_video_detail(aid: int) -> None:
+                # 详情已经爬取过时评论仍然交给评论阶段，由评论阶段查询自己的去重索引
+                if not await seen_index.should_crawl("bili", SEEN_ITEM_DETAIL, aid):
+                    if config.ENABLE_GET_COMMENTS:
+                        await comment_stage.put(aid)
+                    return
+                video_item = await self.get_video_info_task(aid=aid, bvid="", semaphore=semaphore)
+                if not video_item:
+                    # 抛出异常让这一页的批次失败，断点停在这一页，续爬时重新获取
+                    raise DataFetchError(f"get video detail failed, aid: {aid}")
+                await self.save_video_and_dispatch(video_item, comment_stage, media_stage)
+
+            detail_stage = pipeline.add_stage("detail", fetch_video_detail, config.PIPELINE_DETAIL_WORKERS)
+
+            async def search_keyword(keyword: str) -> int:
+                video_count = 0
+                checkpoint = await checkpoint_store.load("bili", CHECKPOINT_SCOPE_SEARCH, keyword)
+                if checkpoint and checkpoint.get("finished"):
+                    return video_count
+                page = checkpoint["page"] if checkpoint else 1
+                committer = PipelineCheckpointCommitter(checkpoint_store, "bili", CHECKPOINT_SCOPE_SEARCH, keyword)
+                while (
+                    page - start_page + 1
+                ) * bili_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
+                    if page < start_page:
+                        utils.logger.info(
+                            f"[BilibiliCrawler.search_by_keywords] Skip page: {page}"
+                        )
+                        page += 1
+                        continue
+
                     utils.logger.info(
-                        f"[BilibiliCrawler.search_by_keywords] Skip page: {page}"
+                        f"[BilibiliCrawler.search_by_keywords] search bilibili keyword: {keyword}, page: {page}"
                     )
+                    videos_res = await self.bili_client.search_video_by_keyword(
+                        keyword=keyword,
+                        page=page,
+                        page_size=bili_limit_count,
+                        order=SearchOrderType.DEFAULT,
+                        pubtime_begin_s=0,  # 作品发布日期起始时间戳
+                        pubtime_end_s=0,  # 作品发布日期结束日期时间戳
+                    )
+                    video_list: List[Dict] = videos_res.get("result")
+
+                    if not video_list:
+                        utils.logger.info(
+                            f"[BilibiliCrawler.search_by_keywords] No more videos for '{keyword}', moving to next keyword."
+                        )
+                        break
+
+                    page_batch = PipelineBatch()
+                    with page_batch:
+                        for video_item in video_list:
+                            await detail_stage.put(video_item.get("aid"))
+                    video_count += len(video_list)
                     page += 1
-                    continue
+                    # 这一页的视频在流水线中处理完后才提交下一页的位置
+                    await committer.add(page_batch, {"page": page})
+                if await committer.drain():
+                    await checkpoint_store.finish("bili", CHECKPOINT_SCOPE_SEARCH, keyword)
+                return video_count
 
-                utils.logger.info(
-                    f"[BilibiliCrawler.search_by_keywords] search bilibili keyword: {keyword}, page: {page}"
-                )
-                video_id_list: List[str] = []
-                videos_res = await self.bili_client.search_video_by_keyword(
-                    keyword=keyword,
-                    page=page,
-                    page_size=bili_limit_count,
-                    order=SearchOrderType.DEFAULT,
-                    pubtime_begin_s=0,  # 作品发布日期起始时间戳
-                    pubtime_end_s=0,  # 作品发布日期结束日期时间戳
-                )
-                video_list: List[Dict] = videos_res.get("result")
+            await run_keywords("BilibiliCrawler.search_by_keywords", search_keyword)
 
-                if not video_list:
-                    utils.logger.info(
-                        f"[BilibiliCrawler.search_by_keywords] No more videos for '{keyword}', moving to next keyword."
-                    )
-                    break
-
-                semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-                task_list = []
-                try:
-                    task_list = [
-                        self.get_video_info_task(
-                            aid=video_item.get("aid"), bvid="", semaphore=semaphore
-                        )
-                        for video_item in video_list
-                    ]
-                except Exception as e:
-                    utils.logger.warning(
-                        f"[BilibiliCrawler.search_by_keywords] error in the task list. The video for this page will not be included. {e}"
-                    )
-                video_items = await asyncio.gather(*task_list)
-                for video_item in video_items:
-                    if video_item:
-                        video_id_list.append(video_item.get("View").get("aid"))
-                        await bilibili_store.update_bilibili_video(video_item)
-                        await bilibili_store.update_up_info(video_item)
-                        await self.get_bilibili_video(video_item, semaphore)
-                page += 1
-                await self.batch_get_video_comments(video_id_list)
+    def add_video_stages(
+        self, pipeline: CrawlPipeline, semaphore: AdaptiveConcurrencyLimiter
+    ) -> Tuple[PipelineStage, PipelineStage]:
+        """
+        add comment and video download stages to the search pipeline
+        :param pipeline:
+        :param semaphore:
+        :return: comment stage, media stage
+        """
+        comment_stage = pipeline.add_stage(
+            "comment", partial(self.get_comments, semaphore=semaphore), config.PIPELINE_COMMENT_WORKERS
+        )
+        media_stage = pipeline.add_stage(
+            "media", partial(self.get_bilibili_video, semaphore=semaphore), config.PIPELINE_MEDIA_WORKERS
+        )
+        return comment_stage, media_stage
+
+    async def save_video_and_dispatch(
+        self, video_item: Dict, comment_stage: PipelineStage, media_stage: PipelineStage
+    ):
+        """
+        save video detail, then dispatch comment and video download to the pipeline
+        :param video_item:
+        :param comment_stage:
+        :param media_stage:
+        :return:
+        """
+        await bilibili_store.update_bilibili_video(video_item)
+        await bilibili_store.update_up_info(video_item)
+        await get_seen_index().mark_crawled("bili", SEEN_ITEM_DETAIL, video_item.get("View").get("aid"))
+        if config.ENABLE_GET_IMAGES:
+            await media_stage.put(video_item)
+        if config.ENABLE_GET_COMMENTS:
+            await comment_stage.put(video_item.get("View").get("aid"))
 
     async def search_by_keywords_in_time_range(self, daily_limit: bool):
         """
@@ -254,125 +318,162 @@ class BilibiliCrawler(AbstractCrawler):
         bili_limit_count = 20
         start_page = config.START_PAGE
 
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
-            utils.logger.info(
-                f"[BilibiliCrawler.search_by_keywords_in_time_range] Current search keyword: {keyword}"
-            )
-            total_notes_crawled_for_keyword = 0
-
-            for day in pd.date_range(
-                start=config.START_DAY, end=config.END_DAY, freq="D"
-            ):
-                if (
-                    daily_limit
-                    and total_notes_crawled_for_keyword
-                    >= config.CRAWLER_MAX_NOTES_COUNT
-                ):
-                    utils.logger.info(
-                        f"[BilibiliCrawler.search] Reached CRAWLER_MAX_NOTES_COUNT limit for keyword '{keyword}', skipping remaining days."
-                    )
-                    break
-
-                if (
-                    not daily_limit
-                    and total_notes_crawled_for_keyword
-                    >= config.CRAWLER_MAX_NOTES_COUNT
-                ):
-                    utils.logger.info(
-                        f"[BilibiliCrawler.search] Reached CRAWLER_MAX_NOTES_COUNT limit for keyword '{keyword}', skipping remaining days."
-                    )
-                    break
-
-                pubtime_begin_s, pubtime_end_s = await self.get_pubtime_datetime(
-                    start=day.strftime("%Y-%m-%d"), end=day.strftime("%Y-%m-%d")
+        semaphore = get_concurrency_limiter("bili")
+        checkpoint_store = get_checkpoint_store()
+        async with CrawlPipeline("bili.search_in_time_range") as pipeline:
+            # 详情需要按天计数，仍然在翻页中获取，评论和视频下载交给流水线与后续翻页同时进行
+            comment_stage, media_stage = self.add_video_stages(pipeline, semaphore)
+
+            async def search_keyword(keyword: str) -> int:
+                checkpoint = await checkpoint_store.load("bili", CHECKPOINT_SCOPE_SEARCH_BY_DAY, keyword) or {}
+                if checkpoint.get("finished"):
+                    return 0
+                total_notes_crawled_for_keyword = checkpoint.get("total", 0)
+                committer = PipelineCheckpointCommitter(
+                    checkpoint_store, "bili", CHECKPOINT_SCOPE_SEARCH_BY_DAY, keyword
                 )
-                page = 1
-                notes_count_this_day = 0
+                # 某一天出错后继续爬取后面的日期，但不再提交断点，续爬时从出错的那一天继续
+                search_failed = False
 
-                while True:
-                    if notes_count_this_day >= config.MAX_NOTES_PER_DAY:
-                        utils.logger.info(
-                            f"[BilibiliCrawler.search] Reached MAX_NOTES_PER_DAY limit for {day.ctime()}."
-                        )
-                        break
+                for day in pd.date_range(
+                    start=config.START_DAY, end=config.END_DAY, freq="D"
+                ):
+                    day_str = day.strftime("%Y-%m-%d")
+                    # 续爬时跳过断点之前以及断点当天已经爬完的日期
+                    if checkpoint and (
+                        day_str < checkpoint["day"]
+                        or (day_str == checkpoint["day"] and checkpoint.get("day_finished"))
+                    ):
+                        continue
                     if (
                         daily_limit
                         and total_notes_crawled_for_keyword
                         >= config.CRAWLER_MAX_NOTES_COUNT
                     ):
                         utils.logger.info(
-                            f"[BilibiliCrawler.search] Reached CRAWLER_MAX_NOTES_COUNT limit for keyword '{keyword}'."
+                            f"[BilibiliCrawler.search] Reached CRAWLER_MAX_NOTES_COUNT limit for keyword '{keyword}', skipping remaining days."
                         )
                         break
+
                     if (
                         not daily_limit
                         and total_notes_crawled_for_keyword
                         >= config.CRAWLER_MAX_NOTES_COUNT
                     ):
-                        break
-
-                    try:
                         utils.logger.info(
-                            f"[BilibiliCrawler.search] search bilibili keyword: {keyword}, date: {day.ctime()}, page: {page}"
-                        )
-                        video_id_list: List[str] = []
-                        videos_res = await self.bili_client.search_video_by_keyword(
-                            keyword=keyword,
-                            page=page,
-                            page_size=bili_limit_count,
-                            order=SearchOrderType.DEFAULT,
-                            pubtime_begin_s=pubtime_begin_s,
-                            pubtime_end_s=pubtime_end_s,
+                            f"[BilibiliCrawler.search] Reached CRAWLER_MAX_NOTES_COUNT limit for keyword '{keyword}', skipping remaining days."
                         )
-                        video_list: List[Dict] = videos_res.get("result")
+                        break
 
-                        if not video_list:
+                    pubtime_begin_s, pubtime_end_s = await self.get_pubtime_datetime(
+                        start=day_str, end=day_str
+                    )
+                    resume_this_day = checkpoint.get("day") == day_str
+                    page = checkpoint["page"] if resume_this_day else 1
+                    notes_count_this_day = checkpoint["day_count"] if resume_this_day else 0
+
+                    while True:
+                        if notes_count_this_day >= config.MAX_NOTES_PER_DAY:
+                            utils.logger.info(
+                                f"[BilibiliCrawler.search] Reached MAX_NOTES_PER_DAY limit for {day.ctime()}."
+                            )
+                            break
+                        if (
+                            daily_limit
+                            and total_notes_crawled_for_keyword
+                            >= config.CRAWLER_MAX_NOTES_COUNT
+                        ):
                             utils.logger.info(
-                                f"[BilibiliCrawler.search] No more videos for '{keyword}' on {day.ctime()}, moving to next day."
+                                f"[BilibiliCrawler.search] Reached CRAWLER_MAX_NOTES_COUNT limit for keyword '{keyword}'."
                             )
                             break
+                        if (
+                            not daily_limit
+                            and total_notes_crawled_for_keyword
+                            >= config.CRAWLER_MAX_NOTES_COUNT
+                        ):
+                            break
 
-                        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-                        task_list = [
-                            self.get_video_info_task(
-                                aid=video_item.get("aid"), bvid="", semaphore=semaphore
+                        try:
+                            utils.logger.info(
+                                f"[BilibiliCrawler.search] search bilibili keyword: {keyword}, date: {day.ctime()}, page: {page}"
+                            )
+                            videos_res = await self.bili_client.search_video_by_keyword(
+                                keyword=keyword,
+                                page=page,
+                                page_size=bili_limit_count,
+                                order=SearchOrderType.DEFAULT,
+                                pubtime_begin_s=pubtime_begin_s,
+                                pubtime_end_s=pubtime_end_s,
+                            )
+                            video_list: List[Dict] = videos_res.get("result")
+
+                            if not video_list:
+                                utils.logger.info(
+                                    f"[BilibiliCrawler.search] No more videos for '{keyword}' on {day.ctime()}, moving to next day."
+                                )
+                                break
+
+                            task_list = [
+                                self.get_video_info_task(
+                                    aid=video_item.get("aid"), bvid="", semaphore=semaphore
+                                )
+                                for video_item in video_list
+                            ]
+                            video_items = await asyncio.gather(*task_list)
+
+                            page_batch = PipelineBatch()
+                            for video_item in video_items:
+                                if video_item:
+                                    if (
+                                        daily_limit
+                                        and total_notes_crawled_for_keyword
+                                        >= config.CRAWLER_MAX_NOTES_COUNT
+                                    ):
+                                        break
+                                    if (
+                                        not daily_limit
+                                        and total_notes_crawled_for_keyword
+                                        >= config.CRAWLER_MAX_NOTES_COUNT
+                                    ):
+                                        break
+                                    if notes_count_this_day >= config.MAX_NOTES_PER_DAY:
+                                        break
+                                    notes_count_this_day += 1
+                                    total_notes_crawled_for_keyword += 1
+                                    with page_batch:
+                                        await self.save_video_and_dispatch(video_item, comment_stage, media_stage)
+
+                            page += 1
+                            if search_failed:
+                                continue
+                            # 这一页视频的评论、视频下载在流水线中处理完后才提交下一页的位置
+                            await committer.add(
+                                page_batch,
+                                {
+                                    "day": day_str,
+                                    "page": page,
+                                    "day_count": notes_count_this_day,
+                                    "total": total_notes_crawled_for_keyword,
+                                },
                             )
-                            for video_item in video_list
-                        ]
-                        video_items = await asyncio.gather(*task_list)
-
-                        for video_item in video_items:
-                            if video_item:
-                                if (
-                                    daily_limit
-                                    and total_notes_crawled_for_keyword
-                                    >= config.CRAWLER_MAX_NOTES_COUNT
-                                ):
-                                    break
-                                if (
-                                    not daily_limit
-                                    and total_notes_crawled_for_keyword
-                                    >= config.CRAWLER_MAX_NOTES_COUNT
-                                ):
-                                    break
-                                if notes_count_this_day >= config.MAX_NOTES_PER_DAY:
-                                    break
-                                notes_count_this_day += 1
-                                total_notes_crawled_for_keyword += 1
-                                video_id_list.append(video_item.get("View").get("aid"))
-                                await bilibili_store.update_bilibili_video(video_item)
-                                await bilibili_store.update_up_info(video_item)
-                                await self.get_bilibili_video(video_item, semaphore)
 
-                        page += 1
-                        await self.batch_get_video_comments(video_id_list)
+                        except Exception as e:
+                            utils.logger.error(
+                                f"[BilibiliCrawler.search] Error searching on {day.ctime()}: {e}"
+                            )
+                            search_failed = True
+                            break
+                    if search_failed:
+                        continue
+                    await committer.add(
+                        None, {"day": day_str, "day_finished": True, "total": total_notes_crawled_for_keyword}
+                    )
+                if await committer.drain() and not search_failed:
+                    await checkpoint_store.finish("bili", CHECKPOINT_SCOPE_SEARCH_BY_DAY, keyword)
+                return total_notes_crawled_for_keyword
 
-                    except Exception as e:
-                        utils.logger.error(
-                            f"[BilibiliCrawler.search] Error searching on {day.ctime()}: {e}"
-                        )
-                        break
+            await run_keywords("BilibiliCrawler.search_by_keywords_in_time_range", search_keyword)
 
     async def batch_get_video_comments(self, video_id_list: List[str]):
         """
@@ -389,7 +490,7 @@ class BilibiliCrawler(AbstractCrawler):
         utils.logger.info(
             f"[BilibiliCrawler.batch_get_video_comments] video ids:{video_id_list}"
         )
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter("bili")
         task_list: List[Task] = []
         for video_id in video_id_list:
             task = asyncio.create_task(
@@ -398,25 +499,31 @@ class BilibiliCrawler(AbstractCrawler):
             task_list.append(task)
         await asyncio.gather(*task_list)
 
-    async def get_comments(self, video_id: str, semaphore: asyncio.Semaphore):
+    async def get_comments(self, video_id: str, semaphore: AdaptiveConcurrencyLimiter):
         """
         get comment for video id
         :param video_id:
         :param semaphore:
         :return:
         """
+        seen_index = get_seen_index()
+        if not await seen_index.should_crawl("bili", SEEN_ITEM_COMMENTS, video_id):
+            return
+        async def mark_comments_crawled() -> None:
+            await seen_index.mark_crawled("bili", SEEN_ITEM_COMMENTS, video_id)
+
         async with semaphore:
             try:
                 utils.logger.info(
                     f"[BilibiliCrawler.get_comments] begin get video_id: {video_id} comments ..."
                 )
-                await asyncio.sleep(random.uniform(0.5, 1.5))
+                # 评论翻页正常结束才标记已爬取，提前结束的下次重新爬取
                 await self.bili_client.get_video_all_comments(
                     video_id=video_id,
-                    crawl_interval=random.random(),
                     is_fetch_sub_comments=config.ENABLE_GET_SUB_COMMENTS,
                     callback=bilibili_store.batch_update_bilibili_video_comments,
                     max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
+                    finished_callback=mark_comments_crawled,
                 )
 
             except DataFetchError as ex:
@@ -443,7 +550,6 @@ class BilibiliCrawler(AbstractCrawler):
             await self.get_specified_videos(video_bvids_list)
             if int(result["page"]["count"]) <= pn * ps:
                 break
-            await asyncio.sleep(random.random())
             pn += 1
 
     async def get_specified_videos(self, bvids_list: List[str]):
@@ -451,7 +557,7 @@ class BilibiliCrawler(AbstractCrawler):
         get specified videos info
         :return:
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter("bili")
         task_list = [
             self.get_video_info_task(aid=0, bvid=video_id, semaphore=semaphore)
             for video_id in bvids_list
@@ -470,7 +576,7 @@ class BilibiliCrawler(AbstractCrawler):
         await self.batch_get_video_comments(video_aids_list)
 
     async def get_video_info_task(
-        self, aid: int, bvid: str, semaphore: asyncio.Semaphore
+        self, aid: int, bvid: str, semaphore: AdaptiveConcurrencyLimiter
     ) -> Optional[Dict]:
         """
         Get video detail task
@@ -495,7 +601,7 @@ class BilibiliCrawler(AbstractCrawler):
                 return None
 
     async def get_video_play_url_task(
-        self, aid: int, cid: int, semaphore: asyncio.Semaphore
+        self, aid: int, cid: int, semaphore: AdaptiveConcurrencyLimiter
     ) -> Union[Dict, None]:
         """
         Get video play url
@@ -535,6 +641,7 @@ class BilibiliCrawler(AbstractCrawler):
         )
         bilibili_client_obj = BilibiliClient(
             proxies=httpx_proxy,
+            proxy_rotator=self.proxy_rotator,
             headers={
                 "User-Agent": self.user_agent,
                 "Cookie": cookie_str,
@@ -645,6 +752,8 @@ class BilibiliCrawler(AbstractCrawler):
     async def close(self):
         """Close browser context"""
         try:
+            if getattr(self, "bili_client", None):
+                await self.bili_client.close()
             # 如果使用CDP模式，需要特殊处理
             if self.cdp_manager:
                 await self.cdp_manager.cleanup()
@@ -661,7 +770,7 @@ class BilibiliCrawler(AbstractCrawler):
                 f"[BilibiliCrawler.close] An error occurred during close: {e}"
             )
 
-    async def get_bilibili_video(self, video_item: Dict, semaphore: asyncio.Semaphore):
+    async def get_bilibili_video(self, video_item: Dict, semaphore: AdaptiveConcurrencyLimiter):
         """
         download bilibili video
         :param video_item:
@@ -713,7 +822,7 @@ class BilibiliCrawler(AbstractCrawler):
             f"[BilibiliCrawler.get_creator_details] creator ids:{creator_id_list}"
         )
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter("bili")
         task_list: List[Task] = []
         try:
             for creator_id in creator_id_list:
@@ -728,7 +837,7 @@ class BilibiliCrawler(AbstractCrawler):
 
         await asyncio.gather(*task_list)
 
-    async def get_creator_details(self, creator_id: int, semaphore: asyncio.Semaphore):
+    async def get_creator_details(self, creator_id: int, semaphore: AdaptiveConcurrencyLimiter):
         """
         get details for creator id
         :param creator_id:
@@ -749,7 +858,7 @@ class BilibiliCrawler(AbstractCrawler):
         await self.get_followings(creator_info, semaphore)
         await self.get_dynamics(creator_info, semaphore)
 
-    async def get_fans(self, creator_info: Dict, semaphore: asyncio.Semaphore):
+    async def get_fans(self, creator_info: Dict, semaphore: AdaptiveConcurrencyLimiter):
         """
         get fans for creator id
         :param creator_info:
@@ -764,7 +873,6 @@ class BilibiliCrawler(AbstractCrawler):
                 )
                 await self.bili_client.get_creator_all_fans(
                     creator_info=creator_info,
-                    crawl_interval=random.random(),
                     callback=bilibili_store.batch_update_bilibili_creator_fans,
                     max_count=config.CRAWLER_MAX_CONTACTS_COUNT_SINGLENOTES,
                 )
@@ -778,7 +886,7 @@ class BilibiliCrawler(AbstractCrawler):
                     f"[BilibiliCrawler.get_fans] may be been blocked, err:{e}"
                 )
 
-    async def get_followings(self, creator_info: Dict, semaphore: asyncio.Semaphore):
+    async def get_followings(self, creator_info: Dict, semaphore: AdaptiveConcurrencyLimiter):
         """
         get followings for creator id
         :param creator_info:
@@ -793,7 +901,6 @@ class BilibiliCrawler(AbstractCrawler):
                 )
                 await self.bili_client.get_creator_all_followings(
                     creator_info=creator_info,
-                    crawl_interval=random.random(),
                     callback=bilibili_store.batch_update_bilibili_creator_followings,
                     max_count=config.CRAWLER_MAX_CONTACTS_COUNT_SINGLENOTES,
                 )
@@ -807,7 +914,7 @@ class BilibiliCrawler(AbstractCrawler):
                     f"[BilibiliCrawler.get_followings] may be been blocked, err:{e}"
                 )
 
-    async def get_dynamics(self, creator_info: Dict, semaphore: asyncio.Semaphore):
+    async def get_dynamics(self, creator_info: Dict, semaphore: AdaptiveConcurrencyLimiter):
         """
         get dynamics for creator id
         :param creator_info:
@@ -822,7 +929,6 @@ class BilibiliCrawler(AbstractCrawler):
                 )
                 await self.bili_client.get_creator_all_dynamics(
                     creator_info=creator_info,
-                    crawl_interval=random.random(),
                     callback=bilibili_store.batch_update_bilibili_creator_dynamics,
                     max_count=config.CRAWLER_MAX_DYNAMICS_COUNT_SINGLENOTES,
                 )
@@ -13,16 +13,17 @@ import asyncio
 import copy
 import json
 import urllib.parse
-import random
 from datetime import datetime
 from typing import Any, Callable, Dict, Optional, List
 
-import requests
+import httpx
 from playwright.async_api import BrowserContext, Page
 import config
 
 from base.base_crawler import AbstractApiClient
+from proxy.proxy_rotation import ProxyRotator
 from tools import utils
+from tools.http_client import AsyncHttpClientPool
 from var import request_keyword_var
 
 from .exception import *
@@ -36,6 +37,7 @@ class DOUYINClient(AbstractApiClient):
             timeout=30,
             proxies=None,
             *,
+            proxy_rotator: Optional[ProxyRotator] = None,
             headers: Dict,
             playwright_page: Optional[Page],
             cookie_dict: Dict
@@ -46,10 +48,30 @@ class DOUYINClient(AbstractApiClient):
         self._host = "https://www.douyin.com"
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
-        # 解决 AttributeError: 'DOUYINClient' object has no attribute 'min_interval_time'
-        # 使用 config 中的 CRAWLER_MAX_SLEEP_SEC，并设置一个默认的最小间隔时间
-        self.min_interval_time = 1  # 默认最小间隔时间为1秒
-        self.max_interval_time = config.CRAWLER_MAX_SLEEP_SEC # 从 config 获取最大间隔时间
+        # 与 requests 保持一致，自动跟随重定向
+        self._http_pool = AsyncHttpClientPool(
+            follow_redirects=True, platform="dy", proxy_rotator=proxy_rotator, is_blocked=self.is_blocked_response
+        )
+
+    @staticmethod
+    def is_blocked_response(response: httpx.Response) -> bool:
+        """
+        抖音的封禁信号：响应体为空或者为 blocked
+        Args:
+            response: 响应
+
+        Returns:
+
+        """
+        return response.text == "" or response.text == "blocked"
+
+    async def close(self):
+        """
+        关闭客户端持有的 HTTP 连接池，JS 签名进程池由所有客户端共享，在程序退出时关闭
+        Returns:
+
+        """
+        await self._http_pool.aclose()
 
     async def __process_req_params(
             self, uri: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
@@ -99,11 +121,12 @@ class DOUYINClient(AbstractApiClient):
         params["a_bogus"] = a_bogus
 
     async def request(self, method, url, **kwargs):
-        response = None
-        if method == "GET":
-            response = requests.request(method, url, **kwargs)
-        elif method == "POST":
-            response = requests.request(method, url, **kwargs)
+        try:
+            response = await self._http_pool.request(
+                method, url, proxies=self.proxies, timeout=self.timeout, **kwargs
+            )
+        except httpx.HTTPError as e:
+            raise DataFetchError(f"{e.__class__.__name__}: {e}, url: {url}")
         try:
             if response.text == "" or response.text == "blocked":
                 utils.logger.error(f"request params incrr, response.text: {response.text}")
@@ -235,7 +258,7 @@ class DOUYINClient(AbstractApiClient):
     async def get_aweme_all_comments(
             self,
             aweme_id: str,
-            crawl_interval: float = 1.0,
+            crawl_interval: float = 0,
             is_fetch_sub_comments=False,
             callback: Optional[Callable] = None,
             max_count: int = 10,
@@ -426,7 +449,4 @@ class DOUYINClient(AbstractApiClient):
                 posts_has_more = 0  # 标记不再有更多页面
                 break  # 结束外层循环
 
-            # 添加一个随机延迟，避免触发限流
-            await asyncio.sleep(random.uniform(self.min_interval_time, self.max_interval_time))
-
         return result
\ No newline at end of file
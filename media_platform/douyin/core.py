@@ -11,7 +11,6 @@
 
 import asyncio
 import os
-import random
 from asyncio import Task
 from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, date
@@ -27,10 +26,14 @@ from playwright.async_api import (
 import config
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_rotation import ProxyRotator
 from store import douyin as douyin_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from tools.concurrency_limiter import AdaptiveConcurrencyLimiter, get_concurrency_limiter
+from tools.crawl_checkpoint import CHECKPOINT_SCOPE_SEARCH, get_checkpoint_store
+from tools.keyword_runner import run_keywords
+from var import crawler_type_var
 
 from .client import DOUYINClient
 from .exception import DataFetchError
@@ -44,6 +47,7 @@ class DouYinCrawler(AbstractCrawler):
         cookie_str, cookie_dict = utils.convert_cookies(await self.browser_context.cookies())  # type: ignore
         douyin_client = DOUYINClient(
             proxies=httpx_proxy,
+            proxy_rotator=self.proxy_rotator,
             headers={
                 "User-Agent": await self.context_page.evaluate(
                     "() => navigator.userAgent"
@@ -66,6 +70,7 @@ class DouYinCrawler(AbstractCrawler):
     def __init__(self) -> None:
         self.index_url = "https://www.douyin.com"
         self.cdp_manager = None
+        self.proxy_rotator: Optional[ProxyRotator] = None
 
     async def start(self) -> None:
         playwright_proxy_format, httpx_proxy_format = None, None
@@ -74,6 +79,7 @@ class DouYinCrawler(AbstractCrawler):
                 config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
             )
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            self.proxy_rotator = ProxyRotator(ip_proxy_pool, ip_proxy_info)
             playwright_proxy_format, httpx_proxy_format = self.format_proxy_info(
                 ip_proxy_info
             )
@@ -127,6 +133,10 @@ class DouYinCrawler(AbstractCrawler):
                 # Get the information and comments of the specified creator
                 await self.get_creators_and_videos()
 
+            # 释放 API 客户端持有的 HTTP 长连接
+            await self.dy_client.close()
+            if self.proxy_rotator is not None:
+                await self.proxy_rotator.close()
             utils.logger.info("[DouYinCrawler.start] Douyin Crawler finished ...")
 
     async def search(self) -> None:
@@ -135,12 +145,17 @@ class DouYinCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < dy_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = dy_limit_count
         start_page = config.START_PAGE  # start page number
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
-            utils.logger.info(f"[DouYinCrawler.search] Current keyword: {keyword}")
-            aweme_list: List[str] = []
-            page = 0
-            dy_search_id = ""
+        checkpoint_store = get_checkpoint_store()
+
+        async def search_keyword(keyword: str) -> int:
+            checkpoint = await checkpoint_store.load("dy", CHECKPOINT_SCOPE_SEARCH, keyword) or {}
+            if checkpoint.get("finished"):
+                return 0
+            # 评论在所有页搜索完之后统一抓取，断点中需要带上已经搜索到的作品
+            aweme_list: List[str] = checkpoint.get("aweme_list", [])
+            page = checkpoint.get("page", 0)
+            dy_search_id = checkpoint.get("search_id", "")
+            search_failed = False
             while (
                 page - start_page + 1
             ) * dy_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
@@ -168,6 +183,7 @@ class DouYinCrawler(AbstractCrawler):
                     utils.logger.error(
                         f"[DouYinCrawler.search] search douyin keyword: {keyword} failed"
                     )
+                    search_failed = True
                     break
 
                 page += 1
@@ -175,6 +191,7 @@ class DouYinCrawler(AbstractCrawler):
                     utils.logger.error(
                         f"[DouYinCrawler.search] search douyin keyword: {keyword} failed，账号也许被风控了。"
                     )
+                    search_failed = True
                     break
                 dy_search_id = posts_res.get("extra", {}).get("logid", "")
                 for post_item in posts_res.get("data"):
@@ -187,14 +204,23 @@ class DouYinCrawler(AbstractCrawler):
                         continue
                     aweme_list.append(aweme_info.get("aweme_id", ""))
                     await douyin_store.update_douyin_aweme(aweme_item=aweme_info)
+                await checkpoint_store.save(
+                    "dy", CHECKPOINT_SCOPE_SEARCH, keyword,
+                    {"page": page, "search_id": dy_search_id, "aweme_list": aweme_list},
+                )
             utils.logger.info(
                 f"[DouYinCrawler.search] keyword:{keyword}, aweme_list:{aweme_list}"
             )
             await self.batch_get_note_comments(aweme_list)
+            if not search_failed:
+                await checkpoint_store.finish("dy", CHECKPOINT_SCOPE_SEARCH, keyword)
+            return len(aweme_list)
+
+        await run_keywords("DouYinCrawler.search", search_keyword)
 
     async def get_specified_awemes(self):
         """Get the information and comments of the specified post"""
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter("dy")
         task_list = [
             self.get_aweme_detail(aweme_id=aweme_id, semaphore=semaphore)
             for aweme_id in config.DY_SPECIFIED_ID_LIST
@@ -206,7 +232,7 @@ class DouYinCrawler(AbstractCrawler):
         await self.batch_get_note_comments(config.DY_SPECIFIED_ID_LIST)
 
     async def get_aweme_detail(
-        self, aweme_id: str, semaphore: asyncio.Semaphore
+        self, aweme_id: str, semaphore: AdaptiveConcurrencyLimiter
     ) -> Any:
         """Get note detail"""
         async with semaphore:
@@ -234,7 +260,7 @@ class DouYinCrawler(AbstractCrawler):
             return
 
         task_list: List[Task] = []
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter("dy")
         for aweme_id in aweme_list:
             task = asyncio.create_task(
                 self.get_comments(aweme_id, semaphore), name=aweme_id
@@ -243,13 +269,12 @@ class DouYinCrawler(AbstractCrawler):
         if len(task_list) > 0:
             await asyncio.wait(task_list)
 
-    async def get_comments(self, aweme_id: str, semaphore: asyncio.Semaphore) -> None:
+    async def get_comments(self, aweme_id: str, semaphore: AdaptiveConcurrencyLimiter) -> None:
         async with semaphore:
             try:
                 # 将关键词列表传递给 get_aweme_all_comments 方法
                 await self.dy_client.get_aweme_all_comments(
                     aweme_id=aweme_id,
-                    crawl_interval=random.random(),
                     is_fetch_sub_comments=config.ENABLE_GET_SUB_COMMENTS,
                     callback=douyin_store.batch_update_dy_aweme_comments,
                     max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
@@ -338,7 +363,7 @@ class DouYinCrawler(AbstractCrawler):
         """
         Concurrently obtain the specified post list and save the data
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter("dy")
         task_list = [
             self.get_aweme_detail(post_item.get("aweme_id"), semaphore)
             for post_item in video_list
@@ -431,6 +456,8 @@ class DouYinCrawler(AbstractCrawler):
 
     async def close(self) -> None:
         """Close browser context"""
+        if getattr(self, "dy_client", None):
+            await self.dy_client.close()
         # 如果使用CDP模式，需要特殊处理
         if self.cdp_manager:
             await self.cdp_manager.cleanup()
@@ -15,12 +15,14 @@ import json
 from typing import Any, Callable, Dict, List, Optional
 from urllib.parse import urlencode
 
-import httpx
 from playwright.async_api import BrowserContext, Page
 
 import config
 from base.base_crawler import AbstractApiClient
+from proxy.proxy_rotation import ProxyRotator, is_blocked_status
 from tools import utils
+from tools.crawl_pipeline import gather_with_limit
+from tools.http_client import AsyncHttpClientPool
 
 from .exception import DataFetchError
 from .graphql import KuaiShouGraphQL
@@ -32,6 +34,7 @@ class KuaiShouClient(AbstractApiClient):
         timeout=10,
         proxies=None,
         *,
+        proxy_rotator: Optional[ProxyRotator] = None,
         headers: Dict[str, str],
         playwright_page: Page,
         cookie_dict: Dict[str, str],
@@ -43,10 +46,22 @@ class KuaiShouClient(AbstractApiClient):
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
         self.graphql = KuaiShouGraphQL()
+        self._http_pool = AsyncHttpClientPool(
+            platform="ks", proxy_rotator=proxy_rotator, is_blocked=is_blocked_status
+        )
+
+    async def close(self):
+        """
+        关闭客户端持有的 HTTP 连接池
+        Returns:
+
+        """
+        await self._http_pool.aclose()
 
     async def request(self, method, url, **kwargs) -> Any:
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        response = await self._http_pool.request(
+            method, url, proxies=self.proxies, timeout=self.timeout, **kwargs
+        )
         data: Dict = response.json()
         if data.get("errors"):
             raise DataFetchError(data.get("errors", "unkonw error"))
@@ -180,7 +195,7 @@ class KuaiShouClient(AbstractApiClient):
     async def get_video_all_comments(
         self,
         photo_id: str,
-        crawl_interval: float = 1.0,
+        crawl_interval: float = 0,
         callback: Optional[Callable] = None,
         max_count: int = 10,
     ):
@@ -217,7 +232,7 @@ class KuaiShouClient(AbstractApiClient):
         self,
         comments: List[Dict],
         photo_id,
-        crawl_interval: float = 1.0,
+        crawl_interval: float = 0,
         callback: Optional[Callable] = None,
     ) -> List[Dict]:
         """
@@ -236,31 +251,57 @@ class KuaiShouClient(AbstractApiClient):
             )
             return []
 
+        # 每条一级评论的二级评论翻页互不依赖，同一视频内最多 SUB_COMMENT_CONCURRENCY_NUM 条并发翻页
+        sub_comments_list = await gather_with_limit(
+            [
+                self.get_comment_all_sub_comments(comment, photo_id, crawl_interval, callback)
+                for comment in comments
+            ],
+            config.SUB_COMMENT_CONCURRENCY_NUM,
+        )
+        return [sub_comment for sub_comments in sub_comments_list for sub_comment in sub_comments]
+
+    async def get_comment_all_sub_comments(
+        self,
+        comment: Dict,
+        photo_id,
+        crawl_interval: float = 0,
+        callback: Optional[Callable] = None,
+    ) -> List[Dict]:
+        """
+        获取一条一级评论下的所有二级评论
+        Args:
+            comment: 一级评论
+            photo_id: 视频id
+            crawl_interval: 爬取一次评论的延迟单位（秒）
+            callback: 一次评论爬取结束后
+        Returns:
+
+        """
         result = []
-        for comment in comments:
-            sub_comments = comment.get("subComments")
-            if sub_comments and callback:
-                await callback(photo_id, sub_comments)
+        sub_comments = comment.get("subComments")
+        if sub_comments and callback:
+            await callback(photo_id, sub_comments)
 
-            sub_comment_pcursor = comment.get("subCommentsPcursor")
-            if sub_comment_pcursor == "no_more":
-                continue
+        sub_comment_pcursor = comment.get("subCommentsPcursor")
+        if sub_comment_pcursor == "no_more":
+            return result
 
-            root_comment_id = comment.get("commentId")
-            sub_comment_pcursor = ""
+        root_comment_id = comment.get("commentId")
+        sub_comment_pcursor = ""
 
-            while sub_comment_pcursor != "no_more":
-                comments_res = await self.get_video_sub_comments(
-                    photo_id, root_comment_id, sub_comment_pcursor
-                )
-                vision_sub_comment_list = comments_res.get("visionSubCommentList", {})
-                sub_comment_pcursor = vision_sub_comment_list.get("pcursor", "no_more")
-
-                comments = vision_sub_comment_list.get("subComments", {})
-                if callback:
-                    await callback(photo_id, comments)
-                await asyncio.sleep(crawl_interval)
-                result.extend(comments)
+        while sub_comment_pcursor != "no_more":
+            comments_res = await self.get_video_sub_comments(
+                photo_id, root_comment_id, sub_comment_pcursor
+            )
+            vision_sub_comment_list = comments_res.get("visionSubCommentList", {})
+            sub_comment_pcursor = vision_sub_comment_list.get("pcursor", "no_more")
+
+            comments = vision_sub_comment_list.get("subComments", {})
+            if callback:
+                await callback(photo_id, comments)
+            await asyncio.sleep(crawl_interval)
+            result.extend(comments)
         return result
 
     async def get_creator_info(self, user_id: str) -> Dict:
@@ -275,7 +316,7 @@ class KuaiShouClient(AbstractApiClient):
     async def get_all_videos_by_creator(
         self,
         user_id: str,
-        crawl_interval: float = 1.0,
+        crawl_interval: float = 0,
         callback: Optional[Callable] = None,
     ) -> List[Dict]:
         """
@@ -11,9 +11,9 @@
 
 import asyncio
 import os
-import random
 import time
 from asyncio import Task
+from functools import partial
 from typing import Dict, List, Optional, Tuple
 
 from playwright.async_api import (
@@ -27,10 +27,16 @@ from playwright.async_api import (
 import config
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_rotation import ProxyRotator
 from store import kuaishou as kuaishou_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
-from var import comment_tasks_var, crawler_type_var, source_keyword_var
+from tools.concurrency_limiter import AdaptiveConcurrencyLimiter, get_concurrency_limiter
+from tools.crawl_checkpoint import CHECKPOINT_SCOPE_SEARCH, PipelineCheckpointCommitter, get_checkpoint_store
+from tools.crawl_pipeline import CrawlPipeline, PipelineBatch
+from tools.keyword_runner import run_keywords
+from tools.seen_index import SEEN_ITEM_COMMENTS, get_seen_index
+from var import comment_tasks_var, crawler_type_var
 
 from .client import KuaiShouClient
 from .exception import DataFetchError
@@ -47,6 +53,7 @@ class KuaishouCrawler(AbstractCrawler):
         self.index_url = "https://www.kuaishou.com"
         self.user_agent = utils.get_user_agent()
         self.cdp_manager = None
+        self.proxy_rotator: Optional[ProxyRotator] = None
 
     async def start(self):
         playwright_proxy_format, httpx_proxy_format = None, None
@@ -55,6 +62,7 @@ class KuaishouCrawler(AbstractCrawler):
                 config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
             )
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            self.proxy_rotator = ProxyRotator(ip_proxy_pool, ip_proxy_info)
             playwright_proxy_format, httpx_proxy_format = self.format_proxy_info(
                 ip_proxy_info
             )
@@ -109,6 +117,10 @@ class KuaishouCrawler(AbstractCrawler):
             else:
                 pass
 
+            # 释放 API 客户端持有的 HTTP 长连接
+            await self.ks_client.close()
+            if self.proxy_rotator is not None:
+                await self.proxy_rotator.close()
             utils.logger.info("[KuaishouCrawler.start] Kuaishou Crawler finished ...")
 
     async def search(self):
@@ -117,53 +129,69 @@ class KuaishouCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < ks_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = ks_limit_count
         start_page = config.START_PAGE
-        for keyword in config.KEYWORDS.split(","):
-            search_session_id = ""
-            source_keyword_var.set(keyword)
-            utils.logger.info(
-                f"[KuaishouCrawler.search] Current search keyword: {keyword}"
+        semaphore = get_concurrency_limiter("ks")
+        checkpoint_store = get_checkpoint_store()
+        async with CrawlPipeline("ks.search") as pipeline:
+            # 搜索结果已经包含视频详情，评论抓取交给流水线与后续翻页同时进行
+            comment_stage = pipeline.add_stage(
+                "comment", partial(self.get_comments, semaphore=semaphore), config.PIPELINE_COMMENT_WORKERS
             )
-            page = 1
-            while (
-                page - start_page + 1
-            ) * ks_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[KuaishouCrawler.search] Skip page: {page}")
-                    page += 1
-                    continue
-                utils.logger.info(
-                    f"[KuaishouCrawler.search] search kuaishou keyword: {keyword}, page: {page}"
-                )
-                video_id_list: List[str] = []
-                videos_res = await self.ks_client.search_info_by_keyword(
-                    keyword=keyword,
-                    pcursor=str(page),
-                    search_session_id=search_session_id,
-                )
-                if not videos_res:
-                    utils.logger.error(
-                        f"[KuaishouCrawler.search] search info by keyword:{keyword} not found data"
+            async def search_keyword(keyword: str) -> int:
+                video_count = 0
+                checkpoint = await checkpoint_store.load("ks", CHECKPOINT_SCOPE_SEARCH, keyword)
+                if checkpoint and checkpoint.get("finished"):
+                    return video_count
+                search_session_id = checkpoint["search_session_id"] if checkpoint else ""
+                page = checkpoint["page"] if checkpoint else 1
+                committer = PipelineCheckpointCommitter(checkpoint_store, "ks", CHECKPOINT_SCOPE_SEARCH, keyword)
+                while (
+                    page - start_page + 1
+                ) * ks_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
+                    if page < start_page:
+                        utils.logger.info(f"[KuaishouCrawler.search] Skip page: {page}")
+                        page += 1
+                        continue
+                    utils.logger.info(
+                        f"[KuaishouCrawler.search] search kuaishou keyword: {keyword}, page: {page}"
                     )
-                    continue
-
-                vision_search_photo: Dict = videos_res.get("visionSearchPhoto")
-                if vision_search_photo.get("result") != 1:
-                    utils.logger.error(
-                        f"[KuaishouCrawler.search] search info by keyword:{keyword} not found data "
+                    videos_res = await self.ks_client.search_info_by_keyword(
+                        keyword=keyword,
+                        pcursor=str(page),
+                        search_session_id=search_session_id,
                     )
-                    continue
-                search_session_id = vision_search_photo.get("searchSessionId", "")
-                for video_detail in vision_search_photo.get("feeds"):
-                    video_id_list.append(video_detail.get("photo", {}).get("id"))
-                    await kuaishou_store.update_kuaishou_video(video_item=video_detail)
+                    if not videos_res:
+                        utils.logger.error(
+                            f"[KuaishouCrawler.search] search info by keyword:{keyword} not found data"
+                        )
+                        continue
+
+                    vision_search_photo: Dict = videos_res.get("visionSearchPhoto")
+                    if vision_search_photo.get("result") != 1:
+                        utils.logger.error(
+                            f"[KuaishouCrawler.search] search info by keyword:{keyword} not found data "
+                        )
+                        continue
+                    search_session_id = vision_search_photo.get("searchSessionId", "")
+                    page_batch = PipelineBatch()
+                    with page_batch:
+                        for video_detail in vision_search_photo.get("feeds"):
+                            await kuaishou_store.update_kuaishou_video(video_item=video_detail)
+                            video_count += 1
+                            if config.ENABLE_GET_COMMENTS:
+                                await comment_stage.put(video_detail.get("photo", {}).get("id"))
+
+                    page += 1
+                    # 这一页视频的评论在流水线中处理完后才提交下一页的位置
+                    await committer.add(page_batch, {"page": page, "search_session_id": search_session_id})
+                if await committer.drain():
+                    await checkpoint_store.finish("ks", CHECKPOINT_SCOPE_SEARCH, keyword)
+                return video_count
 
-                # batch fetch video comments
-                page += 1
-                await self.batch_get_video_comments(video_id_list)
+            await run_keywords("KuaishouCrawler.search", search_keyword)
 
     async def get_specified_videos(self):
         """Get the information and comments of the specified post"""
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter("ks")
         task_list = [
             self.get_video_info_task(video_id=video_id, semaphore=semaphore)
             for video_id in config.KS_SPECIFIED_ID_LIST
@@ -175,7 +203,7 @@ class KuaishouCrawler(AbstractCrawler):
         await self.batch_get_video_comments(config.KS_SPECIFIED_ID_LIST)
 
     async def get_video_info_task(
-        self, video_id: str, semaphore: asyncio.Semaphore
+        self, video_id: str, semaphore: AdaptiveConcurrencyLimiter
     ) -> Optional[Dict]:
         """Get video detail task"""
         async with semaphore:
@@ -211,7 +239,7 @@ class KuaishouCrawler(AbstractCrawler):
         utils.logger.info(
             f"[KuaishouCrawler.batch_get_video_comments] video ids:{video_id_list}"
         )
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter("ks")
         task_list: List[Task] = []
         for video_id in video_id_list:
             task = asyncio.create_task(
@@ -222,13 +250,16 @@ class KuaishouCrawler(AbstractCrawler):
         comment_tasks_var.set(task_list)
         await asyncio.gather(*task_list)
 
-    async def get_comments(self, video_id: str, semaphore: asyncio.Semaphore):
+    async def get_comments(self, video_id: str, semaphore: AdaptiveConcurrencyLimiter):
         """
         get comment for video id
         :param video_id:
         :param semaphore:
         :return:
         """
+        seen_index = get_seen_index()
+        if not await seen_index.should_crawl("ks", SEEN_ITEM_COMMENTS, video_id):
+            return
         async with semaphore:
             try:
                 utils.logger.info(
@@ -236,10 +267,10 @@ class KuaishouCrawler(AbstractCrawler):
                 )
                 await self.ks_client.get_video_all_comments(
                     photo_id=video_id,
-                    crawl_interval=random.random(),
                     callback=kuaishou_store.batch_update_ks_video_comments,
                     max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
                 )
+                await seen_index.mark_crawled("ks", SEEN_ITEM_COMMENTS, video_id)
             except DataFetchError as ex:
                 utils.logger.error(
                     f"[KuaishouCrawler.get_comments] get video_id: {video_id} comment error: {ex}"
@@ -284,6 +315,7 @@ class KuaishouCrawler(AbstractCrawler):
         )
         ks_client_obj = KuaiShouClient(
             proxies=httpx_proxy,
+            proxy_rotator=self.proxy_rotator,
             headers={
                 "User-Agent": self.user_agent,
                 "Cookie": cookie_str,
@@ -376,7 +408,6 @@ class KuaishouCrawler(AbstractCrawler):
             # Get all video information of the creator
             all_video_list = await self.ks_client.get_all_videos_by_creator(
                 user_id=user_id,
-                crawl_interval=random.random(),
                 callback=self.fetch_creator_video_detail,
             )
 
@@ -389,7 +420,7 @@ class KuaishouCrawler(AbstractCrawler):
         """
         Concurrently obtain the specified post list and save the data
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter("ks")
         task_list = [
             self.get_video_info_task(post_item.get("photo", {}).get("id"), semaphore)
             for post_item in video_list
@@ -402,6 +433,8 @@ class KuaishouCrawler(AbstractCrawler):
 
     async def close(self):
         """Close browser context"""
+        if getattr(self, "ks_client", None):
+            await self.ks_client.close()
         # 如果使用CDP模式，需要特殊处理
         if self.cdp_manager:
             await self.cdp_manager.cleanup()
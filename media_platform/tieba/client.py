@@ -21,8 +21,9 @@ from tenacity import RetryError, retry, stop_after_attempt, wait_fixed
 import config
 from base.base_crawler import AbstractApiClient
 from model.m_baidu_tieba import TiebaComment, TiebaCreator, TiebaNote
-from proxy.proxy_ip_pool import ProxyIpPool
+from proxy.proxy_rotation import ProxyRotator, is_blocked_status
 from tools import utils
+from tools.http_client import AsyncHttpClientPool
 
 from .field import SearchNoteType, SearchSortType
 from .help import TieBaExtractor
@@ -32,10 +33,9 @@ class BaiduTieBaClient(AbstractApiClient):
     def __init__(
             self,
             timeout=10,
-            ip_pool=None,
+            proxy_rotator: Optional[ProxyRotator] = None,
             default_ip_proxy=None,
     ):
-        self.ip_pool: Optional[ProxyIpPool] = ip_pool
         self.timeout = timeout
         self.headers = {
             "User-Agent": utils.get_user_agent(),
@@ -44,6 +44,29 @@ class BaiduTieBaClient(AbstractApiClient):
         self._host = "https://tieba.baidu.com"
         self._page_extractor = TieBaExtractor()
         self.default_ip_proxy = default_ip_proxy
+        self._http_pool = AsyncHttpClientPool(
+            platform="tieba", proxy_rotator=proxy_rotator, is_blocked=self.is_blocked_response
+        )
+
+    @staticmethod
+    def is_blocked_response(response: httpx.Response) -> bool:
+        """
+        贴吧的封禁信号：HTTP 403 / 429，或者响应体为空、为 blocked
+        Args:
+            response: 响应
+
+        Returns:
+
+        """
+        return is_blocked_status(response) or response.text == "" or response.text == "blocked"
+
+    async def close(self):
+        """
+        关闭客户端持有的 HTTP 连接池
+        Returns:
+
+        """
+        await self._http_pool.aclose()
 
     @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
     async def request(self, method, url, return_ori_content=False, proxies=None, **kwargs) -> Union[str, Any]:
@@ -60,11 +83,10 @@ class BaiduTieBaClient(AbstractApiClient):
 
         """
         actual_proxies = proxies if proxies else self.default_ip_proxy
-        async with httpx.AsyncClient(proxies=actual_proxies) as client:
-            response = await client.request(
-                method, url, timeout=self.timeout,
-                headers=self.headers, **kwargs
-            )
+        response = await self._http_pool.request(
+            method, url, proxies=actual_proxies, timeout=self.timeout,
+            headers=self.headers, **kwargs
+        )
 
         if response.status_code != 200:
             utils.logger.error(f"Request failed, method: {method}, url: {url}, status code: {response.status_code}")
@@ -101,16 +123,7 @@ class BaiduTieBaClient(AbstractApiClient):
                                      **kwargs)
             return res
         except RetryError as e:
-            if self.ip_pool:
-                proxie_model = await self.ip_pool.get_proxy()
-                _, proxies = utils.format_proxy_info(proxie_model)
-                res = await self.request(method="GET", url=f"{self._host}{final_uri}",
-                                         return_ori_content=return_ori_content,
-                                         proxies=proxies,
-                                         **kwargs)
-                self.default_ip_proxy = proxies
-                return res
-
+            # 开启代理时，封禁信号已经在连接池中触发过代理轮换和重试
             utils.logger.error(f"[BaiduTieBaClient.get] 达到了最大重试次数，IP已经被Block，请尝试更换新的IP代理: {e}")
             raise Exception(f"[BaiduTieBaClient.get] 达到了最大重试次数，IP已经被Block，请尝试更换新的IP代理: {e}")
 
@@ -203,7 +216,7 @@ class BaiduTieBaClient(AbstractApiClient):
         page_content = await self.get(uri, return_ori_content=True)
         return self._page_extractor.extract_note_detail(page_content)
 
-    async def get_note_all_comments(self, note_detail: TiebaNote, crawl_interval: float = 1.0,
+    async def get_note_all_comments(self, note_detail: TiebaNote, crawl_interval: float = 0,
                                     callback: Optional[Callable] = None,
                                     max_count: int = 10,
                                     ) -> List[TiebaComment]:
@@ -240,7 +253,7 @@ class BaiduTieBaClient(AbstractApiClient):
             current_page += 1
         return result
 
-    async def get_comments_all_sub_comments(self, comments: List[TiebaComment], crawl_interval: float = 1.0,
+    async def get_comments_all_sub_comments(self, comments: List[TiebaComment], crawl_interval: float = 0,
                                             callback: Optional[Callable] = None) -> List[TiebaComment]:
         """
         获取指定评论下的所有子评论
@@ -333,7 +346,7 @@ class BaiduTieBaClient(AbstractApiClient):
         return await self.get(uri, params=params)
 
     async def get_all_notes_by_creator_user_name(self,
-                                                 user_name: str, crawl_interval: float = 1.0,
+                                                 user_name: str, crawl_interval: float = 0,
                                                  callback: Optional[Callable] = None,
                                                  max_note_count: int = 0,
                                                  creator_page_html_content: str = None,
@@ -11,7 +11,6 @@
 
 import asyncio
 import os
-import random
 from asyncio import Task
 from typing import Dict, List, Optional, Tuple
 
@@ -27,11 +26,15 @@ import config
 from base.base_crawler import AbstractCrawler
 from model.m_baidu_tieba import TiebaCreator, TiebaNote
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_rotation import ProxyRotator
 from store import tieba as tieba_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
+from tools.concurrency_limiter import AdaptiveConcurrencyLimiter, get_concurrency_limiter
+from tools.crawl_checkpoint import CHECKPOINT_SCOPE_SEARCH, get_checkpoint_store
 from tools.crawler_util import format_proxy_info
-from var import crawler_type_var, source_keyword_var
+from tools.keyword_runner import run_keywords
+from var import crawler_type_var
 
 from .client import BaiduTieBaClient
 from .field import SearchNoteType, SearchSortType
@@ -50,6 +53,7 @@ class TieBaCrawler(AbstractCrawler):
         self.user_agent = utils.get_user_agent()
         self._page_extractor = TieBaExtractor()
         self.cdp_manager = None
+        self.proxy_rotator: Optional[ProxyRotator] = None
 
     async def start(self) -> None:
         """
@@ -57,7 +61,7 @@ class TieBaCrawler(AbstractCrawler):
         Returns:
 
         """
-        ip_proxy_pool, httpx_proxy_format = None, None
+        httpx_proxy_format = None
         if config.ENABLE_IP_PROXY:
             utils.logger.info(
                 "[BaiduTieBaCrawler.start] Begin create ip proxy pool ..."
@@ -66,6 +70,7 @@ class TieBaCrawler(AbstractCrawler):
                 config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
             )
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            self.proxy_rotator = ProxyRotator(ip_proxy_pool, ip_proxy_info)
             _, httpx_proxy_format = format_proxy_info(ip_proxy_info)
             utils.logger.info(
                 f"[BaiduTieBaCrawler.start] Init default ip proxy, value: {httpx_proxy_format}"
@@ -73,7 +78,7 @@ class TieBaCrawler(AbstractCrawler):
 
         # Create a client to interact with the baidutieba website.
         self.tieba_client = BaiduTieBaClient(
-            ip_pool=ip_proxy_pool,
+            proxy_rotator=self.proxy_rotator,
             default_ip_proxy=httpx_proxy_format,
         )
         crawler_type_var.set(config.CRAWLER_TYPE)
@@ -90,6 +95,10 @@ class TieBaCrawler(AbstractCrawler):
         else:
             pass
 
+        # 释放 API 客户端持有的 HTTP 长连接
+        await self.tieba_client.close()
+        if self.proxy_rotator is not None:
+            await self.proxy_rotator.close()
         utils.logger.info("[BaiduTieBaCrawler.start] Tieba Crawler finished ...")
 
     async def search(self) -> None:
@@ -105,12 +114,14 @@ class TieBaCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < tieba_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = tieba_limit_count
         start_page = config.START_PAGE
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
-            utils.logger.info(
-                f"[BaiduTieBaCrawler.search] Current search keyword: {keyword}"
-            )
-            page = 1
+        checkpoint_store = get_checkpoint_store()
+
+        async def search_keyword(keyword: str) -> int:
+            note_count = 0
+            checkpoint = await checkpoint_store.load("tieba", CHECKPOINT_SCOPE_SEARCH, keyword)
+            if checkpoint and checkpoint.get("finished"):
+                return note_count
+            page = checkpoint["page"] if checkpoint else 1
             while (
                 page - start_page + 1
             ) * tieba_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
@@ -142,12 +153,19 @@ class TieBaCrawler(AbstractCrawler):
                     await self.get_specified_notes(
                         note_id_list=[note_detail.note_id for note_detail in notes_list]
                     )
+                    note_count += len(notes_list)
                     page += 1
+                    await checkpoint_store.save("tieba", CHECKPOINT_SCOPE_SEARCH, keyword, {"page": page})
                 except Exception as ex:
                     utils.logger.error(
                         f"[BaiduTieBaCrawler.search] Search keywords error, current page: {page}, current keyword: {keyword}, err: {ex}"
                     )
-                    break
+                    # 出错时不标记完成，续爬时从最后提交的页继续
+                    return note_count
+            await checkpoint_store.finish("tieba", CHECKPOINT_SCOPE_SEARCH, keyword)
+            return note_count
+
+        await run_keywords("BaiduTieBaCrawler.search", search_keyword)
 
     async def get_specified_tieba_notes(self):
         """
@@ -192,7 +210,7 @@ class TieBaCrawler(AbstractCrawler):
         Returns:
 
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter("tieba")
         task_list = [
             self.get_note_detail_async_task(note_id=note_id, semaphore=semaphore)
             for note_id in note_id_list
@@ -206,13 +224,13 @@ class TieBaCrawler(AbstractCrawler):
         await self.batch_get_note_comments(note_details_model)
 
     async def get_note_detail_async_task(
-        self, note_id: str, semaphore: asyncio.Semaphore
+        self, note_id: str, semaphore: AdaptiveConcurrencyLimiter
     ) -> Optional[TiebaNote]:
         """
         Get note detail
         Args:
             note_id: baidu tieba note id
-            semaphore: asyncio semaphore
+            semaphore: 并发控制
 
         Returns:
 
@@ -252,7 +270,7 @@ class TieBaCrawler(AbstractCrawler):
         if not config.ENABLE_GET_COMMENTS:
             return
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter("tieba")
         task_list: List[Task] = []
         for note_detail in note_detail_list:
             task = asyncio.create_task(
@@ -263,7 +281,7 @@ class TieBaCrawler(AbstractCrawler):
         await asyncio.gather(*task_list)
 
     async def get_comments_async_task(
-        self, note_detail: TiebaNote, semaphore: asyncio.Semaphore
+        self, note_detail: TiebaNote, semaphore: AdaptiveConcurrencyLimiter
     ):
         """
         Get comments async task
@@ -280,7 +298,6 @@ class TieBaCrawler(AbstractCrawler):
             )
             await self.tieba_client.get_note_all_comments(
                 note_detail=note_detail,
-                crawl_interval=random.random(),
                 callback=tieba_store.batch_update_tieba_note_comments,
                 max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
             )
@@ -410,6 +427,8 @@ class TieBaCrawler(AbstractCrawler):
         Returns:
 
         """
+        if getattr(self, "tieba_client", None):
+            await self.tieba_client.close()
         # 如果使用CDP模式，需要特殊处理
         if self.cdp_manager:
             await self.cdp_manager.cleanup()
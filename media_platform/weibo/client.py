@@ -21,12 +21,13 @@ import re
 from typing import Callable, Dict, List, Optional, Union
 from urllib.parse import parse_qs, unquote, urlencode
 
-import httpx
 from httpx import Response
 from playwright.async_api import BrowserContext, Page
 
 import config
+from proxy.proxy_rotation import ProxyRotator, is_blocked_status
 from tools import utils
+from tools.http_client import AsyncHttpClientPool
 
 from .exception import DataFetchError
 from .field import SearchType
@@ -38,6 +39,7 @@ class WeiboClient:
             timeout=10,
             proxies=None,
             *,
+            proxy_rotator: Optional[ProxyRotator] = None,
             headers: Dict[str, str],
             playwright_page: Page,
             cookie_dict: Dict[str, str],
@@ -49,14 +51,24 @@ class WeiboClient:
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
         self._image_agent_host = "https://i1.wp.com/"
+        self._http_pool = AsyncHttpClientPool(
+            platform="wb", proxy_rotator=proxy_rotator, is_blocked=is_blocked_status
+        )
+
+    async def close(self):
+        """
+        关闭客户端持有的 HTTP 连接池
+        Returns:
+
+        """
+        await self._http_pool.aclose()
 
     async def request(self, method, url, **kwargs) -> Union[Response, Dict]:
         enable_return_response = kwargs.pop("return_response", False)
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request(
-                method, url, timeout=self.timeout,
-                **kwargs
-            )
+        response = await self._http_pool.request(
+            method, url, proxies=self.proxies, timeout=self.timeout,
+            **kwargs
+        )
 
         if enable_return_response:
             return response
@@ -154,7 +166,7 @@ class WeiboClient:
     async def get_note_all_comments(
         self,
         note_id: str,
-        crawl_interval: float = 1.0,
+        crawl_interval: float = 0,
         callback: Optional[Callable] = None,
         max_count: int = 10,
     ):
@@ -219,24 +231,23 @@ class WeiboClient:
         :return:
         """
         url = f"{self._host}/detail/{note_id}"
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request(
-                "GET", url, timeout=self.timeout, headers=self.headers
-            )
-            if response.status_code != 200:
-                raise DataFetchError(f"get weibo detail err: {response.text}")
-            match = re.search(r'var \$render_data = (\[.*?\])\[0\]', response.text, re.DOTALL)
-            if match:
-                render_data_json = match.group(1)
-                render_data_dict = json.loads(render_data_json)
-                note_detail = render_data_dict[0].get("status")
-                note_item = {
-                    "mblog": note_detail
-                }
-                return note_item
-            else:
-                utils.logger.info(f"[WeiboClient.get_note_info_by_id] 未找到$render_data的值")
-                return dict()
+        response = await self._http_pool.request(
+            "GET", url, proxies=self.proxies, timeout=self.timeout, headers=self.headers
+        )
+        if response.status_code != 200:
+            raise DataFetchError(f"get weibo detail err: {response.text}")
+        match = re.search(r'var \$render_data = (\[.*?\])\[0\]', response.text, re.DOTALL)
+        if match:
+            render_data_json = match.group(1)
+            render_data_dict = json.loads(render_data_json)
+            note_detail = render_data_dict[0].get("status")
+            note_item = {
+                "mblog": note_detail
+            }
+            return note_item
+        else:
+            utils.logger.info(f"[WeiboClient.get_note_info_by_id] 未找到$render_data的值")
+            return dict()
 
     async def get_note_image(self, image_url: str) -> bytes:
         image_url = image_url[8:]  # 去掉 https://
@@ -252,13 +263,12 @@ class WeiboClient:
         # 微博图床对外存在防盗链，所以需要代理访问
         # 由于微博图片是通过 i1.wp.com 来访问的，所以需要拼接一下
         final_uri = (f"{self._image_agent_host}" f"{image_url}")
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request("GET", final_uri, timeout=self.timeout)
-            if not response.reason_phrase == "OK":
-                utils.logger.error(f"[WeiboClient.get_note_image] request {final_uri} err, res:{response.text}")
-                return None
-            else:
-                return response.content
+        response = await self._http_pool.request("GET", final_uri, proxies=self.proxies, timeout=self.timeout)
+        if not response.reason_phrase == "OK":
+            utils.logger.error(f"[WeiboClient.get_note_image] request {final_uri} err, res:{response.text}")
+            return None
+        else:
+            return response.content
 
 
 
@@ -337,7 +347,7 @@ class WeiboClient:
         }
         return await self.get(uri, params)
 
-    async def get_all_notes_by_creator_id(self, creator_id: str, container_id: str, crawl_interval: float = 1.0,
+    async def get_all_notes_by_creator_id(self, creator_id: str, container_id: str, crawl_interval: float = 0,
                                           callback: Optional[Callable] = None) -> List[Dict]:
         """
         获取指定用户下的所有发过的帖子，该方法会一直查找一个用户下的所有帖子信息
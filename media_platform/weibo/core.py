@@ -17,7 +17,6 @@
 
 import asyncio
 import os
-import random
 from asyncio import Task
 from typing import Dict, List, Optional, Tuple
 
@@ -32,10 +31,14 @@ from playwright.async_api import (
 import config
 from base.base_crawler import AbstractCrawler
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_rotation import ProxyRotator
 from store import weibo as weibo_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from tools.concurrency_limiter import AdaptiveConcurrencyLimiter, get_concurrency_limiter
+from tools.crawl_checkpoint import CHECKPOINT_SCOPE_SEARCH, get_checkpoint_store
+from tools.keyword_runner import run_keywords
+from var import crawler_type_var
 
 from .client import WeiboClient
 from .exception import DataFetchError
@@ -56,6 +59,7 @@ class WeiboCrawler(AbstractCrawler):
         self.user_agent = utils.get_user_agent()
         self.mobile_user_agent = utils.get_mobile_user_agent()
         self.cdp_manager = None
+        self.proxy_rotator: Optional[ProxyRotator] = None
 
     async def start(self):
         playwright_proxy_format, httpx_proxy_format = None, None
@@ -64,6 +68,7 @@ class WeiboCrawler(AbstractCrawler):
                 config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
             )
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            self.proxy_rotator = ProxyRotator(ip_proxy_pool, ip_proxy_info)
             playwright_proxy_format, httpx_proxy_format = self.format_proxy_info(
                 ip_proxy_info
             )
@@ -124,6 +129,10 @@ class WeiboCrawler(AbstractCrawler):
                 await self.get_creators_and_notes()
             else:
                 pass
+            # 释放 API 客户端持有的 HTTP 长连接
+            await self.wb_client.close()
+            if self.proxy_rotator is not None:
+                await self.proxy_rotator.close()
             utils.logger.info("[WeiboCrawler.start] Weibo Crawler finished ...")
 
     async def search(self):
@@ -152,12 +161,14 @@ class WeiboCrawler(AbstractCrawler):
             )
             return
 
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
-            utils.logger.info(
-                f"[WeiboCrawler.search] Current search keyword: {keyword}"
-            )
-            page = 1
+        checkpoint_store = get_checkpoint_store()
+
+        async def search_keyword(keyword: str) -> int:
+            note_count = 0
+            checkpoint = await checkpoint_store.load("wb", CHECKPOINT_SCOPE_SEARCH, keyword)
+            if checkpoint and checkpoint.get("finished"):
+                return note_count
+            page = checkpoint["page"] if checkpoint else 1
             while (
                 page - start_page + 1
             ) * weibo_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
@@ -182,14 +193,20 @@ class WeiboCrawler(AbstractCrawler):
                             await self.get_note_images(mblog)
 
                 page += 1
+                note_count += len(note_id_list)
                 await self.batch_get_notes_comments(note_id_list)
+                await checkpoint_store.save("wb", CHECKPOINT_SCOPE_SEARCH, keyword, {"page": page})
+            await checkpoint_store.finish("wb", CHECKPOINT_SCOPE_SEARCH, keyword)
+            return note_count
+
+        await run_keywords("WeiboCrawler.search", search_keyword)
 
     async def get_specified_notes(self):
         """
         get specified notes info
         :return:
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter("wb")
         task_list = [
             self.get_note_info_task(note_id=note_id, semaphore=semaphore)
             for note_id in config.WEIBO_SPECIFIED_ID_LIST
@@ -201,7 +218,7 @@ class WeiboCrawler(AbstractCrawler):
         await self.batch_get_notes_comments(config.WEIBO_SPECIFIED_ID_LIST)
 
     async def get_note_info_task(
-        self, note_id: str, semaphore: asyncio.Semaphore
+        self, note_id: str, semaphore: AdaptiveConcurrencyLimiter
     ) -> Optional[Dict]:
         """
         Get note detail task
@@ -239,7 +256,7 @@ class WeiboCrawler(AbstractCrawler):
         utils.logger.info(
             f"[WeiboCrawler.batch_get_notes_comments] note ids:{note_id_list}"
         )
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter("wb")
         task_list: List[Task] = []
         for note_id in note_id_list:
             task = asyncio.create_task(
@@ -248,7 +265,7 @@ class WeiboCrawler(AbstractCrawler):
             task_list.append(task)
         await asyncio.gather(*task_list)
 
-    async def get_note_comments(self, note_id: str, semaphore: asyncio.Semaphore):
+    async def get_note_comments(self, note_id: str, semaphore: AdaptiveConcurrencyLimiter):
         """
         get comment for note id
         :param note_id:
@@ -262,9 +279,6 @@ class WeiboCrawler(AbstractCrawler):
                 )
                 await self.wb_client.get_note_all_comments(
                     note_id=note_id,
-                    crawl_interval=random.randint(
-                        1, 3
-                    ),  # 微博对API的限流比较严重，所以延时提高一些
                     callback=weibo_store.batch_update_weibo_note_comments,
                     max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
                 )
@@ -355,6 +369,7 @@ class WeiboCrawler(AbstractCrawler):
         )
         weibo_client_obj = WeiboClient(
             proxies=httpx_proxy,
+            proxy_rotator=self.proxy_rotator,
             headers={
                 "User-Agent": utils.get_mobile_user_agent(),
                 "Cookie": cookie_str,
@@ -448,6 +463,8 @@ class WeiboCrawler(AbstractCrawler):
 
     async def close(self):
         """Close browser context"""
+        if getattr(self, "wb_client", None):
+            await self.wb_client.close()
         # 如果使用CDP模式，需要特殊处理
         if self.cdp_manager:
             await self.cdp_manager.cleanup()
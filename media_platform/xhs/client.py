@@ -12,7 +12,7 @@
 import asyncio
 import json
 import re
-from typing import Any, Callable, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from urllib.parse import urlencode
 
 import httpx
@@ -21,7 +21,10 @@ from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_result
 
 import config
 from base.base_crawler import AbstractApiClient
+from proxy.proxy_rotation import ProxyRotator, is_blocked_json_code
 from tools import utils
+from tools.crawl_pipeline import gather_with_limit
+from tools.http_client import AsyncHttpClientPool
 from html import unescape
 
 from .exception import DataFetchError, IPBlockError
@@ -35,6 +38,7 @@ class XiaoHongShuClient(AbstractApiClient):
         timeout=10,
         proxies=None,
         *,
+        proxy_rotator: Optional[ProxyRotator] = None,
         headers: Dict[str, str],
         playwright_page: Page,
         cookie_dict: Dict[str, str],
@@ -50,10 +54,37 @@ class XiaoHongShuClient(AbstractApiClient):
         self.NOTE_ABNORMAL_CODE = -510001
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
+        self._http_pool = AsyncHttpClientPool(
+            platform="xhs", proxy_rotator=proxy_rotator, is_blocked=self.is_blocked_response
+        )
+        # localStorage 中的 b1 缓存，cookie 更新（重新登录）后失效
+        self._b1: Optional[str] = None
+        self._sign_queue: List[Tuple[str, Optional[Dict], asyncio.Future]] = []
+        self._sign_flush_task: Optional[asyncio.Task] = None
+
+    def is_blocked_response(self, response: httpx.Response) -> bool:
+        """
+        小红书的封禁信号：461/471 验证码，或者 code 为 300012（IP 被封）
+        Args:
+            response: 响应
+
+        Returns:
+
+        """
+        return response.status_code in (461, 471) or is_blocked_json_code(response, self.IP_ERROR_CODE)
+
+    async def close(self):
+        """
+        关闭客户端持有的 HTTP 连接池
+        Returns:
+
+        """
+        await self._http_pool.aclose()
 
     async def _pre_headers(self, url: str, data=None) -> Dict:
         """
         请求头参数签名
+        同一轮事件循环中并发发起的签名请求会被合并到一次 playwright evaluate 中完成
         Args:
             url:
             data:
@@ -61,25 +92,91 @@ class XiaoHongShuClient(AbstractApiClient):
         Returns:
 
         """
-        encrypt_params = await self.playwright_page.evaluate(
-            "([url, data]) => window._webmsxyw(url,data)", [url, data]
-        )
-        local_storage = await self.playwright_page.evaluate("() => window.localStorage")
-        signs = sign(
-            a1=self.cookie_dict.get("a1", ""),
-            b1=local_storage.get("b1", ""),
-            x_s=encrypt_params.get("X-s", ""),
-            x_t=str(encrypt_params.get("X-t", "")),
+        future = asyncio.get_running_loop().create_future()
+        self._sign_queue.append((url, data, future))
+        if self._sign_flush_task is None:
+            self._sign_flush_task = asyncio.create_task(self._flush_sign_queue())
+        sign_headers = await future
+        self.headers.update(sign_headers)
+        return {**self.headers}
+
+    async def _flush_sign_queue(self):
+        """
+        批量处理排队中的签名请求，evaluate 执行期间新加入的请求会在下一批中处理
+        Returns:
+
+        """
+        try:
+            while self._sign_queue:
+                batch, self._sign_queue = self._sign_queue, []
+                try:
+                    headers_list = await self.batch_sign_headers([(url, data) for url, data, _ in batch])
+                except Exception as e:
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for (_, _, future), headers in zip(batch, headers_list):
+                    if future.done():
+                        continue
+                    if isinstance(headers, Exception):
+                        future.set_exception(headers)
+                    else:
+                        future.set_result(headers)
+                # 页面脚本中途出错时返回的签名可能比请求少，没有拿到签名的请求直接失败，不能一直等待
+                for _, _, future in batch[len(headers_list):]:
+                    if not future.done():
+                        future.set_exception(DataFetchError(
+                            f"xhs batch sign returned {len(headers_list)} results for {len(batch)} requests"
+                        ))
+        finally:
+            self._sign_flush_task = None
+
+    async def batch_sign_headers(self, items: List[Tuple[str, Optional[Dict]]]) -> List[Union[Dict, Exception]]:
+        """
+        在一次 playwright evaluate 中对多个请求签名，同时读取 localStorage 中的 b1（已缓存时跳过）
+        Args:
+            items: (url, data) 列表
+
+        Returns:
+            与 items 一一对应的签名请求头，单个签名失败时对应位置为异常对象
+
+        """
+        need_b1 = not self._b1
+        sign_res: Dict = await self.playwright_page.evaluate(
+            """([items, needB1]) => {
+                const signs = items.map(([url, data]) => {
+                    try {
+                        return window._webmsxyw(url, data);
+                    } catch (e) {
+                        return {error: String(e)};
+                    }
+                });
+                return {signs: signs, b1: needB1 ? window.localStorage.getItem("b1") : null};
+            }""",
+            [[list(item) for item in items], need_b1],
         )
+        if need_b1:
+            self._b1 = sign_res.get("b1") or ""
 
-        headers = {
-            "X-S": signs["x-s"],
-            "X-T": signs["x-t"],
-            "x-S-Common": signs["x-s-common"],
-            "X-B3-Traceid": signs["x-b3-traceid"],
-        }
-        self.headers.update(headers)
-        return self.headers
+        headers_list: List[Union[Dict, Exception]] = []
+        for encrypt_params in sign_res.get("signs", []):
+            if not encrypt_params or encrypt_params.get("error"):
+                headers_list.append(DataFetchError(f"sign failed: {encrypt_params}"))
+                continue
+            signs = sign(
+                a1=self.cookie_dict.get("a1", ""),
+                b1=self._b1,
+                x_s=encrypt_params.get("X-s", ""),
+                x_t=str(encrypt_params.get("X-t", "")),
+            )
+            headers_list.append({
+                "X-S": signs["x-s"],
+                "X-T": signs["x-t"],
+                "x-S-Common": signs["x-s-common"],
+                "X-B3-Traceid": signs["x-b3-traceid"],
+            })
+        return headers_list
 
     @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
     async def request(self, method, url, **kwargs) -> Union[str, Any]:
@@ -95,8 +192,9 @@ class XiaoHongShuClient(AbstractApiClient):
         """
         # return response.text
         return_response = kwargs.pop("return_response", False)
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        response = await self._http_pool.request(
+            method, url, proxies=self.proxies, timeout=self.timeout, **kwargs
+        )
 
         if response.status_code == 471 or response.status_code == 461:
             # someday someone maybe will bypass captcha
@@ -155,15 +253,16 @@ class XiaoHongShuClient(AbstractApiClient):
         )
 
     async def get_note_media(self, url: str) -> Union[bytes, None]:
-        async with httpx.AsyncClient(proxies=self.proxies) as client:
-            response = await client.request("GET", url, timeout=self.timeout)
-            if not response.reason_phrase == "OK":
-                utils.logger.error(
-                    f"[XiaoHongShuClient.get_note_media] request {url} err, res:{response.text}"
-                )
-                return None
-            else:
-                return response.content
+        response = await self._http_pool.request(
+            "GET", url, proxies=self.proxies, timeout=self.timeout
+        )
+        if not response.reason_phrase == "OK":
+            utils.logger.error(
+                f"[XiaoHongShuClient.get_note_media] request {url} err, res:{response.text}"
+            )
+            return None
+        else:
+            return response.content
 
     async def pong(self) -> bool:
         """
@@ -197,6 +296,7 @@ class XiaoHongShuClient(AbstractApiClient):
         cookie_str, cookie_dict = utils.convert_cookies(await browser_context.cookies())
         self.headers["Cookie"] = cookie_str
         self.cookie_dict = cookie_dict
+        self._b1 = None
 
     async def get_note_by_keyword(
         self,
@@ -323,9 +423,12 @@ class XiaoHongShuClient(AbstractApiClient):
         self,
         note_id: str,
         xsec_token: str,
-        crawl_interval: float = 1.0,
+        crawl_interval: float = 0,
         callback: Optional[Callable] = None,
         max_count: int = 10,
+        cursor: str = "",
+        cursor_callback: Optional[Callable] = None,
+        finished_callback: Optional[Callable] = None,
     ) -> List[Dict]:
         """
         获取指定笔记下的所有一级评论，该方法会一直查找一个帖子下的所有评论信息
@@ -335,12 +438,15 @@ class XiaoHongShuClient(AbstractApiClient):
             crawl_interval: 爬取一次笔记的延迟单位（秒）
             callback: 一次笔记爬取结束后
             max_count: 一次笔记爬取的最大评论数量
+            cursor: 开始的评论游标，用于断点续爬
+            cursor_callback: 一页评论（包括二级评论）处理完后的回调，参数为下一页的游标和这一页的一级评论
+            finished_callback: 评论翻页正常结束（没有更多评论或达到最大数量）后的回调，响应中缺少评论数据提前结束时不调用
         Returns:
 
         """
         result = []
         comments_has_more = True
-        comments_cursor = ""
+        comments_cursor = cursor
         while comments_has_more and len(result) < max_count:
             comments_res = await self.get_note_comments(
                 note_id=note_id, xsec_token=xsec_token, cursor=comments_cursor
@@ -366,13 +472,19 @@ class XiaoHongShuClient(AbstractApiClient):
                 callback=callback,
             )
             result.extend(sub_comments)
+            if cursor_callback:
+                await cursor_callback(comments_cursor, comments)
+        else:
+            # 循环没有因为缺少评论数据 break
+            if finished_callback:
+                await finished_callback()
         return result
 
     async def get_comments_all_sub_comments(
         self,
         comments: List[Dict],
         xsec_token: str,
-        crawl_interval: float = 1.0,
+        crawl_interval: float = 0,
         callback: Optional[Callable] = None,
     ) -> List[Dict]:
         """
@@ -392,46 +504,73 @@ class XiaoHongShuClient(AbstractApiClient):
             )
             return []
 
-        result = []
-        for comment in comments:
-            note_id = comment.get("note_id")
-            sub_comments = comment.get("sub_comments")
-            if sub_comments and callback:
-                await callback(note_id, sub_comments)
-
-            sub_comment_has_more = comment.get("sub_comment_has_more")
-            if not sub_comment_has_more:
-                continue
+        # 每条一级评论的二级评论翻页互不依赖，同一笔记内最多 SUB_COMMENT_CONCURRENCY_NUM 条并发翻页
+        sub_comments_list = await gather_with_limit(
+            [
+                self.get_comment_all_sub_comments(comment, xsec_token, crawl_interval, callback)
+                for comment in comments
+            ],
+            config.SUB_COMMENT_CONCURRENCY_NUM,
+        )
+        return [sub_comment for sub_comments in sub_comments_list for sub_comment in sub_comments]
+
+    async def get_comment_all_sub_comments(
+        self,
+        comment: Dict,
+        xsec_token: str,
+        crawl_interval: float = 0,
+        callback: Optional[Callable] = None,
+    ) -> List[Dict]:
+        """
+        获取一条一级评论下的所有二级评论
+        Args:
+            comment: 一级评论
+            xsec_token: 验证token
+            crawl_interval: 爬取一次评论的延迟单位（秒）
+            callback: 一次评论爬取结束后
+
+        Returns:
 
-            root_comment_id = comment.get("id")
-            sub_comment_cursor = comment.get("sub_comment_cursor")
+        """
+        result = []
+        note_id = comment.get("note_id")
+        sub_comments = comment.get("sub_comments")
+        if sub_comments and callback:
+            await callback(note_id, sub_comments)
+
+        sub_comment_has_more = comment.get("sub_comment_has_more")
+        if not sub_comment_has_more:
+            return result
+
+        root_comment_id = comment.get("id")
+        sub_comment_cursor = comment.get("sub_comment_cursor")
+
+        while sub_comment_has_more:
+            comments_res = await self.get_note_sub_comments(
+                note_id=note_id,
+                root_comment_id=root_comment_id,
+                xsec_token=xsec_token,
+                num=10,
+                cursor=sub_comment_cursor,
+            )
 
-            while sub_comment_has_more:
-                comments_res = await self.get_note_sub_comments(
-                    note_id=note_id,
-                    root_comment_id=root_comment_id,
-                    xsec_token=xsec_token,
-                    num=10,
-                    cursor=sub_comment_cursor,
+            if comments_res is None:
+                utils.logger.info(
+                    f"[XiaoHongShuClient.get_comment_all_sub_comments] No response found for note_id: {note_id}"
                 )
-                
-                if comments_res is None:
-                    utils.logger.info(
-                        f"[XiaoHongShuClient.get_comments_all_sub_comments] No response found for note_id: {note_id}"
-                    )
-                    continue
-                sub_comment_has_more = comments_res.get("has_more", False)
-                sub_comment_cursor = comments_res.get("cursor", "")
-                if "comments" not in comments_res:
-                    utils.logger.info(
-                        f"[XiaoHongShuClient.get_comments_all_sub_comments] No 'comments' key found in response: {comments_res}"
-                    )
-                    break
-                comments = comments_res["comments"]
-                if callback:
-                    await callback(note_id, comments)
-                await asyncio.sleep(crawl_interval)
-                result.extend(comments)
+                continue
+            sub_comment_has_more = comments_res.get("has_more", False)
+            sub_comment_cursor = comments_res.get("cursor", "")
+            if "comments" not in comments_res:
+                utils.logger.info(
+                    f"[XiaoHongShuClient.get_comment_all_sub_comments] No 'comments' key found in response: {comments_res}"
+                )
+                break
+            comments = comments_res["comments"]
+            if callback:
+                await callback(note_id, comments)
+            await asyncio.sleep(crawl_interval)
+            result.extend(comments)
         return result
 
     async def get_creator_info(self, user_id: str) -> Dict:
@@ -481,8 +620,11 @@ class XiaoHongShuClient(AbstractApiClient):
     async def get_all_notes_by_creator(
         self,
         user_id: str,
-        crawl_interval: float = 1.0,
+        crawl_interval: float = 0,
         callback: Optional[Callable] = None,
+        cursor: str = "",
+        max_count: Optional[int] = None,
+        cursor_callback: Optional[Callable] = None,
     ) -> List[Dict]:
         """
         获取指定用户下的所有发过的帖子，该方法会一直查找一个用户下的所有帖子信息
@@ -490,14 +632,19 @@ class XiaoHongShuClient(AbstractApiClient):
             user_id: 用户ID
             crawl_interval: 爬取一次的延迟单位（秒）
             callback: 一次分页爬取结束后的更新回调函数
+            cursor: 开始的分页游标，用于断点续爬
+            max_count: 最多获取的帖子数量，默认为 CRAWLER_MAX_NOTES_COUNT
+            cursor_callback: 一页帖子经 callback 处理完后的回调，参数为下一页的游标和这一页的帖子
 
         Returns:
 
         """
+        if max_count is None:
+            max_count = config.CRAWLER_MAX_NOTES_COUNT
         result = []
         notes_has_more = True
-        notes_cursor = ""
-        while notes_has_more and len(result) < config.CRAWLER_MAX_NOTES_COUNT:
+        notes_cursor = cursor
+        while notes_has_more and len(result) < max_count:
             notes_res = await self.get_notes_by_creator(user_id, notes_cursor)
             if not notes_res:
                 utils.logger.error(
@@ -518,13 +665,15 @@ class XiaoHongShuClient(AbstractApiClient):
                 f"[XiaoHongShuClient.get_all_notes_by_creator] got user_id:{user_id} notes len : {len(notes)}"
             )
 
-            remaining = config.CRAWLER_MAX_NOTES_COUNT - len(result)
+            remaining = max_count - len(result)
             if remaining <= 0:
                 break
 
             notes_to_add = notes[:remaining]
             if callback:
                 await callback(notes_to_add)
+            if cursor_callback:
+                await cursor_callback(notes_cursor, notes_to_add)
 
             result.extend(notes_to_add)
             await asyncio.sleep(crawl_interval)
@@ -11,9 +11,9 @@
 
 import asyncio
 import os
-import random
 import time
 from asyncio import Task
+from functools import partial
 from typing import Dict, List, Optional, Tuple
 
 from playwright.async_api import (
@@ -30,10 +30,22 @@ from base.base_crawler import AbstractCrawler
 from config import CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES
 from model.m_xiaohongshu import NoteUrlInfo
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_rotation import ProxyRotator
 from store import xhs as xhs_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from tools.concurrency_limiter import AdaptiveConcurrencyLimiter, get_concurrency_limiter
+from tools.crawl_checkpoint import (
+    CHECKPOINT_SCOPE_COMMENT,
+    CHECKPOINT_SCOPE_CREATOR,
+    CHECKPOINT_SCOPE_SEARCH,
+    PipelineCheckpointCommitter,
+    get_checkpoint_store,
+)
+from tools.crawl_pipeline import CrawlPipeline, PipelineBatch
+from tools.keyword_runner import run_keywords
+from tools.seen_index import SEEN_ITEM_COMMENTS, SEEN_ITEM_DETAIL, get_seen_index
+from var import crawler_type_var
 
 from .client import XiaoHongShuClient
 from .exception import DataFetchError
@@ -53,6 +65,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
         # self.user_agent = utils.get_user_agent()
         self.user_agent = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
         self.cdp_manager = None
+        self.proxy_rotator: Optional[ProxyRotator] = None
 
     async def start(self) -> None:
         playwright_proxy_format, httpx_proxy_format = None, None
@@ -61,6 +74,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
                 config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
             )
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            self.proxy_rotator = ProxyRotator(ip_proxy_pool, ip_proxy_info)
             playwright_proxy_format, httpx_proxy_format = self.format_proxy_info(
                 ip_proxy_info
             )
@@ -118,6 +132,10 @@ class XiaoHongShuCrawler(AbstractCrawler):
             else:
                 pass
 
+            # 释放 API 客户端持有的 HTTP 长连接
+            await self.xhs_client.close()
+            if self.proxy_rotator is not None:
+                await self.proxy_rotator.close()
             utils.logger.info("[XiaoHongShuCrawler.start] Xhs Crawler finished ...")
 
     async def search(self) -> None:
@@ -129,109 +147,152 @@ class XiaoHongShuCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < xhs_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = xhs_limit_count
         start_page = config.START_PAGE
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
-            utils.logger.info(
-                f"[XiaoHongShuCrawler.search] Current search keyword: {keyword}"
+        semaphore = get_concurrency_limiter("xhs")
+        checkpoint_store = get_checkpoint_store()
+        seen_index = get_seen_index()
+        async with CrawlPipeline("xhs.search") as pipeline:
+            # 搜索翻页 -> 详情 -> 评论 / 媒体，下一页的搜索与上一页的详情、评论同时进行
+            comment_stage = pipeline.add_stage(
+                "comment", partial(self.get_comments, semaphore=semaphore), config.PIPELINE_COMMENT_WORKERS
             )
-            page = 1
-            search_id = get_search_id()
-            while (
-                    page - start_page + 1
-            ) * xhs_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
-                if page < start_page:
-                    utils.logger.info(f"[XiaoHongShuCrawler.search] Skip page {page}")
-                    page += 1
-                    continue
-
-                try:
-                    utils.logger.info(
-                        f"[XiaoHongShuCrawler.search] search xhs keyword: {keyword}, page: {page}"
+            media_stage = pipeline.add_stage("media", self.get_notice_media, config.PIPELINE_MEDIA_WORKERS)
+
+            async def fetch_note_detail(post_item: Dict) -> None:
+                note_id = post_item.get("id")
+                # 详情和评论分别查询去重索引，详情已经爬取过时评论仍然交给评论阶段判断
+                if await seen_index.should_crawl("xhs", SEEN_ITEM_DETAIL, note_id):
+                    note_detail = await self.get_note_detail_async_task(
+                        note_id=note_id,
+                        xsec_source=post_item.get("xsec_source"),
+                        xsec_token=post_item.get("xsec_token"),
+                        semaphore=semaphore,
                     )
-                    note_ids: List[str] = []
-                    xsec_tokens: List[str] = []
-                    notes_res = await self.xhs_client.get_note_by_keyword(
-                        keyword=keyword,
-                        search_id=search_id,
-                        page=page,
-                        sort=(
-                            SearchSortType(config.SORT_TYPE)
-                            if config.SORT_TYPE != ""
-                            else SearchSortType.GENERAL
-                        ),
-                    )
-                    utils.logger.info(
-                        f"[XiaoHongShuCrawler.search] Search notes res:{notes_res}"
-                    )
-                    if not notes_res or not notes_res.get("has_more", False):
-                        utils.logger.info("No more content!")
-                        break
-                    semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
-                    task_list = [
-                        self.get_note_detail_async_task(
-                            note_id=post_item.get("id"),
-                            xsec_source=post_item.get("xsec_source"),
-                            xsec_token=post_item.get("xsec_token"),
-                            semaphore=semaphore,
+                    if not note_detail:
+                        # 抛出异常让这一页的批次失败，断点停在这一页，续爬时重新获取
+                        raise DataFetchError(f"get note detail failed, note_id: {note_id}")
+                    await xhs_store.update_xhs_note(note_detail)
+                    await seen_index.mark_crawled("xhs", SEEN_ITEM_DETAIL, note_id)
+                    if config.ENABLE_GET_IMAGES:
+                        await media_stage.put(note_detail)
+                if config.ENABLE_GET_COMMENTS:
+                    await comment_stage.put(note_id, post_item.get("xsec_token"))
+
+            detail_stage = pipeline.add_stage("detail", fetch_note_detail, config.PIPELINE_DETAIL_WORKERS)
+
+            async def search_keyword(keyword: str) -> int:
+                note_count = 0
+                checkpoint = await checkpoint_store.load("xhs", CHECKPOINT_SCOPE_SEARCH, keyword)
+                if checkpoint and checkpoint.get("finished"):
+                    return note_count
+                page = checkpoint["page"] if checkpoint else 1
+                search_id = checkpoint["search_id"] if checkpoint else get_search_id()
+                committer = PipelineCheckpointCommitter(checkpoint_store, "xhs", CHECKPOINT_SCOPE_SEARCH, keyword)
+                while (
+                        page - start_page + 1
+                ) * xhs_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
+                    if page < start_page:
+                        utils.logger.info(f"[XiaoHongShuCrawler.search] Skip page {page}")
+                        page += 1
+                        continue
+
+                    try:
+                        utils.logger.info(
+                            f"[XiaoHongShuCrawler.search] search xhs keyword: {keyword}, page: {page}"
                         )
-                        for post_item in notes_res.get("items", {})
-                        if post_item.get("model_type") not in ("rec_query", "hot_query")
-                    ]
-                    note_details = await asyncio.gather(*task_list)
-                    for note_detail in note_details:
-                        if note_detail:
-                            await xhs_store.update_xhs_note(note_detail)
-                            await self.get_notice_media(note_detail)
-                            note_ids.append(note_detail.get("note_id"))
-                            xsec_tokens.append(note_detail.get("xsec_token"))
-                    page += 1
-                    utils.logger.info(
-                        f"[XiaoHongShuCrawler.search] Note details: {note_details}"
-                    )
-                    await self.batch_get_note_comments(note_ids, xsec_tokens)
-                except DataFetchError:
-                    utils.logger.error(
-                        "[XiaoHongShuCrawler.search] Get note detail error"
-                    )
-                    break
+                        notes_res = await self.xhs_client.get_note_by_keyword(
+                            keyword=keyword,
+                            search_id=search_id,
+                            page=page,
+                            sort=(
+                                SearchSortType(config.SORT_TYPE)
+                                if config.SORT_TYPE != ""
+                                else SearchSortType.GENERAL
+                            ),
+                        )
+                        utils.logger.info(
+                            f"[XiaoHongShuCrawler.search] Search notes res:{notes_res}"
+                        )
+                        if not notes_res or not notes_res.get("has_more", False):
+                            utils.logger.info("No more content!")
+                            break
+                        page_batch = PipelineBatch()
+                        with page_batch:
+                            for post_item in notes_res.get("items", {}):
+                                if post_item.get("model_type") not in ("rec_query", "hot_query"):
+                                    await detail_stage.put(post_item)
+                                    note_count += 1
+                        page += 1
+                        # 这一页的笔记在流水线中处理完后才提交下一页的位置
+                        await committer.add(page_batch, {"page": page, "search_id": search_id})
+                    except DataFetchError:
+                        utils.logger.error(
+                            "[XiaoHongShuCrawler.search] Get note detail error"
+                        )
+                        # 出错时不标记完成，续爬时从最后提交的页继续
+                        await committer.drain()
+                        return note_count
+                if await committer.drain():
+                    await checkpoint_store.finish("xhs", CHECKPOINT_SCOPE_SEARCH, keyword)
+                return note_count
+
+            await run_keywords("XiaoHongShuCrawler.search", search_keyword)
 
     async def get_creators_and_notes(self) -> None:
         """Get creator's notes and retrieve their comment information."""
         utils.logger.info(
             "[XiaoHongShuCrawler.get_creators_and_notes] Begin get xiaohongshu creators"
         )
+        checkpoint_store = get_checkpoint_store()
         for user_id in config.XHS_CREATOR_ID_LIST:
-            # get creator detail info from web html content
-            createor_info: Dict = await self.xhs_client.get_creator_info(
-                user_id=user_id
-            )
-            if createor_info:
-                await xhs_store.save_creator(user_id, creator=createor_info)
+            checkpoint = await checkpoint_store.load("xhs", CHECKPOINT_SCOPE_CREATOR, user_id) or {}
+            if checkpoint.get("finished"):
+                continue
+            # 中断前已经保存了详情的笔记，续爬时只需要继续翻页和抓评论
+            crawled_notes: List[Dict] = checkpoint.get("notes", [])
 
-            # When proxy is not enabled, increase the crawling interval
-            if config.ENABLE_IP_PROXY:
-                crawl_interval = random.random()
-            else:
-                crawl_interval = random.uniform(1, config.CRAWLER_MAX_SLEEP_SEC)
-            # Get all note information of the creator
-            all_notes_list = await self.xhs_client.get_all_notes_by_creator(
-                user_id=user_id,
-                crawl_interval=crawl_interval,
-                callback=self.fetch_creator_notes_detail,
-            )
+            if not checkpoint:
+                # get creator detail info from web html content
+                createor_info: Dict = await self.xhs_client.get_creator_info(
+                    user_id=user_id
+                )
+                if createor_info:
+                    await xhs_store.save_creator(user_id, creator=createor_info)
+
+            if not checkpoint.get("listed"):
+                async def save_creator_checkpoint(notes_cursor: str, notes: List[Dict]) -> None:
+                    crawled_notes.extend(
+                        {"note_id": note_item.get("note_id"), "xsec_token": note_item.get("xsec_token")}
+                        for note_item in notes
+                    )
+                    await checkpoint_store.save(
+                        "xhs", CHECKPOINT_SCOPE_CREATOR, user_id, {"cursor": notes_cursor, "notes": crawled_notes}
+                    )
+
+                # Get all note information of the creator
+                await self.xhs_client.get_all_notes_by_creator(
+                    user_id=user_id,
+                    callback=self.fetch_creator_notes_detail,
+                    cursor=checkpoint.get("cursor", ""),
+                    max_count=config.CRAWLER_MAX_NOTES_COUNT - len(crawled_notes),
+                    cursor_callback=save_creator_checkpoint,
+                )
+                await checkpoint_store.save(
+                    "xhs", CHECKPOINT_SCOPE_CREATOR, user_id, {"notes": crawled_notes, "listed": True}
+                )
 
             note_ids = []
             xsec_tokens = []
-            for note_item in all_notes_list:
+            for note_item in crawled_notes:
                 note_ids.append(note_item.get("note_id"))
                 xsec_tokens.append(note_item.get("xsec_token"))
             await self.batch_get_note_comments(note_ids, xsec_tokens)
+            await checkpoint_store.finish("xhs", CHECKPOINT_SCOPE_CREATOR, user_id)
 
     async def fetch_creator_notes_detail(self, note_list: List[Dict]):
         """
         Concurrently obtain the specified post list and save the data
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter("xhs")
         task_list = [
             self.get_note_detail_async_task(
                 note_id=post_item.get("note_id"),
@@ -264,7 +325,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
                 note_id=note_url_info.note_id,
                 xsec_source=note_url_info.xsec_source,
                 xsec_token=note_url_info.xsec_token,
-                semaphore=asyncio.Semaphore(config.MAX_CONCURRENCY_NUM),
+                semaphore=get_concurrency_limiter("xhs"),
             )
             get_note_detail_task_list.append(crawler_task)
 
@@ -283,7 +344,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
             note_id: str,
             xsec_source: str,
             xsec_token: str,
-            semaphore: asyncio.Semaphore,
+            semaphore: AdaptiveConcurrencyLimiter,
     ) -> Optional[Dict]:
         """Get note detail
 
@@ -345,7 +406,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
         utils.logger.info(
             f"[XiaoHongShuCrawler.batch_get_note_comments] Begin batch get note comments, note list: {note_list}"
         )
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter("xhs")
         task_list: List[Task] = []
         for index, note_id in enumerate(note_list):
             task = asyncio.create_task(
@@ -358,25 +419,48 @@ class XiaoHongShuCrawler(AbstractCrawler):
         await asyncio.gather(*task_list)
 
     async def get_comments(
-            self, note_id: str, xsec_token: str, semaphore: asyncio.Semaphore
+            self, note_id: str, xsec_token: str, semaphore: AdaptiveConcurrencyLimiter
     ):
         """Get note comments with keyword filtering and quantity limitation"""
+        seen_index = get_seen_index()
+        if not await seen_index.should_crawl("xhs", SEEN_ITEM_COMMENTS, note_id):
+            return
+        checkpoint_store = get_checkpoint_store()
+        checkpoint = await checkpoint_store.load("xhs", CHECKPOINT_SCOPE_COMMENT, note_id) or {}
+        if checkpoint.get("finished"):
+            return
+        comment_count = checkpoint.get("count", 0)
+        comments_finished = False
+
+        async def save_comment_checkpoint(comments_cursor: str, comments: List[Dict]) -> None:
+            nonlocal comment_count
+            comment_count += len(comments)
+            await checkpoint_store.save(
+                "xhs", CHECKPOINT_SCOPE_COMMENT, note_id, {"cursor": comments_cursor, "count": comment_count}
+            )
+
+        async def finish_comments() -> None:
+            nonlocal comments_finished
+            comments_finished = True
+
         async with semaphore:
             utils.logger.info(
                 f"[XiaoHongShuCrawler.get_comments] Begin get note id comments {note_id}"
             )
-            # When proxy is not enabled, increase the crawling interval
-            if config.ENABLE_IP_PROXY:
-                crawl_interval = random.random()
-            else:
-                crawl_interval = random.uniform(1, config.CRAWLER_MAX_SLEEP_SEC)
             await self.xhs_client.get_note_all_comments(
                 note_id=note_id,
                 xsec_token=xsec_token,
-                crawl_interval=crawl_interval,
                 callback=xhs_store.batch_update_xhs_note_comments,
-                max_count=CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
+                max_count=CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES - comment_count,
+                cursor=checkpoint.get("cursor", ""),
+                cursor_callback=save_comment_checkpoint,
+                finished_callback=finish_comments,
             )
+        if not comments_finished:
+            # 评论翻页提前结束，不标记完成，下次从最后提交的游标继续
+            return
+        await checkpoint_store.finish("xhs", CHECKPOINT_SCOPE_COMMENT, note_id)
+        await seen_index.mark_crawled("xhs", SEEN_ITEM_COMMENTS, note_id)
 
     @staticmethod
     def format_proxy_info(
@@ -403,6 +487,7 @@ class XiaoHongShuCrawler(AbstractCrawler):
         )
         xhs_client_obj = XiaoHongShuClient(
             proxies=httpx_proxy,
+            proxy_rotator=self.proxy_rotator,
             headers={
                 "accept": "application/json, text/plain, */*",
                 "accept-language": "zh-CN,zh;q=0.9",
@@ -496,6 +581,8 @@ class XiaoHongShuCrawler(AbstractCrawler):
 
     async def close(self):
         """Close browser context"""
+        if getattr(self, "xhs_client", None):
+            await self.xhs_client.close()
         # 如果使用CDP模式，需要特殊处理
         if self.cdp_manager:
             await self.cdp_manager.cleanup()
@@ -15,7 +15,6 @@ import json
 from typing import Any, Callable, Dict, List, Optional, Union
 from urllib.parse import urlencode
 
-import httpx
 from httpx import Response
 from playwright.async_api import BrowserContext, Page
 from tenacity import retry, stop_after_attempt, wait_fixed
@@ -24,11 +23,14 @@ import config
 from base.base_crawler import AbstractApiClient
 from constant import zhihu as zhihu_constant
 from model.m_zhihu import ZhihuComment, ZhihuContent, ZhihuCreator
+from proxy.proxy_rotation import ProxyRotator, is_blocked_status
 from tools import utils
+from tools.crawl_pipeline import gather_with_limit
+from tools.http_client import AsyncHttpClientPool
 
 from .exception import DataFetchError, ForbiddenError
 from .field import SearchSort, SearchTime, SearchType
-from .help import ZhihuExtractor, sign
+from .help import ZHIHU_SGIN_JS_POOL, ZhihuExtractor, sign
 
 
 class ZhiHuClient(AbstractApiClient):
@@ -37,6 +39,7 @@ class ZhiHuClient(AbstractApiClient):
             timeout=10,
             proxies=None,
             *,
+            proxy_rotator: Optional[ProxyRotator] = None,
             headers: Dict[str, str],
             playwright_page: Page,
             cookie_dict: Dict[str, str],
@@ -46,6 +49,18 @@ class ZhiHuClient(AbstractApiClient):
         self.default_headers = headers
         self.cookie_dict = cookie_dict
         self._extractor = ZhihuExtractor()
+        self._http_pool = AsyncHttpClientPool(
+            platform="zhihu", proxy_rotator=proxy_rotator, is_blocked=is_blocked_status
+        )
+
+    async def close(self):
+        """
+        关闭客户端持有的 HTTP 连接池和 JS 签名进程池
+        Returns:
+
+        """
+        await self._http_pool.aclose()
+        await ZHIHU_SGIN_JS_POOL.close()
 
     async def _pre_headers(self, url: str) -> Dict:
         """
@@ -58,7 +73,7 @@ class ZhiHuClient(AbstractApiClient):
         d_c0 = self.cookie_dict.get("d_c0")
         if not d_c0:
             raise Exception("d_c0 not found in cookies")
-        sign_res = sign(url, self.default_headers["cookie"])
+        sign_res = await sign(url, self.default_headers["cookie"])
         headers = self.default_headers.copy()
         headers['x-zst-81'] = sign_res["x-zst-81"]
         headers['x-zse-96'] = sign_res["x-zse-96"]
@@ -79,11 +94,10 @@ class ZhiHuClient(AbstractApiClient):
         # return response.text
         return_response = kwargs.pop('return_response', False)
 
-        async with httpx.AsyncClient(proxies=self.proxies, ) as client:
-            response = await client.request(
-                method, url, timeout=self.timeout,
-                **kwargs
-            )
+        response = await self._http_pool.request(
+            method, url, proxies=self.proxies, timeout=self.timeout,
+            **kwargs
+        )
 
         if response.status_code != 200:
             utils.logger.error(f"[ZhiHuClient.request] Requset Url: {url}, Request error: {response.text}")
@@ -259,7 +273,7 @@ class ZhiHuClient(AbstractApiClient):
         }
         return await self.get(uri, params)
 
-    async def get_note_all_comments(self, content: ZhihuContent, crawl_interval: float = 1.0,
+    async def get_note_all_comments(self, content: ZhihuContent, crawl_interval: float = 0,
                                     callback: Optional[Callable] = None) -> List[ZhihuComment]:
         """
         获取指定帖子下的所有一级评论，该方法会一直查找一个帖子下的所有评论信息
@@ -295,7 +309,7 @@ class ZhiHuClient(AbstractApiClient):
             await asyncio.sleep(crawl_interval)
         return result
 
-    async def get_comments_all_sub_comments(self, content: ZhihuContent, comments: List[ZhihuComment], crawl_interval: float = 1.0,
+    async def get_comments_all_sub_comments(self, content: ZhihuContent, comments: List[ZhihuComment], crawl_interval: float = 0,
                                             callback: Optional[Callable] = None) -> List[ZhihuComment]:
         """
         获取指定评论下的所有子评论
@@ -311,31 +325,51 @@ class ZhiHuClient(AbstractApiClient):
         if not config.ENABLE_GET_SUB_COMMENTS:
             return []
 
+        # 每条一级评论的子评论翻页互不依赖，同一内容下最多 SUB_COMMENT_CONCURRENCY_NUM 条并发翻页
+        sub_comments_list = await gather_with_limit(
+            [
+                self.get_comment_all_sub_comments(content, parment_comment, crawl_interval, callback)
+                for parment_comment in comments if parment_comment.sub_comment_count != 0
+            ],
+            config.SUB_COMMENT_CONCURRENCY_NUM,
+        )
+        return [sub_comment for sub_comments in sub_comments_list for sub_comment in sub_comments]
+
+    async def get_comment_all_sub_comments(self, content: ZhihuContent, parment_comment: ZhihuComment,
+                                           crawl_interval: float = 0,
+                                           callback: Optional[Callable] = None) -> List[ZhihuComment]:
+        """
+        获取一条评论下的所有子评论
+        Args:
+            content: 内容详情对象(问题｜文章｜视频)
+            parment_comment: 一级评论
+            crawl_interval: 爬取一次笔记的延迟单位（秒）
+            callback: 一次笔记爬取结束后
+
+        Returns:
+
+        """
         all_sub_comments: List[ZhihuComment] = []
-        for parment_comment in comments:
-            if parment_comment.sub_comment_count == 0:
-                continue
-
-            is_end: bool = False
-            offset: str = ""
-            limit: int = 10
-            while not is_end:
-                child_comment_res = await self.get_child_comments(parment_comment.comment_id, offset, limit)
-                if not child_comment_res:
-                    break
-                paging_info = child_comment_res.get("paging", {})
-                is_end = paging_info.get("is_end")
-                offset = self._extractor.extract_offset(paging_info)
-                sub_comments = self._extractor.extract_comments(content, child_comment_res.get("data"))
-
-                if not sub_comments:
-                    break
-
-                if callback:
-                    await callback(sub_comments)
-
-                all_sub_comments.extend(sub_comments)
-                await asyncio.sleep(crawl_interval)
+        is_end: bool = False
+        offset: str = ""
+        limit: int = 10
+        while not is_end:
+            child_comment_res = await self.get_child_comments(parment_comment.comment_id, offset, limit)
+            if not child_comment_res:
+                break
+            paging_info = child_comment_res.get("paging", {})
+            is_end = paging_info.get("is_end")
+            offset = self._extractor.extract_offset(paging_info)
+            sub_comments = self._extractor.extract_comments(content, child_comment_res.get("data"))
+
+            if not sub_comments:
+                break
+
+            if callback:
+                await callback(sub_comments)
+
+            all_sub_comments.extend(sub_comments)
+            await asyncio.sleep(crawl_interval)
         return all_sub_comments
 
     async def get_creator_info(self, url_token: str) -> Optional[ZhihuCreator]:
@@ -412,7 +446,7 @@ class ZhiHuClient(AbstractApiClient):
         }
         return await self.get(uri, params)
 
-    async def get_all_anwser_by_creator(self, creator: ZhihuCreator, crawl_interval: float = 1.0,
+    async def get_all_anwser_by_creator(self, creator: ZhihuCreator, crawl_interval: float = 0,
                                         callback: Optional[Callable] = None) -> List[ZhihuContent]:
         """
         获取创作者的所有回答
@@ -444,7 +478,7 @@ class ZhiHuClient(AbstractApiClient):
         return all_contents
 
 
-    async def get_all_articles_by_creator(self, creator: ZhihuCreator, crawl_interval: float = 1.0,
+    async def get_all_articles_by_creator(self, creator: ZhihuCreator, crawl_interval: float = 0,
                                           callback: Optional[Callable] = None) -> List[ZhihuContent]:
         """
         获取创作者的所有文章
@@ -475,7 +509,7 @@ class ZhiHuClient(AbstractApiClient):
         return all_contents
 
 
-    async def get_all_videos_by_creator(self, creator: ZhihuCreator, crawl_interval: float = 1.0,
+    async def get_all_videos_by_creator(self, creator: ZhihuCreator, crawl_interval: float = 0,
                                         callback: Optional[Callable] = None) -> List[ZhihuContent]:
         """
         获取创作者的所有视频
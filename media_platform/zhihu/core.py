@@ -29,10 +29,14 @@ from constant import zhihu as constant
 from base.base_crawler import AbstractCrawler
 from model.m_zhihu import ZhihuContent, ZhihuCreator
 from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
+from proxy.proxy_rotation import ProxyRotator
 from store import zhihu as zhihu_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
-from var import crawler_type_var, source_keyword_var
+from tools.concurrency_limiter import AdaptiveConcurrencyLimiter, get_concurrency_limiter
+from tools.crawl_checkpoint import CHECKPOINT_SCOPE_SEARCH, get_checkpoint_store
+from tools.keyword_runner import run_keywords
+from var import crawler_type_var
 
 from .client import ZhiHuClient
 from .exception import DataFetchError
@@ -52,6 +56,7 @@ class ZhihuCrawler(AbstractCrawler):
         self.user_agent = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36"
         self._extractor = ZhihuExtractor()
         self.cdp_manager = None
+        self.proxy_rotator: Optional[ProxyRotator] = None
 
     async def start(self) -> None:
         """
@@ -65,6 +70,7 @@ class ZhihuCrawler(AbstractCrawler):
                 config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
             )
             ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            self.proxy_rotator = ProxyRotator(ip_proxy_pool, ip_proxy_info)
             playwright_proxy_format, httpx_proxy_format = self.format_proxy_info(
                 ip_proxy_info
             )
@@ -130,6 +136,10 @@ class ZhihuCrawler(AbstractCrawler):
             else:
                 pass
 
+            # 释放 API 客户端持有的 HTTP 长连接
+            await self.zhihu_client.close()
+            if self.proxy_rotator is not None:
+                await self.proxy_rotator.close()
             utils.logger.info("[ZhihuCrawler.start] Zhihu Crawler finished ...")
 
     async def search(self) -> None:
@@ -139,12 +149,14 @@ class ZhihuCrawler(AbstractCrawler):
         if config.CRAWLER_MAX_NOTES_COUNT < zhihu_limit_count:
             config.CRAWLER_MAX_NOTES_COUNT = zhihu_limit_count
         start_page = config.START_PAGE
-        for keyword in config.KEYWORDS.split(","):
-            source_keyword_var.set(keyword)
-            utils.logger.info(
-                f"[ZhihuCrawler.search] Current search keyword: {keyword}"
-            )
-            page = 1
+        checkpoint_store = get_checkpoint_store()
+
+        async def search_keyword(keyword: str) -> int:
+            content_count = 0
+            checkpoint = await checkpoint_store.load("zhihu", CHECKPOINT_SCOPE_SEARCH, keyword)
+            if checkpoint and checkpoint.get("finished"):
+                return content_count
+            page = checkpoint["page"] if checkpoint else 1
             while (
                 page - start_page + 1
             ) * zhihu_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
@@ -173,11 +185,18 @@ class ZhihuCrawler(AbstractCrawler):
                     page += 1
                     for content in content_list:
                         await zhihu_store.update_zhihu_content(content)
+                    content_count += len(content_list)
 
                     await self.batch_get_content_comments(content_list)
+                    await checkpoint_store.save("zhihu", CHECKPOINT_SCOPE_SEARCH, keyword, {"page": page})
                 except DataFetchError:
                     utils.logger.error("[ZhihuCrawler.search] Search content error")
-                    return
+                    # 出错时不标记完成，续爬时从最后提交的页继续
+                    return content_count
+            await checkpoint_store.finish("zhihu", CHECKPOINT_SCOPE_SEARCH, keyword)
+            return content_count
+
+        await run_keywords("ZhihuCrawler.search", search_keyword)
 
     async def batch_get_content_comments(self, content_list: List[ZhihuContent]):
         """
@@ -194,7 +213,7 @@ class ZhihuCrawler(AbstractCrawler):
             )
             return
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = get_concurrency_limiter("zhihu")
         task_list: List[Task] = []
         for content_item in content_list:
             task = asyncio.create_task(
@@ -204,7 +223,7 @@ class ZhihuCrawler(AbstractCrawler):
         await asyncio.gather(*task_list)
 
     async def get_comments(
-        self, content_item: ZhihuContent, semaphore: asyncio.Semaphore
+        self, content_item: ZhihuContent, semaphore: AdaptiveConcurrencyLimiter
     ):
         """
         Get note comments with keyword filtering and quantity limitation
@@ -221,7 +240,6 @@ class ZhihuCrawler(AbstractCrawler):
             )
             await self.zhihu_client.get_note_all_comments(
                 content=content_item,
-                crawl_interval=random.random(),
                 callback=zhihu_store.batch_update_zhihu_note_comments,
             )
 
@@ -259,7 +277,6 @@ class ZhihuCrawler(AbstractCrawler):
             # Get all anwser information of the creator
             all_content_list = await self.zhihu_client.get_all_anwser_by_creator(
                 creator=createor_info,
-                crawl_interval=random.random(),
                 callback=zhihu_store.batch_update_zhihu_contents,
             )
 
@@ -281,7 +298,7 @@ class ZhihuCrawler(AbstractCrawler):
             await self.batch_get_content_comments(all_content_list)
 
     async def get_note_detail(
-        self, full_note_url: str, semaphore: asyncio.Semaphore
+        self, full_note_url: str, semaphore: AdaptiveConcurrencyLimiter
     ) -> Optional[ZhihuContent]:
         """
         Get note detail
@@ -332,7 +349,7 @@ class ZhihuCrawler(AbstractCrawler):
             full_note_url = full_note_url.split("?")[0]
             crawler_task = self.get_note_detail(
                 full_note_url=full_note_url,
-                semaphore=asyncio.Semaphore(config.MAX_CONCURRENCY_NUM),
+                semaphore=get_concurrency_limiter("zhihu"),
             )
             get_note_detail_task_list.append(crawler_task)
 
@@ -376,6 +393,7 @@ class ZhihuCrawler(AbstractCrawler):
         )
         zhihu_client_obj = ZhiHuClient(
             proxies=httpx_proxy,
+            proxy_rotator=self.proxy_rotator,
             headers={
                 "accept": "*/*",
                 "accept-language": "zh-CN,zh;q=0.9",
@@ -461,6 +479,8 @@ class ZhihuCrawler(AbstractCrawler):
 
     async def close(self):
         """Close browser context"""
+        if getattr(self, "zhihu_client", None):
+            await self.zhihu_client.close()
         # 如果使用CDP模式，需要特殊处理
         if self.cdp_manager:
             await self.cdp_manager.cleanup()
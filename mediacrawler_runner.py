@@ -13,6 +13,13 @@ from base.base_crawler import AbstractCrawler
 from media_platform.douyin.client import DOUYINClient
 import db
 from tools import utils
+from tools.async_file_writer import close_all_writers
+from tools.crawl_checkpoint import close_crawl_checkpoint, init_crawl_checkpoint
+from tools.js_sign_pool import close_js_sign_pools
+from tools.seen_index import close_seen_index
+from store.store_registry import close_all_stores
+from store.write_behind import StoreWriteError, close_store_pipeline
+from tools.analysis_executor import close_analysis_executor
 from constant.platform_map import PLATFORM_CRAWLERS_MAP # 导入平台爬虫映射
 
 # 定义一个类来管理爬虫的创建和运行，类似于 main.py 中的 CrawlerFactory
@@ -103,12 +110,14 @@ class MediacrawlerApiRunner:
                 raise # 如果数据库初始化失败，则阻止爬取并报告错误
 
         # --- 4. 创建并启动爬虫 ---
+        store_error: Optional[StoreWriteError] = None
         try:
             crawler_class = self.CRAWLERS.get(platform)
             if not crawler_class:
                 supported_platforms = ", ".join(self.CRAWLERS.keys())
                 raise ValueError(f"无效的媒体平台: {platform}。支持的平台有: {supported_platforms}")
             
+            await init_crawl_checkpoint(platform) # 不续爬时清空上次留下的断点
             # 类型断言，帮助IDE识别 _crawler 的具体类型
             self._crawler: AbstractCrawler = crawler_class()
             print(f"Starting crawl for platform: {platform}, type: {crawl_type}...")
@@ -121,7 +130,7 @@ class MediacrawlerApiRunner:
             # 如果您需要将爬取的数据直接返回给 n8n，您需要在 MediaCrawler 内部
             # 或在此处增加逻辑，从数据库中查询最新数据并序列化返回。
             # For simplicity, we just return status and parameters.
-            return {
+            result = {
                 "status": "success",
                 "message": "MediaCrawler task initiated successfully.",
                 "platform": platform,
@@ -140,6 +149,16 @@ class MediacrawlerApiRunner:
             # --- 6. 清理和恢复原始 config 值 ---
             if self._crawler:
                 pass # 根据 MediaCrawler 的设计，可能不需要显式关闭
+            try:
+                await close_store_pipeline() # 写完存储队列中排队的数据
+            except StoreWriteError as e:
+                store_error = e
+            await close_all_stores() # 关闭存储实例，释放文件句柄等资源
+            await close_analysis_executor() # 关闭分词、词云的进程池
+            await close_all_writers() # 落盘 jsonl 写入器中缓冲的数据
+            await close_crawl_checkpoint() # 关闭断点数据库
+            await close_seen_index() # 关闭去重索引数据库
+            await close_js_sign_pools() # 关闭共享的 node 签名进程池
             if config.SAVE_DATA_OPTION in ["db", "sqlite"]:
                 await db.close() # 关闭数据库连接
                 print("Database connection closed.")
@@ -152,3 +171,8 @@ class MediacrawlerApiRunner:
                         setattr(config, attr, original_value.copy())
                     else:
                         setattr(config, attr, original_value)
+
+        # 有数据写入失败时不能报告成功
+        if store_error is not None:
+            raise store_error
+        return result
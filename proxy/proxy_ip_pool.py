@@ -13,8 +13,9 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2023/12/2 13:45
 # @Desc    : ip代理池实现
-import random
-from typing import Dict, List
+import asyncio
+import time
+from typing import Dict, List, Optional
 
 import httpx
 from tenacity import retry, stop_after_attempt, wait_fixed
@@ -27,28 +28,81 @@ from .base_proxy import ProxyProvider
 from .types import IpInfoModel, ProviderNameEnum
 
 
+def make_proxy_key(proxy: IpInfoModel) -> str:
+    return f"{proxy.ip}:{proxy.port}"
+
+
+class ProxyHealth:
+    """
+    代理的健康状态，延迟取指数滑动平均，错误率做平滑避免样本少时大起大落，
+    分数 = 平均延迟（秒） + 错误率 * IP_PROXY_FAILURE_PENALTY，分数越低越健康
+    """
+
+    def __init__(self, proxy: IpInfoModel, latency: Optional[float] = None):
+        self.proxy = proxy
+        self.latency = latency
+        self.success_count = 0
+        self.failure_count = 0
+        self.in_use_count = 0
+
+    @property
+    def error_rate(self) -> float:
+        return (self.failure_count + 1) / (self.success_count + self.failure_count + 2)
+
+    @property
+    def score(self) -> float:
+        latency = self.latency if self.latency is not None else config.IP_PROXY_DEFAULT_LATENCY
+        return latency + self.error_rate * config.IP_PROXY_FAILURE_PENALTY
+
+    def record_success(self, latency: Optional[float] = None) -> None:
+        self.success_count += 1
+        if latency is not None:
+            self.latency = latency if self.latency is None else 0.7 * self.latency + 0.3 * latency
+
+    def record_failure(self) -> None:
+        self.failure_count += 1
+
+
 class ProxyIpPool:
+    """
+    代理池：后台任务在可用代理低于水位线时提前向代理商提取新 IP，并发验证后放入池中，
+    get_proxy 按健康分数返回最好的代理，不等待代理商接口和验证（池子为空时除外）
+    """
+
     def __init__(self, ip_pool_count: int, enable_validate_ip: bool, ip_provider: ProxyProvider) -> None:
         """
 
         Args:
-            ip_pool_count:
-            enable_validate_ip:
-            ip_provider:
+            ip_pool_count: 池子中保持的代理数量
+            enable_validate_ip: 是否验证代理
+            ip_provider: 代理商
         """
         self.valid_ip_url = "https://echo.apifox.cn/"  # 验证 IP 是否有效的地址
         self.ip_pool_count = ip_pool_count
         self.enable_validate_ip = enable_validate_ip
-        self.proxy_list: List[IpInfoModel] = []
         self.ip_provider: ProxyProvider = ip_provider
+        self.low_water_mark = max(1, min(config.IP_PROXY_POOL_LOW_WATER_MARK, ip_pool_count))
+        self._proxies: Dict[str, ProxyHealth] = {}
+        # 被淘汰的代理，代理商缓存中再次返回时不再放入池中，过期后从这里移除
+        self._evicted_proxies: Dict[str, IpInfoModel] = {}
+        self._refill_event = asyncio.Event()
+        self._available_event = asyncio.Event()
+        self._refill_lock = asyncio.Lock()
+        self._refill_task: Optional[asyncio.Task] = None
+
+    @property
+    def proxy_list(self) -> List[IpInfoModel]:
+        return [health.proxy for health in self._proxies.values()]
 
     async def load_proxies(self) -> None:
         """
-        加载IP代理
+        加载IP代理，并启动后台补充任务
         Returns:
 
         """
-        self.proxy_list = await self.ip_provider.get_proxies(self.ip_pool_count)
+        await self._refill()
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill_loop())
 
     async def _is_valid_proxy(self, proxy: IpInfoModel) -> bool:
         """
@@ -56,44 +110,174 @@ class ProxyIpPool:
         :param proxy:
         :return:
         """
-        utils.logger.info(f"[ProxyIpPool._is_valid_proxy] testing {proxy.ip} is it valid ")
+        return await self._measure_proxy(proxy) is not None
+
+    async def _measure_proxy(self, proxy: IpInfoModel) -> Optional[float]:
+        """
+        通过代理请求验证地址，返回延迟（秒），代理无效时返回 None
+        :param proxy:
+        :return:
+        """
+        utils.logger.info(f"[ProxyIpPool._measure_proxy] testing {proxy.ip} is it valid ")
         try:
             httpx_proxy = {
                 f"{proxy.protocol}": f"http://{proxy.user}:{proxy.password}@{proxy.ip}:{proxy.port}"
             }
-            async with httpx.AsyncClient(proxies=httpx_proxy) as client:
+            start_time = time.monotonic()
+            async with httpx.AsyncClient(proxies=httpx_proxy, timeout=config.IP_PROXY_VALIDATE_TIMEOUT) as client:
                 response = await client.get(self.valid_ip_url)
             if response.status_code == 200:
-                return True
-            else:
-                return False
+                return time.monotonic() - start_time
+            return None
         except Exception as e:
-            utils.logger.info(f"[ProxyIpPool._is_valid_proxy] testing {proxy.ip} err: {e}")
-            raise e
+            utils.logger.info(f"[ProxyIpPool._measure_proxy] testing {proxy.ip} err: {e}")
+            return None
+
+    @staticmethod
+    def _is_expired(proxy: IpInfoModel) -> bool:
+        # 只有 unix 时间戳格式的过期时间才能判断，留出一点余量避免拿到马上过期的代理
+        expired_time_ts = proxy.expired_time_ts
+        if not expired_time_ts or expired_time_ts < 1_000_000_000:
+            return False
+        return expired_time_ts <= utils.get_unix_timestamp() + config.IP_PROXY_EXPIRE_MARGIN
+
+    async def _refill(self) -> None:
+        """
+        从代理商提取不足的代理，并发验证后放入池中
+        Returns:
+
+        """
+        async with self._refill_lock:
+            self._drop_expired()
+            need_count = self.ip_pool_count - len(self._proxies)
+            if need_count <= 0:
+                return
+            # 代理商优先从缓存返回 IP，池中的和被淘汰的代理也在缓存里，
+            # 只提取 need_count 个会一直拿到这些 IP，需要把它们的数量算进去，超出的部分不放入池中
+            fetch_count = need_count + len(self._proxies) + len(self._evicted_proxies)
+            candidates: Dict[str, IpInfoModel] = {}
+            for proxy in await self.ip_provider.get_proxies(fetch_count):
+                proxy_key = make_proxy_key(proxy)
+                if proxy_key in self._proxies or proxy_key in self._evicted_proxies or self._is_expired(proxy):
+                    continue
+                candidates[proxy_key] = proxy
+                if len(candidates) >= need_count:
+                    break
+
+            if self.enable_validate_ip:
+                latencies = await asyncio.gather(*[self._measure_proxy(proxy) for proxy in candidates.values()])
+            else:
+                latencies = [None] * len(candidates)
+            for (proxy_key, proxy), latency in zip(candidates.items(), latencies):
+                if self.enable_validate_ip and latency is None:
+                    # 验证失败的代理同样不再放入池中，否则下次补充时缓存还会返回它
+                    self._evicted_proxies[proxy_key] = proxy
+                    continue
+                self._proxies[proxy_key] = ProxyHealth(proxy, latency)
+            if self._proxies:
+                self._available_event.set()
+
+    async def _refill_loop(self) -> None:
+        """
+        后台补充任务，被唤醒后补充代理，补充失败或仍低于水位线时隔一段时间重试
+        Returns:
+
+        """
+        while True:
+            await self._refill_event.wait()
+            self._refill_event.clear()
+            try:
+                await self._refill()
+            except Exception as e:
+                utils.logger.error(f"[ProxyIpPool._refill_loop] refill proxies error: {e}")
+            if len(self._proxies) < self.low_water_mark:
+                await asyncio.sleep(config.IP_PROXY_REFILL_RETRY_INTERVAL)
+                self._refill_event.set()
+
+    def _drop_expired(self) -> None:
+        for proxy_key, health in list(self._proxies.items()):
+            if self._is_expired(health.proxy):
+                del self._proxies[proxy_key]
+        for proxy_key, proxy in list(self._evicted_proxies.items()):
+            if self._is_expired(proxy):
+                del self._evicted_proxies[proxy_key]
+        if not self._proxies:
+            self._available_event.clear()
+
+    def _check_water_mark(self) -> None:
+        if len(self._proxies) < self.low_water_mark:
+            self._refill_event.set()
 
     @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
     async def get_proxy(self) -> IpInfoModel:
         """
-        从代理池中随机提取一个代理IP
+        从代理池中提取健康分数最好的代理IP，分数相同时优先使用次数少的
+        :return:
+        """
+        self._drop_expired()
+        self._check_water_mark()
+        if not self._proxies:
+            if self._refill_task is None or self._refill_task.done():
+                await self.load_proxies()
+            else:
+                await asyncio.wait_for(self._available_event.wait(), timeout=config.IP_PROXY_WAIT_TIMEOUT)
+        if not self._proxies:
+            raise Exception("[ProxyIpPool.get_proxy] no available proxy and again get it")
+
+        health = min(self._proxies.values(), key=lambda item: (item.score, item.in_use_count))
+        health.in_use_count += 1
+        return health.proxy
+
+    def report_success(self, proxy: IpInfoModel, latency: Optional[float] = None) -> None:
+        """
+        记录代理请求成功
+        :param proxy:
+        :param latency: 请求耗时（秒）
         :return:
         """
-        if len(self.proxy_list) == 0:
-            await self._reload_proxies()
+        health = self._proxies.get(make_proxy_key(proxy))
+        if health is not None:
+            health.record_success(latency)
 
-        proxy = random.choice(self.proxy_list)
-        self.proxy_list.remove(proxy) # 取出来一个IP就应该移出掉
-        if self.enable_validate_ip:
-            if not await self._is_valid_proxy(proxy):
-                raise Exception("[ProxyIpPool.get_proxy] current ip invalid and again get it")
-        return proxy
+    def report_failure(self, proxy: IpInfoModel) -> None:
+        """
+        记录代理请求失败，错误率过高的代理会被淘汰
+        :param proxy:
+        :return:
+        """
+        health = self._proxies.get(make_proxy_key(proxy))
+        if health is None:
+            return
+        health.record_failure()
+        if health.failure_count >= config.IP_PROXY_MAX_FAILURES and health.error_rate > 0.5:
+            self.evict(proxy)
+
+    def evict(self, proxy: IpInfoModel) -> None:
+        """
+        从池中淘汰代理（例如被平台封禁），并唤醒后台任务补充
+        :param proxy:
+        :return:
+        """
+        proxy_key = make_proxy_key(proxy)
+        self._evicted_proxies[proxy_key] = proxy
+        if self._proxies.pop(proxy_key, None) is not None:
+            utils.logger.info(f"[ProxyIpPool.evict] evict proxy {proxy.ip}:{proxy.port}")
+        if not self._proxies:
+            self._available_event.clear()
+        self._check_water_mark()
 
-    async def _reload_proxies(self):
+    async def close(self) -> None:
         """
-        # 重新加载代理池
+        停止后台补充任务
         :return:
         """
-        self.proxy_list = []
-        await self.load_proxies()
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
 
 
 IpProxyProvider: Dict[str, ProxyProvider] = {
@@ -0,0 +1,147 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 代理轮换策略，请求命中平台封禁信号时淘汰当前代理，换新代理透明重试
+import asyncio
+import json
+from typing import Dict
+
+import httpx
+
+import config
+from tools import utils
+
+from .proxy_ip_pool import ProxyIpPool
+from .types import IpInfoModel
+
+# 代理出口不可用导致的异常，换代理重试，但不直接淘汰代理（由失败率决定）
+PROXY_TRANSPORT_ERRORS = (httpx.ProxyError, httpx.ConnectError, httpx.ConnectTimeout)
+
+
+def is_blocked_status(response: httpx.Response) -> bool:
+    """
+    通用的封禁信号：HTTP 403 / 429
+    Args:
+        response: 响应
+
+    Returns:
+
+    """
+    return response.status_code in (403, 429)
+
+
+def is_blocked_json_code(response: httpx.Response, code: int) -> bool:
+    """
+    判断 JSON 响应体中的 code 是否为平台的封禁错误码，先在原始字节中查找错误码，避免每个响应都解析 JSON
+    Args:
+        response: 响应
+        code: 平台的封禁错误码
+
+    Returns:
+
+    """
+    if str(code).encode() not in response.content:
+        return False
+    try:
+        data = response.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return False
+    return isinstance(data, dict) and data.get("code") == code
+
+
+class ProxyRotator:
+    """
+    一个爬虫共享的当前代理：请求命中封禁信号时从代理池淘汰当前代理并换一个新的，
+    并发请求同时命中时只轮换一次；请求结果回报给代理池用于健康评分
+    """
+
+    def __init__(self, ip_pool: ProxyIpPool, proxy: IpInfoModel) -> None:
+        """
+        Args:
+            ip_pool: 代理池
+            proxy: 初始代理
+        """
+        self.ip_pool = ip_pool
+        self.proxy = proxy
+        self._lock = asyncio.Lock()
+
+    @property
+    def httpx_proxies(self) -> Dict[str, str]:
+        _, httpx_proxies = utils.format_proxy_info(self.proxy)
+        return httpx_proxies
+
+    async def rotate(self, bad_proxy: IpInfoModel, evict: bool = True) -> IpInfoModel:
+        """
+        更换当前代理，bad_proxy 已经被其他请求换掉时直接返回新的代理
+        Args:
+            bad_proxy: 出问题的代理
+            evict: 是否从代理池淘汰 bad_proxy
+
+        Returns:
+            新的当前代理
+
+        """
+        async with self._lock:
+            if evict:
+                self.ip_pool.evict(bad_proxy)
+            if self.proxy is bad_proxy:
+                self.proxy = await self.ip_pool.get_proxy()
+                utils.logger.info(
+                    f"[ProxyRotator.rotate] rotate proxy {bad_proxy.ip}:{bad_proxy.port} -> {self.proxy.ip}:{self.proxy.port}"
+                )
+            return self.proxy
+
+    async def request(self, http_pool, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        使用当前代理发起请求，命中封禁信号时淘汰代理、代理连接失败时换代理，每次重试同样需要获取限速令牌，
+        最多重试 IP_PROXY_ROTATE_MAX_RETRIES 次，重试用尽后返回最后一次的响应交给平台客户端处理
+        Args:
+            http_pool: tools.http_client.AsyncHttpClientPool，封禁信号由它的 is_blocked 判断
+            method: 请求方法
+            url: 请求的URL
+            **kwargs: 其他请求参数
+
+        Returns:
+
+        """
+        max_retries = max(0, config.IP_PROXY_ROTATE_MAX_RETRIES)
+        for attempt in range(max_retries + 1):
+            proxy = self.proxy
+            try:
+                response, blocked, latency = await http_pool.send(self.httpx_proxies, method, url, **kwargs)
+            except PROXY_TRANSPORT_ERRORS as e:
+                self.ip_pool.report_failure(proxy)
+                if attempt >= max_retries:
+                    raise
+                utils.logger.warning(f"[ProxyRotator.request] proxy {proxy.ip}:{proxy.port} error: {e!r}, rotate proxy")
+                await self.rotate(proxy, evict=False)
+                continue
+
+            if blocked:
+                if attempt >= max_retries:
+                    self.ip_pool.report_failure(proxy)
+                    return response
+                utils.logger.warning(
+                    f"[ProxyRotator.request] proxy {proxy.ip}:{proxy.port} blocked, status: {response.status_code}, url: {url}"
+                )
+                await self.rotate(proxy)
+                continue
+
+            self.ip_pool.report_success(proxy, latency)
+            return response
+
+    async def close(self) -> None:
+        """
+        停止代理池的后台补充任务
+        :return:
+        """
+        await self.ip_pool.close()
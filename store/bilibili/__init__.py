@@ -14,9 +14,10 @@
 # @Time    : 2024/1/14 19:34
 # @Desc    :
 
-from typing import List
+from typing import List, Optional
 
 import config
+from store.store_registry import get_store
 from var import source_keyword_var
 
 from .bilibili_store_impl import *
@@ -28,17 +29,19 @@ class BiliStoreFactory:
         "csv": BiliCsvStoreImplement,
         "db": BiliDbStoreImplement,
         "json": BiliJsonStoreImplement,
+        "jsonl": BiliJsonlStoreImplement,
+        "parquet": BiliParquetStoreImplement,
         "sqlite": BiliSqliteStoreImplement,
     }
 
     @staticmethod
     def create_store() -> AbstractStore:
-        store_class = BiliStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
-        if not store_class:
+        store = get_store("bili", BiliStoreFactory.STORES)
+        if not store:
             raise ValueError(
-                "[BiliStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite ..."
+                "[BiliStoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or parquet or sqlite ..."
             )
-        return store_class()
+        return store
 
 
 async def update_bilibili_video(video_item: Dict):
@@ -98,11 +101,25 @@ async def update_up_info(video_item: Dict):
 async def batch_update_bilibili_video_comments(video_id: str, comments: List[Dict]):
     if not comments:
         return
+    save_comment_items = []
     for comment_item in comments:
-        await update_bilibili_video_comment(video_id, comment_item)
+        save_comment_item = _build_bilibili_video_comment(video_id, comment_item)
+        if save_comment_item:
+            save_comment_items.append(save_comment_item)
+    # 一页评论交给存储层一次写入
+    await BiliStoreFactory.create_store().store_comments(save_comment_items)
 
 
-async def update_bilibili_video_comment(video_id: str, comment_item: Dict):
+def _build_bilibili_video_comment(video_id: str, comment_item: Dict) -> Optional[Dict]:
+    """
+    将B站视频评论转换为入库的字段
+    Args:
+        video_id:
+        comment_item:
+
+    Returns:
+
+    """
     comment_id = str(comment_item.get("rpid"))
     parent_comment_id = str(comment_item.get("parent", 0))
     content: Dict = comment_item.get("content")
@@ -126,7 +143,13 @@ async def update_bilibili_video_comment(video_id: str, comment_item: Dict):
     utils.logger.info(
         f"[store.bilibili.update_bilibili_video_comment] Bilibili video comment: {comment_id}, content: {save_comment_item.get('content')}"
     )
-    await BiliStoreFactory.create_store().store_comment(comment_item=save_comment_item)
+    return save_comment_item
+
+
+async def update_bilibili_video_comment(video_id: str, comment_item: Dict):
+    save_comment_item = _build_bilibili_video_comment(video_id, comment_item)
+    if save_comment_item:
+        await BiliStoreFactory.create_store().store_comment(save_comment_item)
 
 
 async def store_video(aid, video_content, extension_file_name):
@@ -67,6 +67,20 @@ async def update_content_by_content_id(content_id: str, content_item: Dict) -> i
     return effect_row
 
 
+async def upsert_content(content_item: Dict) -> int:
+    """
+    新增或更新一条内容记录（xhs的帖子 ｜ 抖音的视频 ｜ 微博 ｜ 快手视频 ...），按 video_id 唯一键冲突时更新，一次往返完成
+    Args:
+        content_item:
+
+    Returns:
+
+    """
+    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
+    effect_row: int = await async_db_conn.upsert("bilibili_video", content_item, ["video_id"])
+    return effect_row
+
+
 
 async def query_comment_by_comment_id(comment_id: str) -> Dict:
     """
@@ -114,6 +128,34 @@ async def update_comment_by_comment_id(comment_id: str, comment_item: Dict) -> i
     return effect_row
 
 
+async def upsert_comment(comment_item: Dict) -> int:
+    """
+    新增或更新一条评论记录，按 comment_id 唯一键冲突时更新，一次往返完成
+    Args:
+        comment_item:
+
+    Returns:
+
+    """
+    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
+    effect_row: int = await async_db_conn.upsert("bilibili_video_comment", comment_item, ["comment_id"])
+    return effect_row
+
+
+async def upsert_comments(comment_items: List[Dict]) -> int:
+    """
+    批量新增或更新一页评论记录，一条语句写入
+    Args:
+        comment_items:
+
+    Returns:
+
+    """
+    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
+    effect_row: int = await async_db_conn.upsert_many("bilibili_video_comment", comment_items, ["comment_id"])
+    return effect_row
+
+
 async def query_creator_by_creator_id(creator_id: str) -> Dict:
     """
     查询up主信息
@@ -160,6 +202,20 @@ async def update_creator_by_creator_id(creator_id: str, creator_item: Dict) -> i
     return effect_row
 
 
+async def upsert_creator(creator_item: Dict) -> int:
+    """
+    新增或更新一条创作者信息，按 user_id 唯一键冲突时更新，一次往返完成
+    Args:
+        creator_item:
+
+    Returns:
+
+    """
+    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
+    effect_row: int = await async_db_conn.upsert("bilibili_up_info", creator_item, ["user_id"])
+    return effect_row
+
+
 async def query_contact_by_up_and_fan(up_id: str, fan_id: str) -> Dict:
     """
     查询一条关联关系
@@ -207,6 +263,20 @@ async def update_contact_by_id(id: str, contact_item: Dict) -> int:
     return effect_row
 
 
+async def upsert_contact(contact_item: Dict) -> int:
+    """
+    新增或更新一条关联关系，按 up_id、fan_id 唯一键冲突时更新，一次往返完成
+    Args:
+        contact_item:
+
+    Returns:
+
+    """
+    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
+    effect_row: int = await async_db_conn.upsert("bilibili_contact_info", contact_item, ["up_id", "fan_id"])
+    return effect_row
+
+
 async def query_dynamic_by_dynamic_id(dynamic_id: str) -> Dict:
     """
     查询一条动态信息
@@ -251,3 +321,17 @@ async def update_dynamic_by_dynamic_id(dynamic_id: str, dynamic_item: Dict) -> i
     async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
     effect_row: int = await async_db_conn.update_table("bilibili_up_dynamic", dynamic_item, "dynamic_id", dynamic_id)
     return effect_row
+
+
+async def upsert_dynamic(dynamic_item: Dict) -> int:
+    """
+    新增或更新一条动态信息，按 dynamic_id 唯一键冲突时更新，一次往返完成
+    Args:
+        dynamic_item:
+
+    Returns:
+
+    """
+    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
+    effect_row: int = await async_db_conn.upsert("bilibili_up_dynamic", dynamic_item, ["dynamic_id"])
+    return effect_row
@@ -13,9 +13,10 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/1/14 18:46
 # @Desc    :
-from typing import List
+from typing import List, Optional
 
 import config
+from store.store_registry import get_store
 from var import source_keyword_var
 
 from .douyin_store_impl import *
@@ -26,17 +27,19 @@ class DouyinStoreFactory:
         "csv": DouyinCsvStoreImplement,
         "db": DouyinDbStoreImplement,
         "json": DouyinJsonStoreImplement,
+        "jsonl": DouyinJsonlStoreImplement,
+        "parquet": DouyinParquetStoreImplement,
         "sqlite": DouyinSqliteStoreImplement
     }
 
     @staticmethod
     def create_store() -> AbstractStore:
-        store_class = DouyinStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
-        if not store_class:
+        store = get_store("dy", DouyinStoreFactory.STORES)
+        if not store:
             raise ValueError(
-                "[DouyinStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite ..."
+                "[DouyinStoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or parquet or sqlite ..."
             )
-        return store_class()
+        return store
 
 
 def _extract_comment_image_list(comment_item: Dict) -> List[str]:
@@ -161,17 +164,31 @@ async def update_douyin_aweme(aweme_item: Dict):
 async def batch_update_dy_aweme_comments(aweme_id: str, comments: List[Dict]):
     if not comments:
         return
+    save_comment_items = []
     for comment_item in comments:
-        await update_dy_aweme_comment(aweme_id, comment_item)
+        save_comment_item = _build_dy_aweme_comment(aweme_id, comment_item)
+        if save_comment_item:
+            save_comment_items.append(save_comment_item)
+    # 一页评论交给存储层一次写入
+    await DouyinStoreFactory.create_store().store_comments(save_comment_items)
 
 
-async def update_dy_aweme_comment(aweme_id: str, comment_item: Dict):
+def _build_dy_aweme_comment(aweme_id: str, comment_item: Dict) -> Optional[Dict]:
+    """
+    将抖音视频评论转换为入库的字段
+    Args:
+        aweme_id:
+        comment_item:
+
+    Returns:
+
+    """
     comment_aweme_id = comment_item.get("aweme_id")
     if aweme_id != comment_aweme_id:
         utils.logger.error(
             f"[store.douyin.update_dy_aweme_comment] comment_aweme_id: {comment_aweme_id} != aweme_id: {aweme_id}"
         )
-        return
+        return None
     user_info = comment_item.get("user", {})
     comment_id = comment_item.get("cid")
     parent_comment_id = comment_item.get("reply_id", "0")
@@ -206,10 +223,13 @@ async def update_dy_aweme_comment(aweme_id: str, comment_item: Dict):
     utils.logger.info(
         f"[store.douyin.update_dy_aweme_comment] douyin aweme comment: {comment_id}, content: {save_comment_item.get('content')}"
     )
+    return save_comment_item
 
-    await DouyinStoreFactory.create_store().store_comment(
-        comment_item=save_comment_item
-    )
+
+async def update_dy_aweme_comment(aweme_id: str, comment_item: Dict):
+    save_comment_item = _build_dy_aweme_comment(aweme_id, comment_item)
+    if save_comment_item:
+        await DouyinStoreFactory.create_store().store_comment(save_comment_item)
 
 
 async def save_creator(user_id: str, creator: Dict):
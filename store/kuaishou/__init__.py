@@ -13,9 +13,10 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/1/14 20:03
 # @Desc    :
-from typing import List
+from typing import List, Optional
 
 import config
+from store.store_registry import get_store
 from var import source_keyword_var
 
 from .kuaishou_store_impl import *
@@ -26,16 +27,18 @@ class KuaishouStoreFactory:
         "csv": KuaishouCsvStoreImplement,
         "db": KuaishouDbStoreImplement,
         "json": KuaishouJsonStoreImplement,
+        "jsonl": KuaishouJsonlStoreImplement,
+        "parquet": KuaishouParquetStoreImplement,
         "sqlite": KuaishouSqliteStoreImplement
     }
 
     @staticmethod
     def create_store() -> AbstractStore:
-        store_class = KuaishouStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
-        if not store_class:
+        store = get_store("ks", KuaishouStoreFactory.STORES)
+        if not store:
             raise ValueError(
-                "[KuaishouStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite ...")
-        return store_class()
+                "[KuaishouStoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or parquet or sqlite ...")
+        return store
 
 
 async def update_kuaishou_video(video_item: Dict):
@@ -70,11 +73,25 @@ async def batch_update_ks_video_comments(video_id: str, comments: List[Dict]):
     utils.logger.info(f"[store.kuaishou.batch_update_ks_video_comments] video_id:{video_id}, comments:{comments}")
     if not comments:
         return
+    save_comment_items = []
     for comment_item in comments:
-        await update_ks_video_comment(video_id, comment_item)
+        save_comment_item = _build_ks_video_comment(video_id, comment_item)
+        if save_comment_item:
+            save_comment_items.append(save_comment_item)
+    # 一页评论交给存储层一次写入
+    await KuaishouStoreFactory.create_store().store_comments(save_comment_items)
 
 
-async def update_ks_video_comment(video_id: str, comment_item: Dict):
+def _build_ks_video_comment(video_id: str, comment_item: Dict) -> Optional[Dict]:
+    """
+    将快手视频评论转换为入库的字段
+    Args:
+        video_id:
+        comment_item:
+
+    Returns:
+
+    """
     comment_id = comment_item.get("commentId")
     save_comment_item = {
         "comment_id": comment_id,
@@ -89,7 +106,13 @@ async def update_ks_video_comment(video_id: str, comment_item: Dict):
     }
     utils.logger.info(
         f"[store.kuaishou.update_ks_video_comment] Kuaishou video comment: {comment_id}, content: {save_comment_item.get('content')}")
-    await KuaishouStoreFactory.create_store().store_comment(comment_item=save_comment_item)
+    return save_comment_item
+
+
+async def update_ks_video_comment(video_id: str, comment_item: Dict):
+    save_comment_item = _build_ks_video_comment(video_id, comment_item)
+    if save_comment_item:
+        await KuaishouStoreFactory.create_store().store_comment(save_comment_item)
 
 async def save_creator(user_id: str, creator: Dict):
     ownerCount = creator.get('ownerCount', {})
@@ -67,6 +67,20 @@ async def update_content_by_content_id(content_id: str, content_item: Dict) -> i
     return effect_row
 
 
+async def upsert_content(content_item: Dict) -> int:
+    """
+    新增或更新一条内容记录（xhs的帖子 ｜ 抖音的视频 ｜ 微博 ｜ 快手视频 ...），按 video_id 唯一键冲突时更新，一次往返完成
+    Args:
+        content_item:
+
+    Returns:
+
+    """
+    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
+    effect_row: int = await async_db_conn.upsert("kuaishou_video", content_item, ["video_id"])
+    return effect_row
+
+
 
 async def query_comment_by_comment_id(comment_id: str) -> Dict:
     """
@@ -112,3 +126,31 @@ async def update_comment_by_comment_id(comment_id: str, comment_item: Dict) -> i
     async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
     effect_row: int = await async_db_conn.update_table("kuaishou_video_comment", comment_item, "comment_id", comment_id)
     return effect_row
+
+
+async def upsert_comment(comment_item: Dict) -> int:
+    """
+    新增或更新一条评论记录，按 comment_id 唯一键冲突时更新，一次往返完成
+    Args:
+        comment_item:
+
+    Returns:
+
+    """
+    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
+    effect_row: int = await async_db_conn.upsert("kuaishou_video_comment", comment_item, ["comment_id"])
+    return effect_row
+
+
+async def upsert_comments(comment_items: List[Dict]) -> int:
+    """
+    批量新增或更新一页评论记录，一条语句写入
+    Args:
+        comment_items:
+
+    Returns:
+
+    """
+    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
+    effect_row: int = await async_db_conn.upsert_many("kuaishou_video_comment", comment_items, ["comment_id"])
+    return effect_row
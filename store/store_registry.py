@@ -0,0 +1,83 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 存储实例注册表，每个 (平台, 存储方式) 在进程内只创建一个存储实例
+from typing import Dict, Optional, Tuple, Type
+
+import config
+from base.base_crawler import AbstractStore
+from async_sqlite_db import AsyncSqliteDB
+from store.write_behind import StoreWriteError, wrap_store
+from tools import utils
+from tools.async_file_writer import flush_all_writers
+from var import media_crawler_db_var
+
+_stores: Dict[Tuple[str, str], AbstractStore] = {}
+
+
+def get_store(platform: str, stores: Dict[str, Type[AbstractStore]]) -> Optional[AbstractStore]:
+    """
+    获取平台在当前存储方式下的存储实例，第一次获取时创建
+    Args:
+        platform: 平台名称
+        stores: 存储方式到存储实现类的映射
+
+    Returns:
+        存储实例，不支持当前存储方式时返回 None
+
+    """
+    save_option = config.SAVE_DATA_OPTION
+    store_class = stores.get(save_option)
+    if not store_class:
+        return None
+    key = (platform, save_option)
+    store = _stores.get(key)
+    if store is None:
+        store = wrap_store(store_class())
+        _stores[key] = store
+    return store
+
+
+async def flush_all_stores() -> None:
+    """
+    将所有存储实例缓冲中的数据写入磁盘/数据库：等待 write-behind 队列写完，
+    再落盘文件写入器的缓冲，并提交 SQLite 中累积的事务，返回后已经交给存储的数据在崩溃后不会丢失。
+    write-behind 流水线中有写入失败时，其余数据照常落盘，最后抛出 StoreWriteError
+    Returns:
+
+    """
+    store_error: Optional[StoreWriteError] = None
+    for store in list(_stores.values()):
+        try:
+            await store.flush()
+        except StoreWriteError as e:
+            store_error = e
+    await flush_all_writers()
+    async_db_obj = media_crawler_db_var.get(None)
+    if isinstance(async_db_obj, AsyncSqliteDB):
+        await async_db_obj.commit()
+    if store_error is not None:
+        raise store_error
+
+
+async def close_all_stores() -> None:
+    """
+    关闭所有存储实例，程序退出前、关闭数据库之前调用
+    Returns:
+
+    """
+    while _stores:
+        key, store = _stores.popitem()
+        try:
+            await store.close()
+        except Exception as e:
+            utils.logger.error(f"[close_all_stores] close {key} store error: {e}")
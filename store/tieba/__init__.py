@@ -10,9 +10,10 @@
 
 
 # -*- coding: utf-8 -*-
-from typing import List
+from typing import List, Optional
 
 from model.m_baidu_tieba import TiebaComment, TiebaCreator, TiebaNote
+from store.store_registry import get_store
 from var import source_keyword_var
 
 from . import tieba_store_impl
@@ -24,16 +25,18 @@ class TieBaStoreFactory:
         "csv": TieBaCsvStoreImplement,
         "db": TieBaDbStoreImplement,
         "json": TieBaJsonStoreImplement,
+        "jsonl": TieBaJsonlStoreImplement,
+        "parquet": TieBaParquetStoreImplement,
         "sqlite": TieBaSqliteStoreImplement
     }
 
     @staticmethod
     def create_store() -> AbstractStore:
-        store_class = TieBaStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
-        if not store_class:
+        store = get_store("tieba", TieBaStoreFactory.STORES)
+        if not store:
             raise ValueError(
-                "[TieBaStoreFactory.create_store] Invalid save option only supported csv or db or json ...")
-        return store_class()
+                "[TieBaStoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or parquet or sqlite ...")
+        return store
 
 
 async def batch_update_tieba_notes(note_list: List[TiebaNote]):
@@ -80,13 +83,18 @@ async def batch_update_tieba_note_comments(note_id: str, comments: List[TiebaCom
     """
     if not comments:
         return
+    save_comment_items = []
     for comment_item in comments:
-        await update_tieba_note_comment(note_id, comment_item)
+        save_comment_item = _build_tieba_note_comment(note_id, comment_item)
+        if save_comment_item:
+            save_comment_items.append(save_comment_item)
+    # 一页评论交给存储层一次写入
+    await TieBaStoreFactory.create_store().store_comments(save_comment_items)
 
 
-async def update_tieba_note_comment(note_id: str, comment_item: TiebaComment):
+def _build_tieba_note_comment(note_id: str, comment_item: TiebaComment) -> Optional[Dict]:
     """
-    Update tieba note comment
+    将贴吧帖子评论转换为入库的字段
     Args:
         note_id:
         comment_item:
@@ -97,7 +105,22 @@ async def update_tieba_note_comment(note_id: str, comment_item: TiebaComment):
     save_comment_item = comment_item.model_dump()
     save_comment_item.update({"last_modify_ts": utils.get_current_timestamp()})
     utils.logger.info(f"[store.tieba.update_tieba_note_comment] tieba note id: {note_id} comment:{save_comment_item}")
-    await TieBaStoreFactory.create_store().store_comment(save_comment_item)
+    return save_comment_item
+
+
+async def update_tieba_note_comment(note_id: str, comment_item: TiebaComment):
+    """
+    Update tieba note comment
+    Args:
+        note_id:
+        comment_item:
+
+    Returns:
+
+    """
+    save_comment_item = _build_tieba_note_comment(note_id, comment_item)
+    if save_comment_item:
+        await TieBaStoreFactory.create_store().store_comment(save_comment_item)
 
 
 async def save_creator(user_info: TiebaCreator):
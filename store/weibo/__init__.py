@@ -15,8 +15,9 @@
 # @Desc    :
 
 import re
-from typing import List
+from typing import List, Optional
 
+from store.store_registry import get_store
 from var import source_keyword_var
 
 from .weibo_store_image import *
@@ -28,16 +29,18 @@ class WeibostoreFactory:
         "csv": WeiboCsvStoreImplement,
         "db": WeiboDbStoreImplement,
         "json": WeiboJsonStoreImplement,
+        "jsonl": WeiboJsonlStoreImplement,
+        "parquet": WeiboParquetStoreImplement,
         "sqlite": WeiboSqliteStoreImplement,
     }
 
     @staticmethod
     def create_store() -> AbstractStore:
-        store_class = WeibostoreFactory.STORES.get(config.SAVE_DATA_OPTION)
-        if not store_class:
+        store = get_store("wb", WeibostoreFactory.STORES)
+        if not store:
             raise ValueError(
-                "[WeibotoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite ...")
-        return store_class()
+                "[WeibotoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or parquet or sqlite ...")
+        return store
 
 
 async def batch_update_weibo_notes(note_list: List[Dict]):
@@ -111,22 +114,27 @@ async def batch_update_weibo_note_comments(note_id: str, comments: List[Dict]):
     """
     if not comments:
         return
+    save_comment_items = []
     for comment_item in comments:
-        await update_weibo_note_comment(note_id, comment_item)
+        save_comment_item = _build_weibo_note_comment(note_id, comment_item)
+        if save_comment_item:
+            save_comment_items.append(save_comment_item)
+    # 一页评论交给存储层一次写入
+    await WeibostoreFactory.create_store().store_comments(save_comment_items)
 
 
-async def update_weibo_note_comment(note_id: str, comment_item: Dict):
+def _build_weibo_note_comment(note_id: str, comment_item: Dict) -> Optional[Dict]:
     """
-    Update weibo note comment
+    将微博评论转换为入库的字段
     Args:
-        note_id: weibo note id
-        comment_item: weibo comment item
+        note_id:
+        comment_item:
 
     Returns:
 
     """
     if not comment_item or not note_id:
-        return
+        return None
     comment_id = str(comment_item.get("id"))
     user_info: Dict = comment_item.get("user")
     content_text = comment_item.get("text")
@@ -152,7 +160,22 @@ async def update_weibo_note_comment(note_id: str, comment_item: Dict):
     }
     utils.logger.info(
         f"[store.weibo.update_weibo_note_comment] Weibo note comment: {comment_id}, content: {save_comment_item.get('content', '')[:24]} ...")
-    await WeibostoreFactory.create_store().store_comment(comment_item=save_comment_item)
+    return save_comment_item
+
+
+async def update_weibo_note_comment(note_id: str, comment_item: Dict):
+    """
+    Update weibo note comment
+    Args:
+        note_id: weibo note id
+        comment_item: weibo comment item
+
+    Returns:
+
+    """
+    save_comment_item = _build_weibo_note_comment(note_id, comment_item)
+    if save_comment_item:
+        await WeibostoreFactory.create_store().store_comment(save_comment_item)
 
 
 async def update_weibo_note_image(picid: str, pic_content, extension_file_name):
@@ -67,6 +67,20 @@ async def update_content_by_content_id(content_id: str, content_item: Dict) -> i
     return effect_row
 
 
+async def upsert_content(content_item: Dict) -> int:
+    """
+    新增或更新一条内容记录（xhs的帖子 ｜ 抖音的视频 ｜ 微博 ｜ 快手视频 ...），按 note_id 唯一键冲突时更新，一次往返完成
+    Args:
+        content_item:
+
+    Returns:
+
+    """
+    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
+    effect_row: int = await async_db_conn.upsert("weibo_note", content_item, ["note_id"])
+    return effect_row
+
+
 
 async def query_comment_by_comment_id(comment_id: str) -> Dict:
     """
@@ -114,6 +128,34 @@ async def update_comment_by_comment_id(comment_id: str, comment_item: Dict) -> i
     return effect_row
 
 
+async def upsert_comment(comment_item: Dict) -> int:
+    """
+    新增或更新一条评论记录，按 comment_id 唯一键冲突时更新，一次往返完成
+    Args:
+        comment_item:
+
+    Returns:
+
+    """
+    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
+    effect_row: int = await async_db_conn.upsert("weibo_note_comment", comment_item, ["comment_id"])
+    return effect_row
+
+
+async def upsert_comments(comment_items: List[Dict]) -> int:
+    """
+    批量新增或更新一页评论记录，一条语句写入
+    Args:
+        comment_items:
+
+    Returns:
+
+    """
+    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
+    effect_row: int = await async_db_conn.upsert_many("weibo_note_comment", comment_items, ["comment_id"])
+    return effect_row
+
+
 async def query_creator_by_user_id(user_id: str) -> Dict:
     """
     查询一条创作者记录
@@ -157,4 +199,18 @@ async def update_creator_by_user_id(user_id: str, creator_item: Dict) -> int:
     """
     async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
     effect_row: int = await async_db_conn.update_table("weibo_creator", creator_item, "user_id", user_id)
-    return effect_row
\ No newline at end of file
+    return effect_row
+
+
+async def upsert_creator(creator_item: Dict) -> int:
+    """
+    新增或更新一条创作者信息，按 user_id 唯一键冲突时更新，一次往返完成
+    Args:
+        creator_item:
+
+    Returns:
+
+    """
+    async_db_conn: Union[AsyncMysqlDB, AsyncSqliteDB] = media_crawler_db_var.get()
+    effect_row: int = await async_db_conn.upsert("weibo_creator", creator_item, ["user_id"])
+    return effect_row
@@ -0,0 +1,282 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 异步写入（write-behind）存储流水线
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+from base.base_crawler import AbstractStore
+from tools import utils
+
+# (存储实例, 方法名, 参数)
+StoreOp = Tuple[AbstractStore, str, Any]
+
+
+class StoreWriteError(Exception):
+    """
+    write-behind 流水线中有存储调用写入失败。调用方在入队时已经拿到了成功，
+    失败只能在 flush/close 时报告出来
+    """
+
+    def __init__(self, failed_count: int, last_error: BaseException):
+        super().__init__(f"{failed_count} store records failed to write, last error: {last_error!r}")
+        self.failed_count = failed_count
+        self.last_error = last_error
+
+
+class WriteBehindStorePipeline:
+    """
+    爬虫协程和存储实现之间的有界队列，存储调用入队后立即返回，由后台任务批量写入，
+    网络 IO 和存储 IO 因此可以重叠；队列满时入队会等待，对爬虫形成背压
+    """
+
+    def __init__(self, queue_size: Optional[int] = None, batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None):
+        """
+        Args:
+            queue_size: 队列最大长度
+            batch_size: 单批写入的最大调用数
+            flush_interval: 攒批的最长等待时间（秒）
+        """
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size or config.STORE_QUEUE_MAX_SIZE)
+        self._batch_size = batch_size or config.STORE_FLUSH_BATCH_SIZE
+        self._flush_interval = flush_interval or config.STORE_FLUSH_INTERVAL
+        # 写入失败的记录数和最后一次的异常，失败一直保留到进程退出，之后的 flush/close 都会报告
+        self.failed_count = 0
+        self.last_error: Optional[BaseException] = None
+        # 存储实现依赖的上下文变量（数据库对象、爬取类型等）从创建流水线的协程继承
+        self._consumer_task = asyncio.create_task(self._consume())
+
+    async def put(self, store: AbstractStore, method_name: str, item: Any) -> None:
+        """
+        存储调用入队，队列满时等待
+        Args:
+            store: 存储实现
+            method_name: 存储方法名，例如 store_content
+            item: 存储方法的参数
+
+        Returns:
+
+        """
+        if self._consumer_task.done():
+            raise RuntimeError("[WriteBehindStorePipeline.put] store pipeline is closed")
+        await self._queue.put((store, method_name, item))
+
+    async def _next_batch(self) -> List[StoreOp]:
+        """
+        取出一批存储调用：拿到第一个调用后继续攒批，直到达到批大小或超过等待时间
+        Returns:
+
+        """
+        batch: List[StoreOp] = [await self._queue.get()]
+        deadline = time.monotonic() + self._flush_interval
+        while len(batch) < self._batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    @staticmethod
+    def _merge_comments(batch: List[StoreOp]) -> List[StoreOp]:
+        """
+        相邻的、写入同一类存储的评论合并成一次 store_comments 调用，其余调用保持原有顺序
+        Args:
+            batch: 存储调用列表
+
+        Returns:
+
+        """
+        merged: List[StoreOp] = []
+        for store, method_name, item in batch:
+            if method_name == "store_comment":
+                method_name, item = "store_comments", [item]
+            if (
+                method_name == "store_comments"
+                and merged
+                and merged[-1][1] == "store_comments"
+                and type(merged[-1][0]) is type(store)
+            ):
+                merged[-1][2].extend(item)
+                continue
+            if method_name == "store_comments":
+                item = list(item)
+            merged.append((store, method_name, item))
+        return merged
+
+    async def _consume(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                for store, method_name, item in self._merge_comments(batch):
+                    try:
+                        await getattr(store, method_name)(item)
+                    except Exception as e:
+                        self.failed_count += len(item) if method_name == "store_comments" else 1
+                        self.last_error = e
+                        utils.logger.error(
+                            f"[WriteBehindStorePipeline._consume] {type(store).__name__}.{method_name} error: {e}"
+                        )
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def raise_for_failures(self) -> None:
+        """
+        有存储调用写入失败时抛出 StoreWriteError
+        Returns:
+
+        """
+        if self.last_error is not None:
+            raise StoreWriteError(self.failed_count, self.last_error)
+
+    async def flush(self) -> None:
+        """
+        等待队列中已有的存储调用全部写完，有写入失败时抛出 StoreWriteError
+        Returns:
+
+        """
+        await self._queue.join()
+        self.raise_for_failures()
+
+    async def close(self) -> None:
+        """
+        写完队列中剩余的数据后停止后台任务，有写入失败时抛出 StoreWriteError
+        Returns:
+
+        """
+        if not self._consumer_task.done():
+            await self._queue.join()
+            self._consumer_task.cancel()
+        try:
+            await self._consumer_task
+        except asyncio.CancelledError:
+            pass
+        self.raise_for_failures()
+
+
+class WriteBehindStore(AbstractStore):
+    """
+    存储实现的代理：第一次写入前调用存储实现的 open，
+    开启 write-behind 时存储调用进入流水线后立即返回，否则直接调用存储实现
+    """
+
+    def __init__(self, store: AbstractStore, write_behind: bool = True):
+        """
+        Args:
+            store: 存储实现
+            write_behind: 是否经过 write-behind 流水线
+        """
+        self._store = store
+        self._write_behind = write_behind
+        self._opened = False
+        self._open_lock = asyncio.Lock()
+
+    async def open(self):
+        if self._opened:
+            return
+        async with self._open_lock:
+            if not self._opened:
+                await self._store.open()
+                self._opened = True
+
+    async def flush(self):
+        try:
+            if _store_pipeline is not None:
+                await _store_pipeline.flush()
+        finally:
+            await self._store.flush()
+
+    async def close(self):
+        if not self._opened:
+            return
+        try:
+            if _store_pipeline is not None:
+                await _store_pipeline.flush()
+        finally:
+            await self._store.close()
+            self._opened = False
+
+    async def _put(self, method_name: str, item: Any) -> None:
+        await self.open()
+        if self._write_behind:
+            await get_store_pipeline().put(self._store, method_name, item)
+        else:
+            await getattr(self._store, method_name)(item)
+
+    async def store_content(self, content_item: Dict):
+        await self._put("store_content", content_item)
+
+    async def store_comment(self, comment_item: Dict):
+        await self._put("store_comment", comment_item)
+
+    async def store_comments(self, comment_items: List[Dict]):
+        await self._put("store_comments", comment_items)
+
+    async def store_creator(self, creator: Dict):
+        await self._put("store_creator", creator)
+
+    def __getattr__(self, method_name: str):
+        # 平台特有的存储方法，例如 B 站的 store_contact、store_dynamic
+        if method_name.startswith("_"):
+            raise AttributeError(method_name)
+        getattr(self._store, method_name)
+
+        async def put(item: Dict):
+            await self._put(method_name, item)
+
+        return put
+
+
+_store_pipeline: Optional[WriteBehindStorePipeline] = None
+
+
+def get_store_pipeline() -> WriteBehindStorePipeline:
+    """
+    获取当前的存储流水线，第一次使用时在当前事件循环中创建
+    Returns:
+
+    """
+    global _store_pipeline
+    if _store_pipeline is None:
+        _store_pipeline = WriteBehindStorePipeline()
+    return _store_pipeline
+
+
+def wrap_store(store: AbstractStore) -> AbstractStore:
+    """
+    给存储实现套上代理，开启 ENABLE_STORE_WRITE_BEHIND 时存储调用经过 write-behind 流水线
+    Args:
+        store: 存储实现
+
+    Returns:
+
+    """
+    return WriteBehindStore(store, write_behind=config.ENABLE_STORE_WRITE_BEHIND)
+
+
+async def close_store_pipeline() -> None:
+    """
+    写完所有排队的数据并关闭存储流水线，程序退出前、关闭数据库和文件之前调用，
+    运行期间有写入失败时抛出 StoreWriteError
+    Returns:
+
+    """
+    global _store_pipeline
+    pipeline, _store_pipeline = _store_pipeline, None
+    if pipeline is not None:
+        await pipeline.close()
@@ -13,9 +13,10 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2024/1/14 17:34
 # @Desc    :
-from typing import List
+from typing import List, Optional
 
 import config
+from store.store_registry import get_store
 from var import source_keyword_var
 
 from . import xhs_store_impl
@@ -28,15 +29,17 @@ class XhsStoreFactory:
         "csv": XhsCsvStoreImplement,
         "db": XhsDbStoreImplement,
         "json": XhsJsonStoreImplement,
+        "jsonl": XhsJsonlStoreImplement,
+        "parquet": XhsParquetStoreImplement,
         "sqlite": XhsSqliteStoreImplement
     }
 
     @staticmethod
     def create_store() -> AbstractStore:
-        store_class = XhsStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
-        if not store_class:
-            raise ValueError("[XhsStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite ...")
-        return store_class()
+        store = get_store("xhs", XhsStoreFactory.STORES)
+        if not store:
+            raise ValueError("[XhsStoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or parquet or sqlite ...")
+        return store
 
 
 def get_video_url_arr(note_item: Dict) -> List:
@@ -126,13 +129,18 @@ async def batch_update_xhs_note_comments(note_id: str, comments: List[Dict]):
     """
     if not comments:
         return
+    save_comment_items = []
     for comment_item in comments:
-        await update_xhs_note_comment(note_id, comment_item)
+        save_comment_item = _build_xhs_note_comment(note_id, comment_item)
+        if save_comment_item:
+            save_comment_items.append(save_comment_item)
+    # 一页评论交给存储层一次写入
+    await XhsStoreFactory.create_store().store_comments(save_comment_items)
 
 
-async def update_xhs_note_comment(note_id: str, comment_item: Dict):
+def _build_xhs_note_comment(note_id: str, comment_item: Dict) -> Optional[Dict]:
     """
-    更新小红书笔记评论
+    将小红书笔记评论转换为入库的字段
     Args:
         note_id:
         comment_item:
@@ -160,7 +168,22 @@ async def update_xhs_note_comment(note_id: str, comment_item: Dict):
         "like_count": comment_item.get("like_count", 0),
     }
     utils.logger.info(f"[store.xhs.update_xhs_note_comment] xhs note comment:{local_db_item}")
-    await XhsStoreFactory.create_store().store_comment(local_db_item)
+    return local_db_item
+
+
+async def update_xhs_note_comment(note_id: str, comment_item: Dict):
+    """
+    更新小红书笔记评论
+    Args:
+        note_id:
+        comment_item:
+
+    Returns:
+
+    """
+    local_db_item = _build_xhs_note_comment(note_id, comment_item)
+    if local_db_item:
+        await XhsStoreFactory.create_store().store_comment(local_db_item)
 
 
 async def save_creator(user_id: str, creator: Dict):
@@ -10,14 +10,17 @@
 
 
 # -*- coding: utf-8 -*-
-from typing import List
+from typing import Dict, List, Optional
 
 import config
 from base.base_crawler import AbstractStore
 from model.m_zhihu import ZhihuComment, ZhihuContent, ZhihuCreator
+from store.store_registry import get_store
 from store.zhihu.zhihu_store_impl import (ZhihuCsvStoreImplement,
                                           ZhihuDbStoreImplement,
+                                          ZhihuJsonlStoreImplement,
                                           ZhihuJsonStoreImplement,
+                                          ZhihuParquetStoreImplement,
                                           ZhihuSqliteStoreImplement)
 from tools import utils
 from var import source_keyword_var
@@ -28,15 +31,17 @@ class ZhihuStoreFactory:
         "csv": ZhihuCsvStoreImplement,
         "db": ZhihuDbStoreImplement,
         "json": ZhihuJsonStoreImplement,
+        "jsonl": ZhihuJsonlStoreImplement,
+        "parquet": ZhihuParquetStoreImplement,
         "sqlite": ZhihuSqliteStoreImplement
     }
 
     @staticmethod
     def create_store() -> AbstractStore:
-        store_class = ZhihuStoreFactory.STORES.get(config.SAVE_DATA_OPTION)
-        if not store_class:
-            raise ValueError("[ZhihuStoreFactory.create_store] Invalid save option only supported csv or db or json or sqlite ...")
-        return store_class()
+        store = get_store("zhihu", ZhihuStoreFactory.STORES)
+        if not store:
+            raise ValueError("[ZhihuStoreFactory.create_store] Invalid save option only supported csv or db or json or jsonl or parquet or sqlite ...")
+        return store
 
 async def batch_update_zhihu_contents(contents: List[ZhihuContent]):
     """
@@ -82,13 +87,18 @@ async def batch_update_zhihu_note_comments(comments: List[ZhihuComment]):
     if not comments:
         return
     
+    save_comment_items = []
     for comment_item in comments:
-        await update_zhihu_content_comment(comment_item)
+        save_comment_item = _build_zhihu_content_comment(comment_item)
+        if save_comment_item:
+            save_comment_items.append(save_comment_item)
+    # 一页评论交给存储层一次写入
+    await ZhihuStoreFactory.create_store().store_comments(save_comment_items)
 
 
-async def update_zhihu_content_comment(comment_item: ZhihuComment):
+def _build_zhihu_content_comment(comment_item: ZhihuComment) -> Optional[Dict]:
     """
-    更新知乎内容评论
+    将知乎内容评论转换为入库的字段
     Args:
         comment_item:
 
@@ -98,7 +108,21 @@ async def update_zhihu_content_comment(comment_item: ZhihuComment):
     local_db_item = comment_item.model_dump()
     local_db_item.update({"last_modify_ts": utils.get_current_timestamp()})
     utils.logger.info(f"[store.zhihu.update_zhihu_note_comment] zhihu content comment:{local_db_item}")
-    await ZhihuStoreFactory.create_store().store_comment(local_db_item)
+    return local_db_item
+
+
+async def update_zhihu_content_comment(comment_item: ZhihuComment):
+    """
+    更新知乎内容评论
+    Args:
+        comment_item:
+
+    Returns:
+
+    """
+    local_db_item = _build_zhihu_content_comment(comment_item)
+    if local_db_item:
+        await ZhihuStoreFactory.create_store().store_comment(local_db_item)
 
 
 async def save_creator(creator: ZhihuCreator):
@@ -0,0 +1,75 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+import importlib.util
+import os
+import tempfile
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from tools import async_file_writer
+from tools.async_file_writer import AsyncParquetWriter
+
+
+@unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+class TestAsyncParquetWriter(IsolatedAsyncioTestCase):
+
+    async def test_late_columns_and_mixed_types(self):
+        import pyarrow.parquet as pq
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "1_search_comments.parquet")
+            writer = AsyncParquetWriter(file_path, row_group_size=2)
+            await writer.write({"comment_id": 1, "liked_count": 10, "sub_comment_count": 0})
+            await writer.write({"comment_id": 2, "liked_count": 20, "sub_comment_count": 1.5})
+            await writer.write({"comment_id": 3, "liked_count": "1.2万", "ip_location": "上海",
+                                "pictures": ["a", "b"]})
+            await writer.close()
+
+            table = pq.read_table(file_path)
+            self.assertFalse(os.path.exists(file_path + ".rows.jsonl"))
+            self.assertEqual(pq.ParquetFile(file_path).num_row_groups, 2)
+            self.assertEqual(str(table.schema.field("comment_id").type), "int64")
+            self.assertEqual(str(table.schema.field("sub_comment_count").type), "double")
+            self.assertEqual(table.column("liked_count").to_pylist(), ["10", "20", "1.2万"])
+            self.assertEqual(table.column("ip_location").to_pylist(), [None, None, "上海"])
+            self.assertEqual(table.column("pictures").to_pylist(), [None, None, '["a", "b"]'])
+
+    async def test_close_without_rows(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "empty.parquet")
+            writer = AsyncParquetWriter(file_path)
+            await writer.close()
+            self.assertEqual(os.listdir(tmp_dir), [])
+
+    async def test_leftover_rows_are_recovered(self):
+        import pyarrow.parquet as pq
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # 模拟崩溃：只留下临时文件，没有转换为 parquet
+            crashed_path = os.path.join(tmp_dir, "2024-01-01_search_comments.parquet")
+            with open(crashed_path + ".rows.jsonl", "w", encoding="utf-8") as f:
+                f.write('{"comment_id": 1, "content": "old"}\n')
+            same_day_path = os.path.join(tmp_dir, "2024-01-02_search_comments.parquet")
+            with open(same_day_path + ".rows.jsonl", "w", encoding="utf-8") as f:
+                f.write('{"comment_id": 2}\n')
+
+            writer = await async_file_writer.get_parquet_writer("search_comments", same_day_path)
+            await writer.write({"comment_id": 3, "content": "new"})
+            self.assertEqual(pq.read_table(crashed_path).to_pylist(), [{"comment_id": 1, "content": "old"}])
+            self.assertFalse(os.path.exists(crashed_path + ".rows.jsonl"))
+
+            await async_file_writer.close_all_writers()
+            self.assertEqual(pq.read_table(same_day_path).to_pylist(),
+                             [{"comment_id": 2, "content": None}, {"comment_id": 3, "content": "new"}])
+            self.assertEqual(sorted(os.listdir(tmp_dir)), [
+                "2024-01-01_search_comments.parquet", "2024-01-02_search_comments.parquet",
+            ])
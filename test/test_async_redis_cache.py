@@ -0,0 +1,74 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import importlib.util
+import unittest
+from unittest import mock
+
+from cache.serializer import JsonSerializer, PickleSerializer
+from config import db_config
+
+
+@unittest.skipUnless(importlib.util.find_spec("fakeredis"), "fakeredis is not installed")
+class TestAsyncRedisCache(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        from fakeredis import FakeServer
+        from fakeredis.aioredis import FakeAsyncRedisConnection
+        from redis.asyncio import ConnectionPool
+
+        from cache.async_redis_cache import AsyncRedisCache
+
+        self.connection_pool = ConnectionPool(server=FakeServer(), connection_class=FakeAsyncRedisConnection)
+        self.cache = AsyncRedisCache(serializer=JsonSerializer(), connection_pool=self.connection_pool)
+
+    async def asyncTearDown(self):
+        await self.cache.close()
+
+    async def test_set_and_get(self):
+        await self.cache.set("key", {"value": 1}, 10)
+        self.assertEqual(await self.cache.get("key"), {"value": 1})
+        self.assertIsNone(await self.cache.get("missing"))
+        self.assertGreater(await self.cache._redis_client.ttl("key"), 0)
+
+    async def test_keys_scans_all_batches(self):
+        await self.cache.set_many({f"proxy_{index}": index for index in range(25)}, 10)
+        await self.cache.set("other", 0, 10)
+        with mock.patch.object(db_config, "REDIS_SCAN_COUNT", 2):
+            keys = await self.cache.keys("proxy_*")
+        self.assertEqual(sorted(keys), sorted(f"proxy_{index}" for index in range(25)))
+
+    async def test_get_many_keeps_order(self):
+        await self.cache.set_many({"a": [1], "b": "值"}, 10)
+        self.assertEqual(await self.cache.get_many(["b", "missing", "a"]), ["值", None, [1]])
+        self.assertEqual(await self.cache.get_many([]), [])
+
+    async def test_set_many_sets_expire_time(self):
+        await self.cache.set_many({"a": 1, "b": 2}, 30)
+        for key in ("a", "b"):
+            ttl = await self.cache._redis_client.ttl(key)
+            self.assertGreater(ttl, 0)
+            self.assertLessEqual(ttl, 30)
+        await self.cache.set_many({}, 30)
+
+    async def test_pickle_serializer(self):
+        from cache.async_redis_cache import AsyncRedisCache
+
+        cache = AsyncRedisCache(serializer=PickleSerializer(), connection_pool=self.connection_pool)
+        await cache.set("key", ("tuple", {1, 2}), 10)
+        self.assertEqual(await cache.get("key"), ("tuple", {1, 2}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import config
+import db
+from async_sqlite_db import AsyncSqliteDB
+from store.xhs import xhs_store_sql
+from var import media_crawler_db_var
+
+
+def make_comment(comment_id: str, content: str, add_ts: int) -> dict:
+    return {
+        "user_id": "user-1",
+        "add_ts": add_ts,
+        "last_modify_ts": add_ts,
+        "comment_id": comment_id,
+        "create_time": 1700000000000,
+        "note_id": "note-1",
+        "content": content,
+        "sub_comment_count": 0,
+    }
+
+
+class TestAsyncSqliteDB(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "sqlite_tables.db")
+        shutil.copyfile(config.SQLITE_DB_PATH, self.db_path)
+        self.db = AsyncSqliteDB(self.db_path)
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self.tmp_dir.cleanup()
+
+    async def test_upsert_on_shipped_db(self):
+        await self.db.upsert("xhs_note_comment", make_comment("c1", "first", 1), ["comment_id"])
+        await self.db.upsert("xhs_note_comment", make_comment("c1", "edited", 2), ["comment_id"])
+
+        rows = await self.db.query("SELECT content, add_ts, last_modify_ts FROM xhs_note_comment")
+        self.assertEqual(rows, [{"content": "edited", "add_ts": 1, "last_modify_ts": 2}])
+
+    async def test_upsert_many_on_shipped_db(self):
+        await self.db.upsert_many("xhs_note_comment", [make_comment("c1", "first", 1), make_comment("c2", "second", 1)],
+                                  ["comment_id"])
+        await self.db.upsert_many("xhs_note_comment", [make_comment("c2", "edited", 2), make_comment("c3", "third", 2)],
+                                  ["comment_id"])
+
+        rows = await self.db.query("SELECT comment_id, content, add_ts FROM xhs_note_comment ORDER BY comment_id")
+        self.assertEqual(rows, [
+            {"comment_id": "c1", "content": "first", "add_ts": 1},
+            {"comment_id": "c2", "content": "edited", "add_ts": 1},
+            {"comment_id": "c3", "content": "third", "add_ts": 2},
+        ])
+
+    async def test_store_upsert_comments_on_shipped_db(self):
+        token = media_crawler_db_var.set(self.db)
+        try:
+            await xhs_store_sql.upsert_comments([make_comment("c1", "first", 1)])
+            await xhs_store_sql.upsert_comments([make_comment("c1", "edited", 2)])
+        finally:
+            media_crawler_db_var.reset(token)
+
+        rows = await self.db.query("SELECT comment_id, content FROM xhs_note_comment")
+        self.assertEqual(rows, [{"comment_id": "c1", "content": "edited"}])
+
+    async def test_shipped_db_has_unique_index_for_every_upsert_key(self):
+        for table_name, (index_name, unique_fields) in db.UPSERT_UNIQUE_INDEXES.items():
+            self.assertFalse(await self.db.ensure_unique_index(table_name, index_name, unique_fields), table_name)
+
+    async def test_migrate_unique_indexes_on_old_db(self):
+        await self.db.close()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("DROP INDEX idx_xhs_note_co_comment_8e8349")
+        conn.execute("CREATE INDEX idx_xhs_note_co_comment_8e8349 ON xhs_note_comment(comment_id)")
+        for comment_id, content in (("c1", "old"), ("c1", "new"), ("c2", "other")):
+            comment = make_comment(comment_id, content, 1)
+            conn.execute(f"INSERT INTO xhs_note_comment ({','.join(comment)}) VALUES ({','.join('?' * len(comment))})",
+                         list(comment.values()))
+        conn.commit()
+        conn.close()
+
+        self.db = AsyncSqliteDB(self.db_path)
+        await db.migrate_unique_indexes(self.db)
+        await self.db.upsert("xhs_note_comment", make_comment("c1", "edited", 2), ["comment_id"])
+
+        rows = await self.db.query("SELECT comment_id, content FROM xhs_note_comment ORDER BY comment_id")
+        self.assertEqual(rows, [{"comment_id": "c1", "content": "edited"}, {"comment_id": "c2", "content": "other"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
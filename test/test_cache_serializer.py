@@ -0,0 +1,48 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import importlib.util
+import unittest
+
+from cache.serializer import JsonSerializer, MsgpackSerializer, PickleSerializer, create_serializer
+
+
+class TestCacheSerializer(unittest.TestCase):
+    value = {"ip": "127.0.0.1", "port": 8080, "ratio": 0.5, "tags": ["代理", None, True]}
+
+    def test_json_round_trip(self):
+        serializer = JsonSerializer()
+        data = serializer.dumps(self.value)
+        self.assertIsInstance(data, bytes)
+        self.assertEqual(serializer.loads(data), self.value)
+
+    @unittest.skipUnless(importlib.util.find_spec("msgpack"), "msgpack is not installed")
+    def test_msgpack_round_trip(self):
+        serializer = MsgpackSerializer()
+        self.assertEqual(serializer.loads(serializer.dumps(self.value)), self.value)
+
+    def test_pickle_round_trip(self):
+        serializer = PickleSerializer()
+        value = {"key": ("tuple", 1), "items": {1, 2}}
+        self.assertEqual(serializer.loads(serializer.dumps(value)), value)
+
+    def test_create_serializer(self):
+        self.assertIsInstance(create_serializer("json"), JsonSerializer)
+        self.assertIsInstance(create_serializer("pickle"), PickleSerializer)
+        with self.assertRaises(ValueError):
+            create_serializer("yaml")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import asyncio
+import unittest
+
+from tools.concurrency_limiter import AdaptiveConcurrencyLimiter
+
+
+class TestAdaptiveConcurrencyLimiter(unittest.IsolatedAsyncioTestCase):
+
+    async def test_limits_in_flight_tasks(self):
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=2, adaptive=False)
+        max_in_flight = 0
+
+        async def task():
+            nonlocal max_in_flight
+            async with limiter:
+                max_in_flight = max(max_in_flight, limiter.stats()["in_flight"])
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*[task() for _ in range(6)])
+        self.assertEqual(max_in_flight, 2)
+        self.assertEqual(limiter.stats()["in_flight"], 0)
+
+    async def test_additive_increase_when_tasks_are_waiting(self):
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=1, max_limit=4)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        limiter.on_success(0.1)
+        await asyncio.sleep(0)
+        self.assertEqual(limiter.limit, 2)
+        self.assertTrue(waiter.done())
+
+    async def test_multiplicative_decrease_on_blocked(self):
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=8, max_limit=8)
+        limiter.on_blocked()
+        self.assertEqual(limiter.limit, 4)
+        # 冷却时间内的同一波失败不再继续减小
+        limiter.on_blocked()
+        self.assertEqual(limiter.limit, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
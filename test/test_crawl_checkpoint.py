@@ -0,0 +1,153 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import config
+from store.write_behind import StoreWriteError
+from tools.crawl_checkpoint import CHECKPOINT_SCOPE_SEARCH, CrawlCheckpointStore, PipelineCheckpointCommitter
+from tools.crawl_pipeline import CrawlPipeline, PipelineBatch
+
+
+class TestCrawlCheckpointStore(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "checkpoint.db")
+
+    async def asyncTearDown(self):
+        self.tmp_dir.cleanup()
+
+    async def test_resume_reads_committed_position(self):
+        store = CrawlCheckpointStore(self.db_path)
+        await store.save("xhs", CHECKPOINT_SCOPE_SEARCH, "python", {"page": 3, "search_id": "abc"})
+        await store.close()
+
+        store = CrawlCheckpointStore(self.db_path)
+        with mock.patch.object(config, "ENABLE_RESUME", True):
+            position = await store.load("xhs", CHECKPOINT_SCOPE_SEARCH, "python")
+        await store.close()
+        self.assertEqual(position, {"page": 3, "search_id": "abc"})
+
+    async def test_load_returns_none_without_resume(self):
+        store = CrawlCheckpointStore(self.db_path)
+        await store.finish("xhs", CHECKPOINT_SCOPE_SEARCH, "python")
+        with mock.patch.object(config, "ENABLE_RESUME", False):
+            self.assertIsNone(await store.load("xhs", CHECKPOINT_SCOPE_SEARCH, "python"))
+        with mock.patch.object(config, "ENABLE_RESUME", True):
+            self.assertEqual(await store.load("xhs", CHECKPOINT_SCOPE_SEARCH, "python"), {"finished": True})
+        await store.close()
+
+    async def test_clear_only_removes_platform(self):
+        store = CrawlCheckpointStore(self.db_path)
+        await store.save("xhs", CHECKPOINT_SCOPE_SEARCH, "python", {"page": 2})
+        await store.save("bili", CHECKPOINT_SCOPE_SEARCH, "python", {"page": 5})
+        await store.clear("xhs")
+        with mock.patch.object(config, "ENABLE_RESUME", True):
+            self.assertIsNone(await store.load("xhs", CHECKPOINT_SCOPE_SEARCH, "python"))
+            self.assertEqual(await store.load("bili", CHECKPOINT_SCOPE_SEARCH, "python"), {"page": 5})
+        await store.close()
+
+    async def test_committer_waits_for_in_flight_items(self):
+        store = CrawlCheckpointStore(self.db_path)
+        committer = PipelineCheckpointCommitter(store, "xhs", CHECKPOINT_SCOPE_SEARCH, "python")
+        release = asyncio.Event()
+        comments = []
+
+        async def handle_comment(note_id: str):
+            await release.wait()
+            comments.append(note_id)
+
+        async def handle_detail(note_id: str):
+            await comment_stage.put(note_id)
+
+        async def load():
+            with mock.patch.object(config, "ENABLE_RESUME", True):
+                return await store.load("xhs", CHECKPOINT_SCOPE_SEARCH, "python")
+
+        async with CrawlPipeline("test") as pipeline:
+            comment_stage = pipeline.add_stage("comment", handle_comment, workers=2)
+            detail_stage = pipeline.add_stage("detail", handle_detail, workers=2)
+            for page in (1, 2):
+                page_batch = PipelineBatch()
+                with page_batch:
+                    await detail_stage.put(f"note{page}")
+                await committer.add(page_batch, {"page": page + 1})
+            await asyncio.sleep(0.01)
+            # 评论还在处理中，不能提交翻页位置
+            self.assertIsNone(await load())
+            release.set()
+            self.assertTrue(await committer.drain())
+
+        self.assertEqual(sorted(comments), ["note1", "note2"])
+        self.assertEqual(await load(), {"page": 3})
+        await store.close()
+
+    async def test_committer_stops_at_failed_page(self):
+        store = CrawlCheckpointStore(self.db_path)
+        committer = PipelineCheckpointCommitter(store, "xhs", CHECKPOINT_SCOPE_SEARCH, "python")
+
+        async def handle_detail(note_id: str):
+            if note_id == "note2":
+                raise ValueError("bad note")
+
+        async with CrawlPipeline("test") as pipeline:
+            detail_stage = pipeline.add_stage("detail", handle_detail, workers=1)
+            for page in (1, 2, 3):
+                page_batch = PipelineBatch()
+                with page_batch:
+                    await detail_stage.put(f"note{page}")
+                await committer.add(page_batch, {"page": page + 1})
+            self.assertFalse(await committer.drain())
+
+        with mock.patch.object(config, "ENABLE_RESUME", True):
+            self.assertEqual(await store.load("xhs", CHECKPOINT_SCOPE_SEARCH, "python"), {"page": 2})
+        await store.close()
+
+    async def test_save_flushes_stores_first(self):
+        events = []
+
+        async def flush_stores():
+            events.append("flush")
+
+        store = CrawlCheckpointStore(self.db_path, flush_stores=flush_stores)
+        self.assertTrue(await store.save("xhs", CHECKPOINT_SCOPE_SEARCH, "python", {"page": 2}))
+        self.assertEqual(events, ["flush"])
+        await store.close()
+
+    async def test_committer_stops_when_store_writes_failed(self):
+        failed = False
+
+        async def flush_stores():
+            if failed:
+                raise StoreWriteError(1, ValueError("disk full"))
+
+        store = CrawlCheckpointStore(self.db_path, flush_stores=flush_stores)
+        committer = PipelineCheckpointCommitter(store, "xhs", CHECKPOINT_SCOPE_SEARCH, "python")
+        await committer.add(None, {"page": 2})
+        failed = True
+        await committer.add(None, {"page": 3})
+        self.assertFalse(await committer.drain())
+
+        with mock.patch.object(config, "ENABLE_RESUME", True):
+            self.assertEqual(await store.load("xhs", CHECKPOINT_SCOPE_SEARCH, "python"), {"page": 2})
+        await store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import asyncio
+import unittest
+
+from tools.crawl_pipeline import CrawlPipeline, gather_with_limit
+from var import source_keyword_var
+
+
+class TestCrawlPipeline(unittest.IsolatedAsyncioTestCase):
+
+    async def test_join_waits_for_downstream_stages(self):
+        results = []
+
+        async with CrawlPipeline("test") as pipeline:
+            async def handle_comment(note_id: str):
+                await asyncio.sleep(0.01)
+                results.append(("comment", note_id, source_keyword_var.get()))
+
+            async def handle_detail(note_id: str):
+                await asyncio.sleep(0.01)
+                results.append(("detail", note_id, source_keyword_var.get()))
+                await comment_stage.put(note_id)
+
+            comment_stage = pipeline.add_stage("comment", handle_comment, workers=2)
+            detail_stage = pipeline.add_stage("detail", handle_detail, workers=2)
+            for keyword in ["a", "b"]:
+                source_keyword_var.set(keyword)
+                for index in range(3):
+                    await detail_stage.put(f"{keyword}{index}")
+
+        self.assertEqual(len(results), 12)
+        # 每个任务都在放入时的关键词上下文中执行
+        for _, note_id, keyword in results:
+            self.assertEqual(note_id[0], keyword)
+
+    async def test_handler_error_does_not_stop_stage(self):
+        handled = []
+
+        async def handle(value: int):
+            if value == 0:
+                raise ValueError("bad item")
+            handled.append(value)
+
+        async with CrawlPipeline("test") as pipeline:
+            stage = pipeline.add_stage("detail", handle, workers=1)
+            for value in range(3):
+                await stage.put(value)
+
+        self.assertEqual(sorted(handled), [1, 2])
+
+    async def test_gather_with_limit_keeps_order_and_bound(self):
+        running = 0
+        max_running = 0
+
+        async def fetch(value: int) -> int:
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01 * (5 - value))
+            running -= 1
+            return value
+
+        results = await gather_with_limit([fetch(value) for value in range(5)], 2)
+        self.assertEqual(results, [0, 1, 2, 3, 4])
+        self.assertEqual(max_running, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -42,6 +42,43 @@ class TestExpiringLocalCache(unittest.TestCase):
         time.sleep(12)
         self.assertIsNone(self.cache.get('key'))
 
+    def test_max_entries_lru_eviction(self):
+        cache = ExpiringLocalCache(cron_interval=10, max_entries=2)
+        cache.set('a', 1, 10)
+        cache.set('b', 2, 10)
+        cache.get('a')
+        cache.set('c', 3, 10)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_keys_glob(self):
+        self.cache.set('kuaidaili_1', 'v', 10)
+        self.cache.set('kuaidaili_2', 'v', 10)
+        self.cache.set('wandouhttp_1', 'v', 10)
+        self.cache.set('kuaidaili_expired', 'v', -1)
+        self.assertEqual(sorted(self.cache.keys('kuaidaili_*')), ['kuaidaili_1', 'kuaidaili_2'])
+        self.assertEqual(self.cache.keys('*_1'), ['kuaidaili_1', 'wandouhttp_1'])
+
+    def test_clear_expired_only(self):
+        self.cache.set('expired', 'v', -1)
+        self.cache.set('alive', 'v', 10)
+        # 重新设置过期时间后，堆中旧的过期记录不能删除新值
+        self.cache.set('reset', 'v', -1)
+        self.cache.set('reset', 'v', 10)
+        self.cache._clear()
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.get('reset'), 'v')
+        self.assertEqual(self.cache.stats()['expirations'], 1)
+
+    def test_stats(self):
+        self.cache.set('key', 'value', 10)
+        self.cache.get('key')
+        self.cache.get('missing')
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 1, 1))
+
     def tearDown(self):
         del self.cache
 
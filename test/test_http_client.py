@@ -0,0 +1,58 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import asyncio
+import unittest
+
+import httpx
+
+from tools.http_client import AsyncHttpClientPool
+
+
+class TestAsyncHttpClientPool(unittest.IsolatedAsyncioTestCase):
+
+    async def test_evicted_client_closes_after_in_flight_request(self):
+        release = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await release.wait()
+            return httpx.Response(200, text="ok")
+
+        pool = AsyncHttpClientPool(max_proxy_clients=1, transport=httpx.MockTransport(handler))
+        task = asyncio.create_task(pool.send(None, "GET", "https://example.com/"))
+        await asyncio.sleep(0.01)
+        direct_client = await pool.get_client(None)
+
+        # 换到另一个出口，直连的连接池按 LRU 移出，但还有请求在进行中
+        await pool.get_client("http://127.0.0.1:8080")
+        self.assertFalse(direct_client.is_closed)
+
+        release.set()
+        response, blocked, _ = await task
+        self.assertEqual(response.text, "ok")
+        self.assertFalse(blocked)
+        self.assertTrue(direct_client.is_closed)
+        await pool.aclose()
+
+    async def test_idle_evicted_client_closes_immediately(self):
+        pool = AsyncHttpClientPool(max_proxy_clients=1, transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+        await pool.send(None, "GET", "https://example.com/")
+        direct_client = await pool.get_client(None)
+        await pool.get_client("http://127.0.0.1:8080")
+        self.assertTrue(direct_client.is_closed)
+        await pool.aclose()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import asyncio
+import unittest
+
+from tools.keyword_runner import run_keywords
+from var import source_keyword_var
+
+
+class TestRunKeywords(unittest.IsolatedAsyncioTestCase):
+
+    async def test_keywords_run_concurrently_with_own_context(self):
+        running = 0
+        max_running = 0
+        seen = []
+
+        async def search_keyword(keyword: str) -> int:
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            seen.append((keyword, source_keyword_var.get()))
+            running -= 1
+            return 1
+
+        await run_keywords("test", search_keyword, keywords=["a", "b", "c", "d", "e"], concurrency=2)
+        self.assertEqual(max_running, 2)
+        self.assertEqual(sorted(seen), [(keyword, keyword) for keyword in "abcde"])
+
+    async def test_error_cancels_other_keywords(self):
+        finished = []
+
+        async def search_keyword(keyword: str) -> int:
+            if keyword == "bad":
+                raise ValueError("blocked")
+            await asyncio.sleep(1)
+            finished.append(keyword)
+            return 0
+
+        with self.assertRaises(ValueError):
+            await run_keywords("test", search_keyword, keywords=["bad", "a", "b"], concurrency=3)
+        self.assertEqual(finished, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
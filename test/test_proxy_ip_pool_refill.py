@@ -0,0 +1,69 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+from typing import List
+from unittest import IsolatedAsyncioTestCase
+
+from proxy.base_proxy import ProxyProvider
+from proxy.proxy_ip_pool import ProxyIpPool, make_proxy_key
+from proxy.types import IpInfoModel
+
+
+class CacheFirstProxyProvider(ProxyProvider):
+    """
+    和快代理、极速代理一样优先从缓存返回 IP，缓存不够时才提取新的 IP 并放入缓存
+    """
+
+    def __init__(self):
+        self.ip_cache: List[IpInfoModel] = []
+        self.fetched_count = 0
+
+    async def get_proxies(self, num: int) -> List[IpInfoModel]:
+        if len(self.ip_cache) >= num:
+            return self.ip_cache[:num]
+        ip_infos = []
+        for _ in range(num - len(self.ip_cache)):
+            self.fetched_count += 1
+            ip_infos.append(IpInfoModel(ip=f"10.0.0.{self.fetched_count}", port=8000, user="", password="",
+                                      expired_time_ts=None))
+        cached = list(self.ip_cache)
+        self.ip_cache.extend(ip_infos)
+        return cached + ip_infos
+
+
+class TestProxyIpPoolRefill(IsolatedAsyncioTestCase):
+
+    async def test_refill_after_evict_with_cache_first_provider(self):
+        provider = CacheFirstProxyProvider()
+        pool = ProxyIpPool(ip_pool_count=2, enable_validate_ip=False, ip_provider=provider)
+        await pool._refill()
+        self.assertEqual(len(pool.proxy_list), 2)
+
+        for _ in range(3):
+            evicted = pool.proxy_list[0]
+            pool.evict(evicted)
+            await pool._refill()
+            proxy_keys = [make_proxy_key(proxy) for proxy in pool.proxy_list]
+            self.assertEqual(len(proxy_keys), 2)
+            self.assertNotIn(make_proxy_key(evicted), proxy_keys)
+        self.assertEqual(provider.fetched_count, 5)
+
+    async def test_refill_does_not_overfill(self):
+        provider = CacheFirstProxyProvider()
+        await provider.get_proxies(5)
+        pool = ProxyIpPool(ip_pool_count=2, enable_validate_ip=False, ip_provider=provider)
+        await pool._refill()
+        pool.evict(pool.proxy_list[0])
+        await pool._refill()
+        self.assertEqual(len(pool.proxy_list), 2)
+        self.assertEqual(provider.fetched_count, 5)
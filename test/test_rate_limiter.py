@@ -0,0 +1,42 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import unittest
+
+from tools.rate_limiter import TokenBucketRateLimiter
+
+
+class TestTokenBucketRateLimiter(unittest.TestCase):
+
+    def test_burst_without_wait(self):
+        rate_limiter = TokenBucketRateLimiter(rate=10, burst=3)
+        self.assertEqual([rate_limiter.reserve() for _ in range(3)], [0, 0, 0])
+
+    def test_reservations_are_spaced_by_rate(self):
+        rate_limiter = TokenBucketRateLimiter(rate=10, burst=1)
+        rate_limiter.reserve()
+        waits = [rate_limiter.reserve() for _ in range(3)]
+        for expected, wait in zip([0.1, 0.2, 0.3], waits):
+            self.assertAlmostEqual(wait, expected, delta=0.01)
+
+    def test_jitter_only_adds_wait(self):
+        rate_limiter = TokenBucketRateLimiter(rate=10, burst=1, jitter=0.5)
+        rate_limiter.reserve()
+        wait = rate_limiter.reserve()
+        self.assertGreaterEqual(wait, 0.09)
+        self.assertLessEqual(wait, 0.16)
+
+
+if __name__ == '__main__':
+    unittest.main()
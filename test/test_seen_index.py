@@ -0,0 +1,115 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import config
+from store.write_behind import StoreWriteError
+from tools.seen_index import SEEN_ITEM_DETAIL, BloomFilter, SeenIndex
+
+
+class TestBloomFilter(unittest.TestCase):
+
+    def test_no_false_negatives(self):
+        bloom_filter = BloomFilter(capacity=1000, error_rate=0.01)
+        for index in range(1000):
+            bloom_filter.add(f"note-{index}")
+        self.assertTrue(all(f"note-{index}" in bloom_filter for index in range(1000)))
+        false_positives = sum(f"other-{index}" in bloom_filter for index in range(1000))
+        self.assertLess(false_positives, 50)
+
+
+class TestSeenIndex(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "seen_index.db")
+
+    async def asyncTearDown(self):
+        self.tmp_dir.cleanup()
+
+    async def test_skip_policy_survives_restart(self):
+        seen_index = SeenIndex(self.db_path)
+        with mock.patch.object(config, "SEEN_INDEX_POLICY", "skip"):
+            self.assertTrue(await seen_index.should_crawl("xhs", SEEN_ITEM_DETAIL, "n1"))
+            await seen_index.mark_crawled("xhs", SEEN_ITEM_DETAIL, "n1")
+            self.assertFalse(await seen_index.should_crawl("xhs", SEEN_ITEM_DETAIL, "n1"))
+            await seen_index.close()
+
+            seen_index = SeenIndex(self.db_path)
+            self.assertFalse(await seen_index.should_crawl("xhs", SEEN_ITEM_DETAIL, "n1"))
+            self.assertTrue(await seen_index.should_crawl("bili", SEEN_ITEM_DETAIL, "n1"))
+        await seen_index.close()
+
+    async def test_refresh_and_always_policies(self):
+        seen_index = SeenIndex(self.db_path)
+        await seen_index.mark_crawled("xhs", SEEN_ITEM_DETAIL, "n1")
+        with mock.patch.object(config, "SEEN_INDEX_POLICY", "always"):
+            self.assertTrue(await seen_index.should_crawl("xhs", SEEN_ITEM_DETAIL, "n1"))
+        with mock.patch.object(config, "SEEN_INDEX_POLICY", "refresh"):
+            self.assertFalse(await seen_index.should_crawl("xhs", SEEN_ITEM_DETAIL, "n1"))
+            with mock.patch.object(time, "time", return_value=time.time() + config.SEEN_INDEX_REFRESH_SECONDS):
+                self.assertTrue(await seen_index.should_crawl("xhs", SEEN_ITEM_DETAIL, "n1"))
+        await seen_index.close()
+
+    async def test_marks_are_written_after_stores_flush(self):
+        flush_calls = []
+
+        async def flush_stores():
+            flush_calls.append(len(flush_calls))
+            if len(flush_calls) == 1:
+                raise IOError("disk full")
+
+        seen_index = SeenIndex(self.db_path, flush_stores=flush_stores)
+        with mock.patch.object(config, "SEEN_INDEX_POLICY", "skip"):
+            await seen_index.mark_crawled("xhs", SEEN_ITEM_DETAIL, "n1")
+            # 同一次运行中未写入索引的标记也会跳过
+            self.assertFalse(await seen_index.should_crawl("xhs", SEEN_ITEM_DETAIL, "n1"))
+
+            # 存储落盘失败时不写入索引，标记留到下次提交
+            with self.assertRaises(IOError):
+                await seen_index.commit()
+            other_index = SeenIndex(self.db_path)
+            self.assertTrue(await other_index.should_crawl("xhs", SEEN_ITEM_DETAIL, "n1"))
+            await other_index.close()
+
+            await seen_index.commit()
+            self.assertEqual(flush_calls, [0, 1])
+            other_index = SeenIndex(self.db_path)
+            self.assertFalse(await other_index.should_crawl("xhs", SEEN_ITEM_DETAIL, "n1"))
+            await other_index.close()
+        await seen_index.close()
+
+    async def test_marks_stay_pending_after_store_write_failure(self):
+        async def flush_stores():
+            raise StoreWriteError(1, ValueError("disk full"))
+
+        seen_index = SeenIndex(self.db_path, flush_stores=flush_stores)
+        with mock.patch.object(config, "SEEN_INDEX_POLICY", "skip"):
+            await seen_index.mark_crawled("xhs", SEEN_ITEM_DETAIL, "n1")
+            await seen_index.commit()
+            self.assertFalse(await seen_index.should_crawl("xhs", SEEN_ITEM_DETAIL, "n1"))
+            await seen_index.close()
+
+            other_index = SeenIndex(self.db_path)
+            self.assertTrue(await other_index.should_crawl("xhs", SEEN_ITEM_DETAIL, "n1"))
+            await other_index.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    :
+
+import unittest
+from typing import Dict, List
+
+from base.base_crawler import AbstractStore
+from store.write_behind import StoreWriteError, WriteBehindStorePipeline
+
+
+class FakeStore(AbstractStore):
+
+    def __init__(self):
+        self.contents: List[Dict] = []
+        self.comments: List[Dict] = []
+
+    async def store_content(self, content_item: Dict):
+        if content_item.get("fail"):
+            raise ValueError("disk full")
+        self.contents.append(content_item)
+
+    async def store_comment(self, comment_item: Dict):
+        self.comments.append(comment_item)
+
+    async def store_comments(self, comment_items: List[Dict]):
+        if any(comment_item.get("fail") for comment_item in comment_items):
+            raise ValueError("disk full")
+        self.comments.extend(comment_items)
+
+    async def store_creator(self, creator: Dict):
+        pass
+
+
+class TestWriteBehindStorePipeline(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.store = FakeStore()
+        self.pipeline = WriteBehindStorePipeline(queue_size=100, batch_size=10, flush_interval=0.01)
+
+    async def asyncTearDown(self):
+        try:
+            await self.pipeline.close()
+        except StoreWriteError:
+            pass
+
+    async def test_flush_and_close_succeed_without_failures(self):
+        await self.pipeline.put(self.store, "store_content", {"id": 1})
+        await self.pipeline.put(self.store, "store_comment", {"id": 2})
+        await self.pipeline.flush()
+        await self.pipeline.close()
+
+        self.assertEqual(self.store.contents, [{"id": 1}])
+        self.assertEqual(self.store.comments, [{"id": 2}])
+
+    async def test_failed_writes_are_reported_by_flush_and_close(self):
+        await self.pipeline.put(self.store, "store_content", {"id": 1, "fail": True})
+        await self.pipeline.put(self.store, "store_comment", {"id": 2, "fail": True})
+        await self.pipeline.put(self.store, "store_comment", {"id": 3})
+        await self.pipeline.put(self.store, "store_content", {"id": 4})
+
+        with self.assertRaises(StoreWriteError) as ctx:
+            await self.pipeline.flush()
+        # 一条内容加上合并写入的两条评论
+        self.assertEqual(ctx.exception.failed_count, 3)
+        self.assertIsInstance(ctx.exception.last_error, ValueError)
+        self.assertEqual(self.store.contents, [{"id": 4}])
+
+        with self.assertRaises(StoreWriteError):
+            await self.pipeline.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
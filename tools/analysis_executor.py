@@ -0,0 +1,144 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 文本分析进程池，jieba 分词和词云渲染在子进程中执行，不阻塞事件循环
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import config
+
+# 以下全局变量只在子进程中使用，由 _init_worker 初始化
+_stop_words: Set[str] = set()
+
+
+def _init_worker(stop_words_file: str, custom_words: Dict[str, str]) -> None:
+    """
+    子进程启动时加载 jieba 词典、自定义词和停用词，之后的任务不再重复加载
+    Args:
+        stop_words_file: 停用词文件路径
+        custom_words: 自定义词语及其分组
+
+    Returns:
+
+    """
+    global _stop_words
+    import jieba
+
+    logging.getLogger('jieba').setLevel(logging.WARNING)
+    jieba.initialize()
+    for word in custom_words:
+        jieba.add_word(word)
+    with open(stop_words_file, 'r', encoding='utf-8') as f:
+        _stop_words = set(f.read().strip().split('\n'))
+
+
+def count_words(texts: List[str]) -> Dict[str, int]:
+    """
+    对一批文本分词并统计词频，过滤停用词和空白
+    Args:
+        texts: 文本列表
+
+    Returns:
+        词频字典
+
+    """
+    import jieba
+
+    word_freq: Dict[str, int] = {}
+    for word in jieba.lcut(' '.join(texts)):
+        if word not in _stop_words and len(word.strip()) > 0:
+            word_freq[word] = word_freq.get(word, 0) + 1
+    return word_freq
+
+
+def render_word_cloud(word_freq: Dict[str, int], image_file: str, font_path: str) -> None:
+    """
+    取词频最高的 20 个词生成词云图
+    Args:
+        word_freq: 词频字典
+        image_file: 词云图保存路径
+        font_path: 中文字体文件路径
+
+    Returns:
+
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from wordcloud import WordCloud
+
+    top_20_word_freq = {word: freq for word, freq in
+                        sorted(word_freq.items(), key=lambda item: item[1], reverse=True)[:20]}
+    wordcloud = WordCloud(
+        font_path=font_path,
+        width=800,
+        height=400,
+        background_color='white',
+        max_words=200,
+        stopwords=_stop_words,
+        colormap='viridis',
+        contour_color='steelblue',
+        contour_width=1
+    ).generate_from_frequencies(top_20_word_freq)
+
+    plt.figure(figsize=(10, 5), facecolor='white')
+    plt.imshow(wordcloud, interpolation='bilinear')
+    plt.axis('off')
+    plt.tight_layout(pad=0)
+    plt.savefig(image_file, format='png', dpi=300)
+    plt.close()
+
+
+_analysis_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_analysis_executor() -> ProcessPoolExecutor:
+    """
+    获取文本分析进程池，第一次使用时创建
+    Returns:
+
+    """
+    global _analysis_executor
+    if _analysis_executor is None:
+        _analysis_executor = ProcessPoolExecutor(
+            max_workers=max(1, config.ANALYSIS_WORKER_NUM),
+            initializer=_init_worker,
+            initargs=(config.STOP_WORDS_FILE, dict(config.CUSTOM_WORDS)),
+        )
+    return _analysis_executor
+
+
+async def run_analysis(fn: Callable, *args) -> Any:
+    """
+    在文本分析进程池中执行函数并等待结果
+    Args:
+        fn: 模块级函数，例如 count_words
+        *args: 函数参数，需要可以 pickle
+
+    Returns:
+
+    """
+    return await asyncio.get_running_loop().run_in_executor(get_analysis_executor(), fn, *args)
+
+
+async def close_analysis_executor() -> None:
+    """
+    等待进行中的任务结束并关闭进程池，程序退出前调用
+    Returns:
+
+    """
+    global _analysis_executor
+    executor, _analysis_executor = _analysis_executor, None
+    if executor is not None:
+        await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
@@ -0,0 +1,419 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 长期持有文件句柄的缓冲写入器
+import asyncio
+import csv
+import io
+import json
+import os
+import pathlib
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional, Set, TextIO
+
+import config
+from tools import utils
+
+
+class AsyncBufferedFileWriter(ABC):
+    """
+    追加写入器基类，文件句柄在整个运行期间保持打开，记录先序列化到内存缓冲，
+    按条数或时间批量落盘，磁盘 IO 在线程池中执行，不阻塞事件循环
+    """
+    encoding: str = "utf-8"
+    newline: Optional[str] = None
+
+    def __init__(self, file_path: str, buffer_size: int, flush_interval: float):
+        """
+        Args:
+            file_path: 文件路径
+            buffer_size: 缓冲区达到多少条记录时落盘
+            flush_interval: 距离上次落盘超过多少秒时落盘
+        """
+        self.file_path = file_path
+        self._buffer_size = buffer_size
+        self._flush_interval = flush_interval
+        self._buffer: List[str] = []
+        self._file: Optional[TextIO] = None
+        self._last_flush_time = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @abstractmethod
+    def serialize(self, item: Dict) -> str:
+        """
+        将一条记录序列化为写入文件的文本（包含换行符）
+        Args:
+            item: 记录字典
+
+        Returns:
+
+        """
+        raise NotImplementedError
+
+    async def write(self, item: Dict) -> None:
+        """
+        写入一条记录
+        Args:
+            item: 记录字典
+
+        Returns:
+
+        """
+        self._buffer.append(self.serialize(item))
+        if (
+            len(self._buffer) >= self._buffer_size
+            or time.monotonic() - self._last_flush_time >= self._flush_interval
+        ):
+            await self.flush()
+
+    async def flush(self) -> None:
+        """
+        将缓冲区中的记录写入磁盘
+        Returns:
+
+        """
+        async with self._lock:
+            self._last_flush_time = time.monotonic()
+            if not self._buffer:
+                return
+            lines, self._buffer = self._buffer, []
+            await asyncio.get_running_loop().run_in_executor(None, self._write_to_disk, "".join(lines))
+
+    def _write_to_disk(self, data: str) -> None:
+        if self._file is None:
+            pathlib.Path(self.file_path).parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.file_path, mode="a", encoding=self.encoding, newline=self.newline)
+        self._file.write(data)
+        self._file.flush()
+
+    async def close(self) -> None:
+        """
+        落盘剩余记录并关闭文件
+        Returns:
+
+        """
+        await self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class AsyncJsonlWriter(AsyncBufferedFileWriter):
+    """
+    JSON Lines 追加写入器，每条记录一行
+    """
+
+    def __init__(self, file_path: str, buffer_size: Optional[int] = None, flush_interval: Optional[float] = None):
+        super().__init__(
+            file_path,
+            buffer_size or config.JSONL_BUFFER_SIZE,
+            flush_interval or config.JSONL_FLUSH_INTERVAL,
+        )
+
+    def serialize(self, item: Dict) -> str:
+        return json.dumps(item, ensure_ascii=False) + "\n"
+
+
+# 已写入表头的 csv 文件及其表头，写入器轮换、关闭后仍然保留，避免重复写表头
+_csv_headers: Dict[str, List[str]] = {}
+
+
+class AsyncCsvWriter(AsyncBufferedFileWriter):
+    """
+    CSV 追加写入器，第一条记录的字段名作为表头，新文件只写一次表头
+    """
+    encoding = "utf-8-sig"
+    newline = ""
+
+    def __init__(self, file_path: str, buffer_size: Optional[int] = None, flush_interval: Optional[float] = None):
+        super().__init__(
+            file_path,
+            buffer_size or config.CSV_BUFFER_SIZE,
+            flush_interval or config.CSV_FLUSH_INTERVAL,
+        )
+        self._row_buffer = io.StringIO()
+        self._csv_writer = csv.writer(self._row_buffer)
+
+    def serialize(self, item: Dict) -> str:
+        if self.file_path not in _csv_headers:
+            _csv_headers[self.file_path] = list(item.keys())
+            # 已有内容的文件（例如同一天重复运行）说明表头已经写过
+            if not (os.path.exists(self.file_path) and os.path.getsize(self.file_path) > 0):
+                self._csv_writer.writerow(item.keys())
+        self._csv_writer.writerow(item.values())
+        line = self._row_buffer.getvalue()
+        self._row_buffer.seek(0)
+        self._row_buffer.truncate()
+        return line
+
+
+def _import_pyarrow():
+    """
+    pyarrow 只有 parquet 存储方式需要，用到时再导入
+    Returns:
+
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("SAVE_DATA_OPTION=parquet requires pyarrow, please run: pip install pyarrow") from e
+    return pyarrow, pyarrow.parquet
+
+
+class AsyncParquetWriter:
+    """
+    Parquet 写入器，记录先追加到同名的 .rows.jsonl 临时文件，close 时转换为压缩的 Parquet 文件并删除临时文件。
+    Parquet 文件的 schema 写入后不能修改，所以列和类型根据全部记录确定，写入时逐条累计：
+    只有 bool / int / float 的列保存为 bool / int64 / float64，其他列（字符串、类型混合、dict 和 list）保存为字符串，
+    任意一行出现过的字段都会成为一列；转换时按行组读取一遍临时文件，内存中最多保留一个行组。
+    进程崩溃时只留下临时文件，同一路径的写入器会接着追加，其他路径的临时文件由 recover_parquet_spools 转换
+    """
+
+    def __init__(self, file_path: str, row_group_size: Optional[int] = None, compression: Optional[str] = None):
+        """
+        Args:
+            file_path: parquet 文件路径
+            row_group_size: 每个行组的行数
+            compression: 压缩算法
+        """
+        self.file_path = file_path
+        self._row_group_size = row_group_size or config.PARQUET_ROW_GROUP_SIZE
+        self._compression = compression or config.PARQUET_COMPRESSION
+        self._rows_writer = AsyncJsonlWriter(f"{file_path}.rows.jsonl")
+        self._pa, self._pq = _import_pyarrow()
+        # 列名 -> 出现过的值类型
+        self._column_types: Dict[str, Set[type]] = {}
+        # 临时文件是上次运行崩溃留下的，其中记录的类型要在转换时重新读取一遍
+        self._has_leftover_rows = os.path.exists(self._rows_writer.file_path)
+
+    async def write(self, item: Dict) -> None:
+        """
+        写入一条记录
+        Args:
+            item: 记录字典
+
+        Returns:
+
+        """
+        self._add_column_types(item)
+        await self._rows_writer.write(item)
+
+    async def flush(self) -> None:
+        """
+        将缓冲的记录写入临时文件
+        Returns:
+
+        """
+        await self._rows_writer.flush()
+
+    def _read_rows(self) -> Iterator[Dict]:
+        with open(self._rows_writer.file_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _add_column_types(self, row: Dict) -> None:
+        for name, value in row.items():
+            value_types = self._column_types.setdefault(name, set())
+            if value is None:
+                continue
+            if isinstance(value, int) and not isinstance(value, bool) and not -2 ** 63 <= value < 2 ** 63:
+                # 超出 int64 范围的整数按字符串保存
+                value_types.add(str)
+            elif isinstance(value, (bool, int, float)):
+                value_types.add(type(value))
+            else:
+                # 字符串、dict、list 等都保存为字符串，与 JSON 往返后的类型一致
+                value_types.add(str)
+
+    def _infer_schema(self):
+        pa = self._pa
+        if self._has_leftover_rows:
+            for row in self._read_rows():
+                self._add_column_types(row)
+            self._has_leftover_rows = False
+        fields = []
+        for name, value_types in self._column_types.items():
+            if value_types == {bool}:
+                arrow_type = pa.bool_()
+            elif value_types and value_types <= {int}:
+                arrow_type = pa.int64()
+            elif value_types and value_types <= {int, float}:
+                arrow_type = pa.float64()
+            else:
+                arrow_type = pa.string()
+            fields.append(pa.field(name, arrow_type))
+        return pa.schema(fields)
+
+    def _to_column_value(self, value, arrow_type):
+        pa = self._pa
+        if value is None:
+            return None
+        if arrow_type == pa.string():
+            if isinstance(value, (dict, list)):
+                return json.dumps(value, ensure_ascii=False)
+            return str(value)
+        if arrow_type == pa.float64():
+            return float(value)
+        return value
+
+    def _write_row_group(self, writer, schema, rows: List[Dict]) -> None:
+        pa = self._pa
+        columns = [
+            pa.array([self._to_column_value(row.get(field.name), field.type) for row in rows], type=field.type)
+            for field in schema
+        ]
+        writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+
+    def _convert_to_parquet(self) -> None:
+        if not os.path.exists(self._rows_writer.file_path):
+            return
+        schema = self._infer_schema()
+        writer = self._pq.ParquetWriter(self.file_path, schema, compression=self._compression)
+        try:
+            rows: List[Dict] = []
+            for row in self._read_rows():
+                rows.append(row)
+                if len(rows) >= self._row_group_size:
+                    self._write_row_group(writer, schema, rows)
+                    rows = []
+            if rows:
+                self._write_row_group(writer, schema, rows)
+        finally:
+            writer.close()
+        os.remove(self._rows_writer.file_path)
+
+    async def close(self) -> None:
+        """
+        写入剩余记录，转换为 Parquet 文件并删除临时文件
+        Returns:
+
+        """
+        await self._rows_writer.close()
+        await asyncio.get_running_loop().run_in_executor(None, self._convert_to_parquet)
+
+
+_jsonl_writers: Dict[str, AsyncJsonlWriter] = {}
+_csv_writers: Dict[str, AsyncCsvWriter] = {}
+_parquet_writers: Dict[str, AsyncParquetWriter] = {}
+# 已经检查过崩溃遗留临时文件的目录
+_recovered_parquet_dirs: Set[str] = set()
+
+
+def get_jsonl_writer(file_path: str) -> AsyncJsonlWriter:
+    """
+    获取文件对应的 jsonl 写入器，同一个文件在进程内只打开一次
+    Args:
+        file_path: jsonl 文件路径
+
+    Returns:
+
+    """
+    if file_path not in _jsonl_writers:
+        _jsonl_writers[file_path] = AsyncJsonlWriter(file_path)
+    return _jsonl_writers[file_path]
+
+
+async def get_csv_writer(stream_key: str, file_path: str) -> AsyncCsvWriter:
+    """
+    获取数据流对应的 csv 写入器，数据流的文件路径变化时（例如过了零点日期改变）关闭旧文件、打开新文件
+    Args:
+        stream_key: 数据流标识，例如 data/xhs/1_search_comments
+        file_path: 当前应写入的 csv 文件路径
+
+    Returns:
+
+    """
+    writer = _csv_writers.get(stream_key)
+    if writer is not None and writer.file_path == file_path:
+        return writer
+    _csv_writers[stream_key] = AsyncCsvWriter(file_path)
+    if writer is not None:
+        await writer.close()
+    return _csv_writers[stream_key]
+
+
+async def get_parquet_writer(stream_key: str, file_path: str) -> AsyncParquetWriter:
+    """
+    获取数据流对应的 parquet 写入器，数据流的文件路径变化时关闭旧文件、打开新文件
+    Args:
+        stream_key: 数据流标识，例如 data/xhs/parquet/search_comments
+        file_path: 当前应写入的 parquet 文件路径
+
+    Returns:
+
+    """
+    writer = _parquet_writers.get(stream_key)
+    if writer is not None and writer.file_path == file_path:
+        return writer
+    _parquet_writers[stream_key] = AsyncParquetWriter(file_path)
+    if writer is not None:
+        await writer.close()
+    directory = os.path.dirname(file_path)
+    if directory not in _recovered_parquet_dirs:
+        _recovered_parquet_dirs.add(directory)
+        await recover_parquet_spools(directory)
+    return _parquet_writers[stream_key]
+
+
+async def recover_parquet_spools(directory: str) -> None:
+    """
+    把目录中上次运行崩溃留下的 .parquet.rows.jsonl 临时文件转换为 Parquet 文件，
+    正在写入的文件除外（同一路径的写入器会接着追加，close 时一起转换）。
+    也可以在爬虫没有运行时手动调用这个函数恢复
+    Args:
+        directory: parquet 文件所在目录
+
+    Returns:
+
+    """
+    if not os.path.isdir(directory):
+        return
+    active_paths = {writer.file_path for writer in _parquet_writers.values()}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".parquet.rows.jsonl"):
+            continue
+        file_path = os.path.join(directory, name[:-len(".rows.jsonl")])
+        if file_path in active_paths:
+            continue
+        utils.logger.info(f"[recover_parquet_spools] convert leftover rows to {file_path}")
+        await AsyncParquetWriter(file_path).close()
+
+
+async def flush_all_writers() -> None:
+    """
+    落盘所有写入器的缓冲数据
+    Returns:
+
+    """
+    for writer in list(_jsonl_writers.values()) + list(_csv_writers.values()) + list(_parquet_writers.values()):
+        await writer.flush()
+
+
+async def close_all_writers() -> None:
+    """
+    关闭所有写入器，程序退出前调用
+    Returns:
+
+    """
+    while _jsonl_writers:
+        _, writer = _jsonl_writers.popitem()
+        await writer.close()
+    while _csv_writers:
+        _, writer = _csv_writers.popitem()
+        await writer.close()
+    while _parquet_writers:
+        _, writer = _parquet_writers.popitem()
+        await writer.close()
+    _recovered_parquet_dirs.clear()
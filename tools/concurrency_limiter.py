@@ -0,0 +1,175 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 按平台共享的自适应并发控制（AIMD），根据请求延迟和封禁信号调整并发数
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+import config
+from tools import utils
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    可以直接替换 asyncio.Semaphore 使用（async with limiter），并发上限会动态变化：
+    延迟健康且有任务在排队时，每成功 limit 次请求上限加 1（加性增）；
+    命中封禁信号或超时时上限乘以 ADAPTIVE_CONCURRENCY_DECREASE_FACTOR（乘性减）
+    """
+
+    def __init__(self, name: str, initial_limit: int, min_limit: int = 1, max_limit: Optional[int] = None,
+                 adaptive: bool = True) -> None:
+        """
+        Args:
+            name: 名称，一般为平台名，用于日志
+            initial_limit: 初始并发数
+            min_limit: 并发数下限
+            max_limit: 并发数上限，默认等于初始并发数
+            adaptive: 是否根据反馈调整并发数，为 False 时等同于 asyncio.Semaphore(initial_limit)
+        """
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, initial_limit, max_limit or initial_limit)
+        self.adaptive = adaptive
+        self._limit = min(max(initial_limit, self.min_limit), self.max_limit)
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._success_since_change = 0
+        self._last_decrease_time = 0.0
+        self._min_latency: Optional[float] = None
+        self._avg_latency: Optional[float] = None
+        self.success_count = 0
+        self.blocked_count = 0
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    def stats(self) -> Dict:
+        """
+        当前并发上限等运行指标
+        Returns:
+
+        """
+        return {
+            "name": self.name,
+            "limit": self._limit,
+            "in_flight": self._in_flight,
+            "waiting": len(self._waiters),
+            "avg_latency": self._avg_latency,
+            "min_latency": self._min_latency,
+            "success_count": self.success_count,
+            "blocked_count": self.blocked_count,
+        }
+
+    async def acquire(self) -> None:
+        if self._in_flight < self._limit and not self._waiters:
+            self._in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 已经分配到名额后被取消，把名额还回去
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        self._wake_up_waiters()
+
+    def _wake_up_waiters(self) -> None:
+        while self._waiters and self._in_flight < self._limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    async def __aenter__(self) -> "AdaptiveConcurrencyLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.release()
+
+    def _set_limit(self, limit: int) -> None:
+        limit = min(max(limit, self.min_limit), self.max_limit)
+        if limit == self._limit:
+            return
+        utils.logger.info(f"[AdaptiveConcurrencyLimiter] {self.name} concurrency limit {self._limit} -> {limit}")
+        self._limit = limit
+        self._success_since_change = 0
+        self._wake_up_waiters()
+
+    def on_success(self, latency: float) -> None:
+        """
+        请求成功的反馈
+        Args:
+            latency: 请求耗时（秒）
+
+        Returns:
+
+        """
+        self.success_count += 1
+        self._min_latency = latency if self._min_latency is None else min(self._min_latency, latency)
+        self._avg_latency = latency if self._avg_latency is None else 0.8 * self._avg_latency + 0.2 * latency
+        if not self.adaptive:
+            return
+        self._success_since_change += 1
+        latency_healthy = self._avg_latency <= self._min_latency * config.ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE
+        if latency_healthy and self._waiters and self._success_since_change >= self._limit:
+            self._set_limit(self._limit + 1)
+
+    def on_blocked(self) -> None:
+        """
+        命中封禁信号或者请求超时的反馈，同一波失败在冷却时间内只减一次
+        Returns:
+
+        """
+        self.blocked_count += 1
+        if not self.adaptive:
+            return
+        now = time.monotonic()
+        if now - self._last_decrease_time < config.ADAPTIVE_CONCURRENCY_DECREASE_COOLDOWN:
+            return
+        self._last_decrease_time = now
+        self._set_limit(int(self._limit * config.ADAPTIVE_CONCURRENCY_DECREASE_FACTOR))
+
+
+_concurrency_limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+
+
+def get_concurrency_limiter(platform: str) -> AdaptiveConcurrencyLimiter:
+    """
+    获取平台共享的并发控制器，第一次获取时按配置创建，初始并发数为 MAX_CONCURRENCY_NUM
+    Args:
+        platform: 平台名称
+
+    Returns:
+
+    """
+    concurrency_limiter = _concurrency_limiters.get(platform)
+    if concurrency_limiter is None:
+        concurrency_limiter = AdaptiveConcurrencyLimiter(
+            name=platform,
+            initial_limit=config.MAX_CONCURRENCY_NUM,
+            min_limit=config.ADAPTIVE_CONCURRENCY_MIN,
+            max_limit=config.ADAPTIVE_CONCURRENCY_MAX,
+            adaptive=config.ENABLE_ADAPTIVE_CONCURRENCY,
+        )
+        _concurrency_limiters[platform] = concurrency_limiter
+    return concurrency_limiter
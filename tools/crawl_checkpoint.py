@@ -0,0 +1,263 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 爬取断点的持久化（SQLite），进程崩溃或重启后通过 --resume 从上次提交的位置继续爬取
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+import aiosqlite
+
+import config
+from store.store_registry import flush_all_stores
+from store.write_behind import StoreWriteError
+from tools import utils
+from tools.crawl_pipeline import PipelineBatch
+
+# 断点的作用域
+CHECKPOINT_SCOPE_SEARCH = "search"  # 关键词搜索的翻页位置，key 为关键词
+CHECKPOINT_SCOPE_SEARCH_BY_DAY = "search_by_day"  # 按天搜索的日期和翻页位置，key 为关键词
+CHECKPOINT_SCOPE_CREATOR = "creator"  # 创作者作品列表的翻页游标，key 为创作者 ID
+CHECKPOINT_SCOPE_COMMENT = "comment"  # 帖子一级评论的翻页游标，key 为帖子 ID
+
+
+class CrawlCheckpointStore:
+    """
+    断点按 (平台, 作用域, key) 保存为一条 JSON 记录，每次保存立即提交，
+    崩溃后能读到的都是已经提交的位置；ENABLE_RESUME 关闭时 load 总是返回 None，只记录不读取。
+    存储是异步、批量落盘的，保存断点前先等待存储落盘，崩溃时不会出现断点之前的数据还没有保存的情况
+    """
+
+    def __init__(self, db_path: str, flush_stores: Optional[Callable[[], Awaitable[None]]] = None) -> None:
+        """
+        Args:
+            db_path: 数据库文件路径
+            flush_stores: 保存断点前调用，等待已经提交给存储的数据落盘
+        """
+        self.db_path = db_path
+        self._flush_stores = flush_stores
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._conn_lock: Optional[asyncio.Lock] = None
+
+    async def _get_conn(self) -> aiosqlite.Connection:
+        if self._conn is not None:
+            return self._conn
+        if self._conn_lock is None:
+            self._conn_lock = asyncio.Lock()
+        async with self._conn_lock:
+            if self._conn is None:
+                os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+                conn = await aiosqlite.connect(self.db_path)
+                await conn.execute("PRAGMA journal_mode=WAL")
+                await conn.execute(
+                    "CREATE TABLE IF NOT EXISTS crawl_checkpoint ("
+                    "platform TEXT NOT NULL, scope TEXT NOT NULL, key TEXT NOT NULL, "
+                    "position TEXT NOT NULL, updated_at INTEGER NOT NULL, "
+                    "PRIMARY KEY (platform, scope, key))"
+                )
+                await conn.commit()
+                self._conn = conn
+        return self._conn
+
+    async def load(self, platform: str, scope: str, key: str) -> Optional[Dict]:
+        """
+        读取断点，未开启续爬时返回 None
+        Args:
+            platform: 平台名称
+            scope: 作用域
+            key: 关键词、创作者 ID、帖子 ID 等
+
+        Returns:
+            上次提交的位置
+
+        """
+        if not config.ENABLE_CRAWL_CHECKPOINT or not config.ENABLE_RESUME:
+            return None
+        conn = await self._get_conn()
+        async with conn.execute(
+            "SELECT position FROM crawl_checkpoint WHERE platform = ? AND scope = ? AND key = ?",
+            (platform, scope, str(key)),
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        position = json.loads(row[0])
+        utils.logger.info(f"[CrawlCheckpointStore.load] Resume {platform} {scope} {key} from {position}")
+        return position
+
+    async def save(self, platform: str, scope: str, key: str, position: Dict) -> bool:
+        """
+        等待存储落盘后保存断点并立即提交，有数据写入失败时不再保存，续爬时从更早的位置重新爬取
+        Args:
+            platform: 平台名称
+            scope: 作用域
+            key: 关键词、创作者 ID、帖子 ID 等
+            position: 位置，需要能够 JSON 序列化
+
+        Returns:
+            存储有写入失败、没有保存断点时返回 False
+
+        """
+        if not config.ENABLE_CRAWL_CHECKPOINT:
+            return True
+        if self._flush_stores is not None:
+            try:
+                await self._flush_stores()
+            except StoreWriteError as e:
+                utils.logger.error(f"[CrawlCheckpointStore.save] skip {platform} {scope} {key} {position}: {e}")
+                return False
+        conn = await self._get_conn()
+        await conn.execute(
+            "INSERT OR REPLACE INTO crawl_checkpoint (platform, scope, key, position, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (platform, scope, str(key), json.dumps(position, ensure_ascii=False), int(time.time())),
+        )
+        await conn.commit()
+        return True
+
+    async def finish(self, platform: str, scope: str, key: str, position: Optional[Dict] = None) -> bool:
+        """
+        标记已经爬取完成，续爬时直接跳过
+        Args:
+            platform: 平台名称
+            scope: 作用域
+            key: 关键词、创作者 ID、帖子 ID 等
+            position: 需要一起保存的位置
+
+        Returns:
+            存储有写入失败、没有保存断点时返回 False
+
+        """
+        return await self.save(platform, scope, key, {**(position or {}), "finished": True})
+
+    async def clear(self, platform: str) -> None:
+        """
+        清空平台的所有断点
+        Args:
+            platform: 平台名称
+
+        Returns:
+
+        """
+        if not config.ENABLE_CRAWL_CHECKPOINT:
+            return
+        conn = await self._get_conn()
+        await conn.execute("DELETE FROM crawl_checkpoint WHERE platform = ?", (platform,))
+        await conn.commit()
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+
+class PipelineCheckpointCommitter:
+    """
+    按顺序提交流水线搜索的断点：翻到下一页时得到的位置，要等这一页投递到流水线的任务（包括派生的评论、媒体任务）
+    全部处理完，并且之前的位置都已提交后才提交，崩溃后续爬不会丢掉还在流水线中的内容；
+    某一页有任务出错后不再提交之后的位置，续爬时从这一页重新开始，已经爬取的内容由去重索引跳过
+    """
+
+    def __init__(self, store: CrawlCheckpointStore, platform: str, scope: str, key: str) -> None:
+        """
+        Args:
+            store: 断点存储
+            platform: 平台名称
+            scope: 作用域
+            key: 关键词等
+        """
+        self.store = store
+        self.platform = platform
+        self.scope = scope
+        self.key = key
+        self.failed = False
+        self._pending: Deque[Tuple[Optional[PipelineBatch], Dict]] = deque()
+
+    async def add(self, batch: Optional[PipelineBatch], position: Dict) -> None:
+        """
+        添加一个待提交的位置，并提交前面已经处理完的位置
+        Args:
+            batch: 这个位置之前投递到流水线的任务，为 None 时只需要等前面的位置提交
+            position: 位置
+
+        Returns:
+
+        """
+        self._pending.append((batch, position))
+        await self._commit(wait=False)
+
+    async def drain(self) -> bool:
+        """
+        等待所有位置的任务处理完并提交
+        Returns:
+            所有任务都成功处理时返回 True
+
+        """
+        await self._commit(wait=True)
+        return not self.failed
+
+    async def _commit(self, wait: bool) -> None:
+        while self._pending and not self.failed:
+            batch, position = self._pending[0]
+            if batch is not None:
+                if not batch.done and not wait:
+                    return
+                await batch.wait()
+            self._pending.popleft()
+            if batch is not None and batch.failed:
+                self.failed = True
+                utils.logger.info(
+                    f"[PipelineCheckpointCommitter] {self.platform} {self.scope} {self.key} has failed items, "
+                    f"skip committing {position} and later positions"
+                )
+                return
+            if not await self.store.save(self.platform, self.scope, self.key, position):
+                # 存储写入失败，之后的位置也不再提交
+                self.failed = True
+                return
+
+
+_checkpoint_store: Optional[CrawlCheckpointStore] = None
+
+
+def get_checkpoint_store() -> CrawlCheckpointStore:
+    """
+    获取进程共享的断点存储
+    Returns:
+
+    """
+    global _checkpoint_store
+    if _checkpoint_store is None:
+        _checkpoint_store = CrawlCheckpointStore(config.CRAWL_CHECKPOINT_DB_PATH, flush_stores=flush_all_stores)
+    return _checkpoint_store
+
+
+async def init_crawl_checkpoint(platform: str) -> None:
+    """
+    启动爬虫前调用，不续爬时清空平台上次留下的断点，避免之后 --resume 读到更早一次运行的位置
+    Args:
+        platform: 平台名称
+
+    Returns:
+
+    """
+    if config.ENABLE_CRAWL_CHECKPOINT and not config.ENABLE_RESUME:
+        await get_checkpoint_store().clear(platform)
+
+
+async def close_crawl_checkpoint() -> None:
+    global _checkpoint_store
+    if _checkpoint_store is not None:
+        await _checkpoint_store.close()
+        _checkpoint_store = None
@@ -0,0 +1,217 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 分阶段的爬取流水线，搜索翻页、详情、评论、媒体各阶段通过有界队列衔接并发执行；以及有并发上限的 gather
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple, TypeVar
+
+import config
+from tools import utils
+
+T = TypeVar("T")
+
+
+class PipelineBatch:
+    """
+    一批投递到流水线的任务，例如搜索结果的一页：在 with 块中 put 的任务，以及这些任务的 handler 再 put 到下游阶段的任务
+    都属于这一批（批次通过 contextvars 随任务传递），全部处理完后 wait 返回，有任务抛出异常时 failed 为 True
+    """
+
+    def __init__(self) -> None:
+        self.pending = 0
+        self.failed = False
+        self._done_event = asyncio.Event()
+        self._done_event.set()
+        self._token: Optional[contextvars.Token] = None
+
+    @property
+    def done(self) -> bool:
+        return self.pending == 0
+
+    def _add(self) -> None:
+        self.pending += 1
+        self._done_event.clear()
+
+    def _remove(self, failed: bool) -> None:
+        self.pending -= 1
+        self.failed = self.failed or failed
+        if self.pending == 0:
+            self._done_event.set()
+
+    async def wait(self) -> None:
+        """
+        等待这一批任务全部处理完
+        Returns:
+
+        """
+        await self._done_event.wait()
+
+    def __enter__(self) -> "PipelineBatch":
+        self._token = _current_batch.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        _current_batch.reset(self._token)
+        self._token = None
+
+
+_current_batch: "contextvars.ContextVar[Optional[PipelineBatch]]" = contextvars.ContextVar(
+    "pipeline_batch", default=None
+)
+
+
+class PipelineStage:
+    """
+    流水线的一个阶段：一个有界队列 + 若干 worker，
+    每个任务在放入队列时的 contextvars 上下文中执行（例如 source_keyword_var 保持为放入时的关键词）
+    """
+
+    def __init__(self, name: str, handler: Callable[..., Awaitable[Any]], workers: int,
+                 max_size: Optional[int] = None) -> None:
+        """
+        Args:
+            name: 阶段名称，用于日志
+            handler: 处理一个任务的协程函数，参数与 put 的参数一致
+            workers: worker 数量
+            max_size: 队列最大长度，队列满时 put 等待（背压），默认 PIPELINE_QUEUE_MAX_SIZE
+        """
+        self.name = name
+        self.handler = handler
+        self.queue: "asyncio.Queue[Tuple[contextvars.Context, tuple]]" = asyncio.Queue(
+            maxsize=max_size or config.PIPELINE_QUEUE_MAX_SIZE
+        )
+        self.pending = 0
+        self._workers: List[asyncio.Task] = [
+            asyncio.create_task(self._work(), name=f"{name}-worker-{index}") for index in range(max(1, workers))
+        ]
+
+    async def put(self, *args) -> None:
+        """
+        放入一个任务，队列满时等待
+        Args:
+            *args: handler 的参数
+
+        Returns:
+
+        """
+        batch = _current_batch.get()
+        if batch is not None:
+            batch._add()
+        self.pending += 1
+        await self.queue.put((contextvars.copy_context(), args))
+
+    async def _work(self) -> None:
+        while True:
+            context, args = await self.queue.get()
+            batch = context.get(_current_batch)
+            failed = False
+            try:
+                # 在放入任务时的上下文中创建 task，handler 读到的 contextvars 与生产者一致
+                await context.run(asyncio.ensure_future, self.handler(*args))
+            except Exception as e:
+                failed = True
+                utils.logger.error(f"[PipelineStage.{self.name}] handle {args} error: {e}")
+            finally:
+                self.pending -= 1
+                if batch is not None:
+                    batch._remove(failed)
+                self.queue.task_done()
+
+    async def join(self) -> None:
+        await self.queue.join()
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+
+class CrawlPipeline:
+    """
+    由多个阶段组成的流水线，上游阶段的 handler 把结果 put 到下游阶段；
+    async with 正常退出时等待所有阶段处理完，异常退出时直接取消所有 worker
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.stages: List[PipelineStage] = []
+
+    def add_stage(self, name: str, handler: Callable[..., Awaitable[Any]], workers: int,
+                  max_size: Optional[int] = None) -> PipelineStage:
+        """
+        添加一个阶段并启动它的 worker
+        Args:
+            name: 阶段名称
+            handler: 处理一个任务的协程函数
+            workers: worker 数量
+            max_size: 队列最大长度
+
+        Returns:
+
+        """
+        stage = PipelineStage(f"{self.name}.{name}", handler, workers, max_size)
+        self.stages.append(stage)
+        return stage
+
+    async def join(self) -> None:
+        """
+        等待所有阶段的队列处理完，阶段之间可以任意顺序互相投递任务
+        Returns:
+
+        """
+        while True:
+            for stage in self.stages:
+                await stage.join()
+            if all(stage.pending == 0 for stage in self.stages):
+                return
+
+    async def close(self) -> None:
+        for stage in self.stages:
+            await stage.close()
+
+    async def __aenter__(self) -> "CrawlPipeline":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        try:
+            if exc_type is None:
+                await self.join()
+        finally:
+            await self.close()
+
+
+async def gather_with_limit(aws: Iterable[Awaitable[T]], limit: int) -> List[T]:
+    """
+    并发执行一组协程，同时最多执行 limit 个，结果顺序与输入一致；
+    任意一个出错时取消其余协程并抛出该异常
+    Args:
+        aws: 协程列表
+        limit: 最大并发数
+
+    Returns:
+        每个协程的结果
+
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(aw: Awaitable[T]) -> T:
+        async with semaphore:
+            return await aw
+
+    tasks = [asyncio.ensure_future(run(aw)) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,221 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 按代理出口复用的 httpx 长连接池
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Set, Tuple, Union
+
+import httpx
+
+import config
+from tools.concurrency_limiter import get_concurrency_limiter
+from tools.rate_limiter import get_rate_limiter
+
+ProxiesType = Optional[Union[str, Dict[str, str]]]
+
+
+class AsyncHttpClientPool:
+    """
+    平台 API 客户端共享的 httpx.AsyncClient 连接池
+    每个代理出口（不使用代理时为直连）对应一个长期存活的 AsyncClient，
+    同一个出口的请求复用 TCP/TLS 连接，代理轮换后旧出口的连接池按 LRU 移出，等进行中的请求结束后再关闭；
+    设置了 proxy_rotator 时请求统一走代理轮换策略，命中 is_blocked 封禁信号会换代理重试；
+    设置了 platform 时每次请求前按 (平台, host) 获取限速令牌，请求结果反馈给平台的自适应并发控制
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        max_proxy_clients: Optional[int] = None,
+        platform: Optional[str] = None,
+        proxy_rotator=None,
+        is_blocked: Optional[Callable[[httpx.Response], bool]] = None,
+        **client_kwargs,
+    ):
+        """
+        Args:
+            max_connections: 单个出口的最大连接数
+            max_keepalive_connections: 单个出口保持的最大长连接数
+            keepalive_expiry: 空闲长连接的过期时间（秒）
+            max_proxy_clients: 同时保留的出口连接池数量
+            platform: 平台名称，用于请求限速和自适应并发，为 None 时不限速
+            proxy_rotator: proxy.proxy_rotation.ProxyRotator，为 None 时不轮换代理
+            is_blocked: 平台的封禁信号判断函数
+            **client_kwargs: 透传给 httpx.AsyncClient 的其他参数
+        """
+        self._limits = httpx.Limits(
+            max_connections=max_connections or config.HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive_connections or config.HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=keepalive_expiry or config.HTTP_POOL_KEEPALIVE_EXPIRY,
+        )
+        self._max_proxy_clients = max(1, max_proxy_clients or config.HTTP_POOL_MAX_PROXY_CLIENTS)
+        self._client_kwargs = client_kwargs
+        self._clients: "OrderedDict[str, httpx.AsyncClient]" = OrderedDict()
+        # 每个 AsyncClient 上进行中的请求数，以及已经移出、等请求结束后关闭的 AsyncClient
+        self._in_flight: Dict[httpx.AsyncClient, int] = {}
+        self._retired_clients: Set[httpx.AsyncClient] = set()
+        self.platform = platform
+        self.proxy_rotator = proxy_rotator
+        self.is_blocked = is_blocked
+
+    @staticmethod
+    def make_pool_key(proxies: ProxiesType) -> str:
+        """
+        根据代理配置生成连接池的 key，不使用代理时为空字符串
+        Args:
+            proxies: httpx 格式的代理配置
+
+        Returns:
+
+        """
+        if not proxies:
+            return ""
+        if isinstance(proxies, str):
+            return proxies
+        return "|".join(f"{scheme}={url}" for scheme, url in sorted(proxies.items()))
+
+    async def get_client(self, proxies: ProxiesType = None) -> httpx.AsyncClient:
+        """
+        获取指定代理出口对应的 AsyncClient，不存在时创建
+        Args:
+            proxies: httpx 格式的代理配置
+
+        Returns:
+
+        """
+        pool_key = self.make_pool_key(proxies)
+        client = self._clients.get(pool_key)
+        if client is not None and not client.is_closed:
+            self._clients.move_to_end(pool_key)
+            return client
+
+        client = httpx.AsyncClient(proxies=proxies, limits=self._limits, **self._client_kwargs)
+        self._clients[pool_key] = client
+        while len(self._clients) > self._max_proxy_clients:
+            _, stale_client = self._clients.popitem(last=False)
+            await self._retire(stale_client)
+        return client
+
+    async def _retire(self, client: httpx.AsyncClient) -> None:
+        """
+        关闭已经移出的 AsyncClient，其他协程还在使用时等最后一个请求结束后再关闭
+        Args:
+            client: 已经从 _clients 中移出的 AsyncClient
+
+        Returns:
+
+        """
+        if self._in_flight.get(client):
+            self._retired_clients.add(client)
+            return
+        await client.aclose()
+
+    async def acquire(self, url: Union[str, httpx.URL]) -> None:
+        """
+        获取平台对应 host 的限速令牌，令牌不足时等待
+        Args:
+            url: 请求的URL
+
+        Returns:
+
+        """
+        if self.platform is None:
+            return
+        rate_limiter = get_rate_limiter(self.platform, httpx.URL(url).host)
+        if rate_limiter is not None:
+            await rate_limiter.acquire()
+
+    async def send(self, proxies: ProxiesType, method: str, url: str, **kwargs) -> Tuple[httpx.Response, bool, float]:
+        """
+        发起一次请求（不重试）：获取限速令牌，使用代理出口对应的长连接发送，
+        并把耗时、封禁信号和超时反馈给平台的自适应并发控制
+        Args:
+            proxies: httpx 格式的代理配置
+            method: 请求方法
+            url: 请求的URL
+            **kwargs: 其他请求参数
+
+        Returns:
+            响应，是否命中封禁信号，请求耗时（秒，不含等待限速令牌的时间）
+
+        """
+        await self.acquire(url)
+        client = await self.get_client(proxies)
+        concurrency_limiter = get_concurrency_limiter(self.platform) if self.platform else None
+        self._in_flight[client] = self._in_flight.get(client, 0) + 1
+        start = time.monotonic()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TimeoutException:
+            if concurrency_limiter is not None:
+                concurrency_limiter.on_blocked()
+            raise
+        finally:
+            self._in_flight[client] -= 1
+            if not self._in_flight[client]:
+                del self._in_flight[client]
+                if client in self._retired_clients:
+                    self._retired_clients.discard(client)
+                    await client.aclose()
+        latency = time.monotonic() - start
+        blocked = self.is_blocked is not None and self.is_blocked(response)
+        if concurrency_limiter is not None:
+            if blocked:
+                concurrency_limiter.on_blocked()
+            else:
+                concurrency_limiter.on_success(latency)
+        return response, blocked, latency
+
+    async def request(self, method: str, url: str, proxies: ProxiesType = None, **kwargs) -> httpx.Response:
+        """
+        使用代理出口对应的长连接发起请求，开启代理轮换时使用轮换策略的当前代理，忽略 proxies 参数
+        Args:
+            method: 请求方法
+            url: 请求的URL
+            proxies: httpx 格式的代理配置
+            **kwargs: 其他请求参数，例如请求头、请求体等
+
+        Returns:
+
+        """
+        if self.proxy_rotator is not None:
+            return await self.proxy_rotator.request(self, method, url, **kwargs)
+        response, _, _ = await self.send(proxies, method, url, **kwargs)
+        return response
+
+    async def discard(self, proxies: ProxiesType) -> None:
+        """
+        关闭并移除指定代理出口的连接池，一般在代理失效被替换时调用
+        Args:
+            proxies: httpx 格式的代理配置
+
+        Returns:
+
+        """
+        client = self._clients.pop(self.make_pool_key(proxies), None)
+        if client is not None:
+            await self._retire(client)
+
+    async def aclose(self) -> None:
+        """
+        关闭所有连接池，包括还有请求未结束的已移出连接池
+        Returns:
+
+        """
+        while self._clients:
+            _, client = self._clients.popitem(last=False)
+            await client.aclose()
+        while self._retired_clients:
+            await self._retired_clients.pop().aclose()
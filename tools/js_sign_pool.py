@@ -0,0 +1,290 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 常驻 node 进程的 JS 签名服务
+import asyncio
+import itertools
+import json
+import shutil
+from typing import Any, Dict, List, Optional
+
+import config
+from tools import utils
+
+JS_SIGN_WORKER_SCRIPT = "libs/js_sign_worker.js"
+
+
+class JsSignError(Exception):
+    """js sign call failed"""
+
+
+class JsSignWorker:
+    """
+    单个常驻的 node 签名进程，签名脚本只在进程启动时加载一次，
+    之后通过 stdin/stdout 按行传输 JSON 请求，同一进程上的请求可以流水线发送
+    """
+
+    def __init__(self, node_path: str, script_path: str, call_timeout: float):
+        self._node_path = node_path
+        self._script_path = script_path
+        self._call_timeout = call_timeout
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._id_gen = itertools.count(1)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    @property
+    def alive(self) -> bool:
+        """
+        进程是否存活，且绑定在当前运行的事件循环上
+        Returns:
+
+        """
+        return (
+            self._process is not None
+            and self._process.returncode is None
+            and self._loop is asyncio.get_running_loop()
+        )
+
+    async def start(self) -> None:
+        """
+        启动（或重启）node 签名进程
+        Returns:
+
+        """
+        await self.close()
+        self._loop = asyncio.get_running_loop()
+        self._process = await asyncio.create_subprocess_exec(
+            self._node_path, JS_SIGN_WORKER_SCRIPT, self._script_path,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=2 ** 20,
+        )
+        self._reader_task = asyncio.create_task(self._read_responses(self._process))
+        utils.logger.info(
+            f"[JsSignWorker.start] js sign worker started, pid: {self._process.pid}, script: {self._script_path}"
+        )
+
+    async def _read_responses(self, process: asyncio.subprocess.Process) -> None:
+        """
+        读取 node 进程返回的签名结果，并唤醒对应的等待方
+        Args:
+            process: node 进程
+
+        Returns:
+
+        """
+        try:
+            while True:
+                line = await process.stdout.readline()
+                if not line:
+                    break
+                resp: Dict = json.loads(line)
+                future = self._pending.pop(resp.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if "error" in resp:
+                    future.set_exception(JsSignError(resp["error"]))
+                else:
+                    future.set_result(resp.get("result"))
+        except Exception as e:
+            utils.logger.error(f"[JsSignWorker._read_responses] read js sign response error: {e}")
+        finally:
+            self._fail_pending(JsSignError(f"js sign worker exited, script: {self._script_path}"))
+
+    def _fail_pending(self, exc: Exception) -> None:
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(exc)
+        self._pending.clear()
+
+    async def call(self, fn_name: str, *args) -> Any:
+        """
+        调用签名脚本中的函数
+        Args:
+            fn_name: 函数名
+            *args: 函数参数，需要能被 JSON 序列化
+
+        Returns:
+
+        """
+        req_id = next(self._id_gen)
+        future = self._loop.create_future()
+        self._pending[req_id] = future
+        payload = json.dumps({"id": req_id, "fn": fn_name, "args": list(args)}, ensure_ascii=False)
+        try:
+            self._process.stdin.write(payload.encode("utf-8") + b"\n")
+            await self._process.stdin.drain()
+            return await asyncio.wait_for(future, timeout=self._call_timeout)
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise JsSignError(f"js sign worker pipe broken: {e}")
+        except asyncio.TimeoutError:
+            # 卡住的进程直接杀掉，下次调用时由进程池重新拉起
+            self._kill()
+            raise JsSignError(f"js sign call {fn_name} timeout after {self._call_timeout}s")
+        finally:
+            self._pending.pop(req_id, None)
+
+    def _kill(self) -> None:
+        if self._process is not None and self._process.returncode is None:
+            try:
+                self._process.kill()
+            except ProcessLookupError:
+                pass
+
+    async def close(self) -> None:
+        """
+        关闭 node 签名进程
+        Returns:
+
+        """
+        process, self._process = self._process, None
+        if process is None:
+            return
+        if process.returncode is None and self._loop is asyncio.get_running_loop():
+            process.stdin.close()
+            try:
+                await asyncio.wait_for(process.wait(), timeout=3)
+            except asyncio.TimeoutError:
+                process.kill()
+        elif process.returncode is None:
+            # 进程属于已经结束的事件循环，只能直接杀掉
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        self._fail_pending(JsSignError("js sign worker closed"))
+
+
+class JsSignWorkerPool:
+    """
+    JS 签名进程池，签名请求分发给当前排队最少的 node 进程，
+    进程异常退出或超时会被自动重启；找不到 node 时退回到 PyExecJS 并在线程池中执行
+    """
+
+    def __init__(self, script_path: str, worker_num: Optional[int] = None, call_timeout: Optional[float] = None):
+        """
+        Args:
+            script_path: 签名脚本路径，例如 libs/douyin.js
+            worker_num: node 进程数量
+            call_timeout: 单次签名调用的超时时间（秒）
+        """
+        self._script_path = script_path
+        self._worker_num = max(1, worker_num or config.JS_SIGN_WORKER_NUM)
+        self._call_timeout = call_timeout or config.JS_SIGN_CALL_TIMEOUT
+        self._node_path = shutil.which("node")
+        self._workers: List[JsSignWorker] = []
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._start_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._execjs_ctx = None
+
+    async def _pick_worker(self) -> JsSignWorker:
+        """
+        选择排队最少的进程，挂掉的进程先重启
+        Returns:
+
+        """
+        loop = asyncio.get_running_loop()
+        if self._start_lock is None or self._start_lock_loop is not loop:
+            self._start_lock = asyncio.Lock()
+            self._start_lock_loop = loop
+        async with self._start_lock:
+            if not self._workers:
+                self._workers = [
+                    JsSignWorker(self._node_path, self._script_path, self._call_timeout)
+                    for _ in range(self._worker_num)
+                ]
+            # 空闲的存活进程优先，存活进程都在忙时再拉起新的进程
+            worker = min(self._workers, key=lambda w: (w.pending_count, not w.alive))
+            if not worker.alive:
+                await worker.start()
+            return worker
+
+    async def _call_by_execjs(self, fn_name: str, *args) -> Any:
+        import execjs
+
+        if self._execjs_ctx is None:
+            with open(self._script_path, mode="r", encoding="utf-8-sig") as f:
+                self._execjs_ctx = execjs.compile(f.read())
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._execjs_ctx.call, fn_name, *args)
+
+    async def call(self, fn_name: str, *args) -> Any:
+        """
+        调用签名脚本中的函数，进程意外退出时换一个新进程重试一次
+        Args:
+            fn_name: 函数名
+            *args: 函数参数
+
+        Returns:
+
+        """
+        if not self._node_path:
+            return await self._call_by_execjs(fn_name, *args)
+
+        worker = await self._pick_worker()
+        try:
+            return await worker.call(fn_name, *args)
+        except JsSignError:
+            if worker.alive:
+                # 进程还活着说明是签名脚本本身报错，重试没有意义
+                raise
+            utils.logger.warning(
+                f"[JsSignWorkerPool.call] js sign worker died, restart and retry, script: {self._script_path}"
+            )
+            worker = await self._pick_worker()
+            return await worker.call(fn_name, *args)
+
+    async def close(self) -> None:
+        """
+        关闭所有 node 签名进程
+        Returns:
+
+        """
+        for worker in self._workers:
+            await worker.close()
+        self._workers = []
+
+
+_js_sign_pools: Dict[str, JsSignWorkerPool] = {}
+
+
+def get_js_sign_pool(script_path: str) -> JsSignWorkerPool:
+    """
+    获取签名脚本对应的进程池，同一个脚本在进程内共享一个进程池
+    Args:
+        script_path: 签名脚本路径
+
+    Returns:
+
+    """
+    if script_path not in _js_sign_pools:
+        _js_sign_pools[script_path] = JsSignWorkerPool(script_path)
+    return _js_sign_pools[script_path]
+
+
+async def close_js_sign_pools() -> None:
+    """
+    关闭所有签名进程池
+    Returns:
+
+    """
+    for pool in _js_sign_pools.values():
+        await pool.close()
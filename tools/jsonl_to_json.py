@@ -0,0 +1,97 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 将 jsonl 数据文件转换为 json 数组格式（与 SAVE_DATA_OPTION=json 的输出一致）
+# 用法: python -m tools.jsonl_to_json data/xhs/jsonl [--output-dir data/xhs/json] [--force]
+import argparse
+import json
+import os
+import pathlib
+import sys
+from typing import Iterator, List, Optional
+
+
+def iter_jsonl_records(jsonl_file: str) -> Iterator[dict]:
+    """
+    逐行读取 jsonl 文件，跳过空行
+    Args:
+        jsonl_file: jsonl 文件路径
+
+    Returns:
+
+    """
+    with open(jsonl_file, mode="r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def convert_file(jsonl_file: str, json_file: str) -> int:
+    """
+    流式转换单个文件，内存中只保留一条记录，
+    输出内容与 json.dumps(records, ensure_ascii=False, indent=4) 相同
+    Args:
+        jsonl_file: jsonl 文件路径
+        json_file: 输出的 json 文件路径
+
+    Returns:
+        转换的记录数
+
+    """
+    pathlib.Path(json_file).parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with open(json_file, mode="w", encoding="utf-8") as f:
+        for record in iter_jsonl_records(jsonl_file):
+            item = json.dumps(record, ensure_ascii=False, indent=4)
+            f.write("[\n" if count == 0 else ",\n")
+            f.write("\n".join("    " + line for line in item.split("\n")))
+            count += 1
+        f.write("\n]" if count else "[]")
+    return count
+
+
+def find_jsonl_files(input_path: str) -> List[str]:
+    if os.path.isdir(input_path):
+        return sorted(
+            os.path.join(input_path, file_name)
+            for file_name in os.listdir(input_path)
+            if file_name.endswith(".jsonl")
+        )
+    return [input_path]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Convert jsonl data files to json array files / 将 jsonl 数据文件转换为 json 数组文件")
+    parser.add_argument("input", help="jsonl file or directory / jsonl 文件或目录")
+    parser.add_argument("--output-dir", default=None,
+                        help="output directory, default is the sibling json directory / 输出目录，默认为同级的 json 目录")
+    parser.add_argument("--force", action="store_true",
+                        help="overwrite existing json files / 覆盖已经存在的 json 文件")
+    args = parser.parse_args(argv)
+
+    skipped = 0
+    for jsonl_file in find_jsonl_files(args.input):
+        output_dir = args.output_dir or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(jsonl_file))), "json")
+        json_file = os.path.join(output_dir, os.path.splitext(os.path.basename(jsonl_file))[0] + ".json")
+        # 同级 json 目录中可能有 SAVE_DATA_OPTION=json 写入的同名文件，默认不覆盖
+        if os.path.exists(json_file) and not args.force:
+            print(f"{jsonl_file} skipped, {json_file} already exists, use --force to overwrite", file=sys.stderr)
+            skipped += 1
+            continue
+        count = convert_file(jsonl_file, json_file)
+        print(f"{jsonl_file} -> {json_file}, {count} records")
+    return 1 if skipped else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
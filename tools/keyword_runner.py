@@ -0,0 +1,65 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 多关键词并发搜索，每个关键词在独立的 task 和上下文中执行
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional
+
+import config
+from tools import utils
+from var import source_keyword_var
+
+
+async def run_keywords(name: str, handler: Callable[[str], Awaitable[Optional[int]]],
+                       keywords: Optional[List[str]] = None, concurrency: Optional[int] = None) -> None:
+    """
+    按关键词并发执行搜索，同时最多 concurrency 个关键词；
+    所有关键词共享平台的限速器和并发控制，这里只决定同时有多少个关键词在翻页
+    Args:
+        name: 名称，用于日志，例如 XiaoHongShuCrawler.search
+        handler: 搜索单个关键词的协程函数，返回该关键词爬取到的内容数量（可以为 None）
+        keywords: 关键词列表，默认为 config.KEYWORDS
+        concurrency: 同时搜索的关键词数量，默认为 config.KEYWORD_CONCURRENCY_NUM
+
+    Returns:
+
+    """
+    if keywords is None:
+        keywords = config.KEYWORDS.split(",")
+    concurrency = max(1, concurrency or config.KEYWORD_CONCURRENCY_NUM)
+    semaphore = asyncio.Semaphore(concurrency)
+    total = len(keywords)
+    finished = 0
+
+    async def run_keyword(keyword: str) -> None:
+        nonlocal finished
+        async with semaphore:
+            # 每个 task 有自己的上下文副本，这里设置的关键词不会影响其他关键词
+            source_keyword_var.set(keyword)
+            utils.logger.info(f"[{name}] Current search keyword: {keyword}")
+            start_time = time.monotonic()
+            item_count = await handler(keyword)
+            finished += 1
+            utils.logger.info(
+                f"[{name}] Keyword: {keyword} finished, items: {item_count if item_count is not None else '-'}, "
+                f"cost: {time.monotonic() - start_time:.1f}s, progress: {finished}/{total}"
+            )
+
+    tasks = [asyncio.create_task(run_keyword(keyword), name=f"{name}-{keyword}") for keyword in keywords]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # 某个关键词出错时取消其余关键词，和顺序执行时的行为一致
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,92 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 按平台、host 限速的令牌桶，平台 API 客户端在每次请求前获取令牌
+import asyncio
+import random
+import time
+from typing import Dict, Optional, Tuple
+
+import config
+
+
+class TokenBucketRateLimiter:
+    """
+    令牌桶限速器：令牌按 rate 个/秒生成，最多攒 burst 个；
+    获取令牌时立即预约，令牌不足的请求按预约顺序等待，等待期间不占用任何并发名额
+    """
+
+    def __init__(self, rate: float, burst: int = 1, jitter: float = 0) -> None:
+        """
+        Args:
+            rate: 每秒生成的令牌数
+            burst: 令牌桶容量
+            jitter: 每次额外等待的随机抖动，占请求间隔的比例
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.jitter = max(0.0, jitter)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+
+    def reserve(self) -> float:
+        """
+        预约一个令牌
+        Returns:
+            需要等待的秒数
+
+        """
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+        self._tokens -= 1
+        wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if self.jitter:
+            wait += random.uniform(0, self.jitter / self.rate)
+        return wait
+
+    async def acquire(self) -> None:
+        """
+        获取一个令牌，令牌不足时等待
+        Returns:
+
+        """
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_rate_limiters: Dict[Tuple[str, str], Optional[TokenBucketRateLimiter]] = {}
+
+
+def get_rate_limiter(platform: str, host: str) -> Optional[TokenBucketRateLimiter]:
+    """
+    获取平台某个 host 的限速器，第一次获取时按配置创建
+    Args:
+        platform: 平台名称
+        host: 请求的 host
+
+    Returns:
+        限速器，配置为不限速时返回 None
+
+    """
+    key = (platform, host)
+    if key in _rate_limiters:
+        return _rate_limiters[key]
+    rate = config.CRAWLER_RATE_LIMITS.get(
+        host, config.CRAWLER_RATE_LIMITS.get(platform, config.CRAWLER_REQUESTS_PER_SECOND)
+    )
+    rate_limiter = None
+    if rate and rate > 0:
+        rate_limiter = TokenBucketRateLimiter(rate, config.CRAWLER_RATE_LIMIT_BURST, config.CRAWLER_RATE_LIMIT_JITTER)
+    _rate_limiters[key] = rate_limiter
+    return rate_limiter
@@ -0,0 +1,274 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 已爬取内容的去重索引，内存中的布隆过滤器 + SQLite 持久化，在发出详情、评论请求前判断是否需要爬取
+import asyncio
+import hashlib
+import math
+import os
+import time
+from typing import Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+import aiosqlite
+
+import config
+from store.store_registry import flush_all_stores
+from store.write_behind import StoreWriteError
+from tools import utils
+
+# 索引的内容类型
+SEEN_ITEM_DETAIL = "detail"  # 帖子/视频详情，id 为帖子/视频 ID
+SEEN_ITEM_COMMENTS = "comments"  # 帖子/视频的评论，id 为帖子/视频 ID
+
+SEEN_POLICY_ALWAYS = "always"
+SEEN_POLICY_SKIP = "skip"
+SEEN_POLICY_REFRESH = "refresh"
+
+
+class BloomFilter:
+    """
+    布隆过滤器：不在过滤器中的一定没有爬取过，在过滤器中的按 error_rate 的概率误判
+    """
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        """
+        Args:
+            capacity: 预计的元素数量
+            error_rate: 达到预计数量时的误判率
+        """
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterator[int]:
+        # 双重哈希：一次 blake2b 得到两个 64 位哈希，组合出 hash_count 个位置
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class SeenIndex:
+    """
+    已爬取内容的索引：布隆过滤器判断为没有爬取过的直接放行，不查数据库；
+    判断为可能爬取过的再到 SQLite 中确认爬取时间，按 SEEN_INDEX_POLICY 决定是否重新爬取。
+    存储是异步、批量落盘的，标记先保存在内存中，定时在存储落盘之后再写入索引，崩溃时不会出现已标记但数据没有保存的内容
+    """
+
+    def __init__(self, db_path: str, flush_stores: Optional[Callable[[], Awaitable[None]]] = None) -> None:
+        """
+        Args:
+            db_path: 数据库文件路径
+            flush_stores: 写入标记前调用，等待已经提交给存储的数据落盘
+        """
+        self.db_path = db_path
+        self._flush_stores = flush_stores
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._conn_lock: Optional[asyncio.Lock] = None
+        self._bloom_filters: Dict[Tuple[str, str], BloomFilter] = {}
+        # 还没有写入索引的标记，(平台, 内容类型, ID) -> 爬取时间
+        self._pending_marks: Dict[Tuple[str, str, str], int] = {}
+        self._commit_lock: Optional[asyncio.Lock] = None
+        self._commit_task: Optional[asyncio.Task] = None
+
+    async def _get_conn(self) -> aiosqlite.Connection:
+        if self._conn is not None:
+            return self._conn
+        if self._conn_lock is None:
+            self._conn_lock = asyncio.Lock()
+        async with self._conn_lock:
+            if self._conn is None:
+                os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+                conn = await aiosqlite.connect(self.db_path)
+                await conn.execute("PRAGMA journal_mode=WAL")
+                await conn.execute(
+                    "CREATE TABLE IF NOT EXISTS seen_item ("
+                    "platform TEXT NOT NULL, item_type TEXT NOT NULL, item_id TEXT NOT NULL, "
+                    "crawled_at INTEGER NOT NULL, PRIMARY KEY (platform, item_type, item_id))"
+                )
+                await conn.commit()
+                self._conn = conn
+        return self._conn
+
+    async def _get_bloom_filter(self, platform: str, item_type: str) -> BloomFilter:
+        """
+        获取平台某类内容的布隆过滤器，第一次使用时从数据库加载已经爬取过的 ID
+        Args:
+            platform: 平台名称
+            item_type: 内容类型
+
+        Returns:
+
+        """
+        key = (platform, item_type)
+        bloom_filter = self._bloom_filters.get(key)
+        if bloom_filter is not None:
+            return bloom_filter
+        conn = await self._get_conn()
+        bloom_filter = BloomFilter(config.SEEN_INDEX_BLOOM_CAPACITY, config.SEEN_INDEX_BLOOM_ERROR_RATE)
+        async with conn.execute(
+            "SELECT item_id FROM seen_item WHERE platform = ? AND item_type = ?", (platform, item_type)
+        ) as cursor:
+            async for row in cursor:
+                bloom_filter.add(row[0])
+        # 加载期间可能有其他协程已经创建了过滤器，以先创建的为准
+        return self._bloom_filters.setdefault(key, bloom_filter)
+
+    async def should_crawl(self, platform: str, item_type: str, item_id: str) -> bool:
+        """
+        判断是否需要发出请求爬取该内容
+        Args:
+            platform: 平台名称
+            item_type: 内容类型
+            item_id: 帖子/视频 ID
+
+        Returns:
+
+        """
+        if not config.ENABLE_SEEN_INDEX or config.SEEN_INDEX_POLICY == SEEN_POLICY_ALWAYS:
+            return True
+        item_id = str(item_id)
+        crawled_at = self._pending_marks.get((platform, item_type, item_id))
+        if crawled_at is None:
+            bloom_filter = await self._get_bloom_filter(platform, item_type)
+            if item_id not in bloom_filter:
+                return True
+            conn = await self._get_conn()
+            async with conn.execute(
+                "SELECT crawled_at FROM seen_item WHERE platform = ? AND item_type = ? AND item_id = ?",
+                (platform, item_type, item_id),
+            ) as cursor:
+                row = await cursor.fetchone()
+            if row is None:
+                # 布隆过滤器误判
+                return True
+            crawled_at = row[0]
+        if (
+            config.SEEN_INDEX_POLICY == SEEN_POLICY_REFRESH
+            and time.time() - crawled_at >= config.SEEN_INDEX_REFRESH_SECONDS
+        ):
+            return True
+        utils.logger.info(f"[SeenIndex.should_crawl] Skip crawled {platform} {item_type}: {item_id}")
+        return False
+
+    async def mark_crawled(self, platform: str, item_type: str, item_id: str) -> None:
+        """
+        记录内容已经爬取完成，在内容交给存储之后调用；
+        标记在 SEEN_INDEX_COMMIT_INTERVAL 秒内、存储落盘之后写入索引
+        Args:
+            platform: 平台名称
+            item_type: 内容类型
+            item_id: 帖子/视频 ID
+
+        Returns:
+
+        """
+        if not config.ENABLE_SEEN_INDEX:
+            return
+        item_id = str(item_id)
+        self._pending_marks[(platform, item_type, item_id)] = int(time.time())
+        bloom_filter = self._bloom_filters.get((platform, item_type))
+        if bloom_filter is not None:
+            bloom_filter.add(item_id)
+        if self._commit_task is None:
+            self._commit_task = asyncio.create_task(self._delayed_commit())
+
+    async def _delayed_commit(self) -> None:
+        await asyncio.sleep(config.SEEN_INDEX_COMMIT_INTERVAL)
+        self._commit_task = None
+        try:
+            await self.commit()
+        except Exception as e:
+            utils.logger.error(f"[SeenIndex._delayed_commit] commit seen items error: {e}")
+
+    async def commit(self) -> None:
+        """
+        等待存储落盘，然后把内存中的标记写入索引，写入失败的标记留到下次提交。
+        存储有数据写入失败时无法确定哪些标记对应的数据已经保存，标记都留在内存中不写入索引，下次运行重新爬取
+        Returns:
+
+        """
+        if self._commit_lock is None:
+            self._commit_lock = asyncio.Lock()
+        async with self._commit_lock:
+            if not self._pending_marks:
+                return
+            # 先取出标记再落盘存储，之后新增的标记对应的数据可能还没有落盘，留到下次提交
+            marks, self._pending_marks = self._pending_marks, {}
+            try:
+                if self._flush_stores is not None:
+                    await self._flush_stores()
+                conn = await self._get_conn()
+                await conn.executemany(
+                    "INSERT OR REPLACE INTO seen_item (platform, item_type, item_id, crawled_at) VALUES (?, ?, ?, ?)",
+                    [(platform, item_type, item_id, crawled_at)
+                     for (platform, item_type, item_id), crawled_at in marks.items()],
+                )
+                await conn.commit()
+            except StoreWriteError as e:
+                self._restore_marks(marks)
+                utils.logger.error(f"[SeenIndex.commit] keep {len(self._pending_marks)} seen marks pending: {e}")
+            except BaseException:
+                # 包括提交被取消的情况（例如 close 时取消定时提交）
+                self._restore_marks(marks)
+                raise
+
+    def _restore_marks(self, marks: Dict[Tuple[str, str, str], int]) -> None:
+        for key, crawled_at in marks.items():
+            self._pending_marks.setdefault(key, crawled_at)
+
+    async def close(self) -> None:
+        """
+        写入剩余的标记并关闭数据库，在存储关闭之后调用
+        Returns:
+
+        """
+        if self._commit_task is not None:
+            self._commit_task.cancel()
+            self._commit_task = None
+        try:
+            await self.commit()
+        except Exception as e:
+            utils.logger.error(f"[SeenIndex.close] commit seen items error: {e}")
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+        self._bloom_filters.clear()
+
+
+_seen_index: Optional[SeenIndex] = None
+
+
+def get_seen_index() -> SeenIndex:
+    """
+    获取进程共享的去重索引
+    Returns:
+
+    """
+    global _seen_index
+    if _seen_index is None:
+        _seen_index = SeenIndex(config.SEEN_INDEX_DB_PATH, flush_stores=flush_all_stores)
+    return _seen_index
+
+
+async def close_seen_index() -> None:
+    global _seen_index
+    if _seen_index is not None:
+        await _seen_index.close()
+        _seen_index = None
@@ -11,73 +11,134 @@
 
 import asyncio
 import json
-import logging
+import time
 from collections import Counter
+from typing import Dict, List
 
 import aiofiles
-import jieba
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
 
 import config
-from tools import utils
+from tools import analysis_executor, utils
 
-plot_lock = asyncio.Lock()
 
 class AsyncWordCloudGenerator:
+    """
+    增量词频统计：每个输出前缀维护一个累计的 Counter，新保存的数据只分词一次，
+    词频文件按时间间隔写入，词云图只在调用 render_word_cloud 或 close 时生成；
+    分词和渲染按批提交到文本分析进程池，不占用事件循环
+    """
+
     def __init__(self):
-        logging.getLogger('jieba').setLevel(logging.WARNING)
-        self.stop_words_file = config.STOP_WORDS_FILE
         self.lock = asyncio.Lock()
-        self.stop_words = self.load_stop_words()
-        self.custom_words = config.CUSTOM_WORDS
-        for word, group in self.custom_words.items():
-            jieba.add_word(word)
+        self.word_freqs: Dict[str, Counter] = {}
+        self._pending_texts: Dict[str, List[str]] = {}
+        self._dirty_prefixes = set()
+        self._last_save_time: Dict[str, float] = {}
 
-    def load_stop_words(self):
-        with open(self.stop_words_file, 'r', encoding='utf-8') as f:
-            return set(f.read().strip().split('\n'))
+    @staticmethod
+    def extract_texts(data: List[Dict]) -> List[str]:
+        """
+        取出数据中的 content 字段，没有 content 的数据跳过
+        Args:
+            data: 数据列表
 
-    async def generate_word_frequency_and_cloud(self, data, save_words_prefix):
-        all_text = ' '.join(item['content'] for item in data)
-        words = [word for word in jieba.lcut(all_text) if word not in self.stop_words and len(word.strip()) > 0]
-        word_freq = Counter(words)
+        Returns:
+
+        """
+        return [item['content'] for item in data if isinstance(item.get('content'), str)]
+
+    async def add_items(self, data: List[Dict], save_words_prefix: str):
+        """
+        新增数据先攒批，攒够 WORD_SEGMENT_BATCH_SIZE 条或距离上次写入超过 WORD_FREQ_SAVE_INTERVAL 秒时
+        提交分词并累加到前缀对应的 Counter
+        Args:
+            data: 新增的数据
+            save_words_prefix: 词频文件、词云图的路径前缀
+
+        Returns:
+
+        """
+        texts = self.extract_texts(data)
+        if not texts:
+            return
+        pending_texts = self._pending_texts.setdefault(save_words_prefix, [])
+        pending_texts.extend(texts)
+        if time.monotonic() - self._last_save_time.get(save_words_prefix, 0) >= config.WORD_FREQ_SAVE_INTERVAL:
+            await self.save_word_frequency(save_words_prefix)
+        elif len(pending_texts) >= config.WORD_SEGMENT_BATCH_SIZE:
+            await self._count_pending_texts(save_words_prefix)
+
+    async def _count_pending_texts(self, save_words_prefix: str):
+        texts = self._pending_texts.pop(save_words_prefix, None)
+        if not texts:
+            return
+        word_freq = await analysis_executor.run_analysis(analysis_executor.count_words, texts)
+        self.word_freqs.setdefault(save_words_prefix, Counter()).update(word_freq)
+        self._dirty_prefixes.add(save_words_prefix)
+
+    async def save_word_frequency(self, save_words_prefix: str):
+        """
+        统计攒批中的数据，并将前缀对应的累计词频写入文件
+        Args:
+            save_words_prefix: 词频文件路径前缀
 
-        # Save word frequency to file
+        Returns:
+
+        """
+        self._last_save_time[save_words_prefix] = time.monotonic()
+        await self._count_pending_texts(save_words_prefix)
+        if save_words_prefix not in self._dirty_prefixes:
+            return
+        self._dirty_prefixes.discard(save_words_prefix)
         freq_file = f"{save_words_prefix}_word_freq.json"
+        content = json.dumps(self.word_freqs[save_words_prefix], ensure_ascii=False, indent=4)
         async with aiofiles.open(freq_file, 'w', encoding='utf-8') as file:
-            await file.write(json.dumps(word_freq, ensure_ascii=False, indent=4))
+            await file.write(content)
+
+    async def generate_word_frequency_and_cloud(self, data, save_words_prefix):
+        """
+        一次性统计全部数据的词频，写入词频文件并生成词云图
+        Args:
+            data: 数据列表
+            save_words_prefix: 词频文件、词云图的路径前缀
+
+        Returns:
 
-        # Try to acquire the plot lock without waiting
-        if plot_lock.locked():
-            utils.logger.info("Skipping word cloud generation as the lock is held.")
+        """
+        self.word_freqs.pop(save_words_prefix, None)
+        self._pending_texts[save_words_prefix] = self.extract_texts(data)
+        await self.save_word_frequency(save_words_prefix)
+        await self.render_word_cloud(save_words_prefix)
+
+    async def render_word_cloud(self, save_words_prefix: str):
+        """
+        根据前缀对应的累计词频生成词云图
+        Args:
+            save_words_prefix: 词云图路径前缀
+
+        Returns:
+
+        """
+        word_freq = self.word_freqs.get(save_words_prefix)
+        if not word_freq:
             return
+        async with self.lock:
+            await analysis_executor.run_analysis(
+                analysis_executor.render_word_cloud,
+                dict(word_freq),
+                f"{save_words_prefix}_word_cloud.png",
+                config.FONT_PATH,
+            )
+
+    async def close(self):
+        """
+        写入所有未保存的词频并生成词云图，程序退出前调用
+        Returns:
 
-        await self.generate_word_cloud(word_freq, save_words_prefix)
-
-    async def generate_word_cloud(self, word_freq, save_words_prefix):
-        await plot_lock.acquire()
-        top_20_word_freq = {word: freq for word, freq in
-                            sorted(word_freq.items(), key=lambda item: item[1], reverse=True)[:20]}
-        wordcloud = WordCloud(
-            font_path=config.FONT_PATH,
-            width=800,
-            height=400,
-            background_color='white',
-            max_words=200,
-            stopwords=self.stop_words,
-            colormap='viridis',
-            contour_color='steelblue',
-            contour_width=1
-        ).generate_from_frequencies(top_20_word_freq)
-
-        # Save word cloud image
-        plt.figure(figsize=(10, 5), facecolor='white')
-        plt.imshow(wordcloud, interpolation='bilinear')
-
-        plt.axis('off')
-        plt.tight_layout(pad=0)
-        plt.savefig(f"{save_words_prefix}_word_cloud.png", format='png', dpi=300)
-        plt.close()
-
-        plot_lock.release()
\ No newline at end of file
+        """
+        for save_words_prefix in dict.fromkeys(list(self.word_freqs) + list(self._pending_texts)):
+            try:
+                await self.save_word_frequency(save_words_prefix)
+                await self.render_word_cloud(save_words_prefix)
+            except Exception as e:
+                utils.logger.error(f"[AsyncWordCloudGenerator.close] generate word cloud for {save_words_prefix} error: {e}")